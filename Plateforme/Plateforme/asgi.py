@@ -7,6 +7,12 @@ from channels.security.websocket import AllowedHostsOriginValidator
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Plateforme.settings')
 django_asgi_app = get_asgi_application()
 
+# daphne ne lance pas les system checks : un cache propre à chaque worker est refusé ici aussi
+from django.core.exceptions import ImproperlyConfigured
+from notifications.checks import check_shared_cache
+for error in check_shared_cache(None):
+    raise ImproperlyConfigured(f"{error.msg} {error.hint}")
+
 # Import websocket routes
 to_imports = []
 from notifications import routing as notifications_routing
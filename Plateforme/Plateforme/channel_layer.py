@@ -0,0 +1,466 @@
+"""
+Channel layer shared by the ASGI workers of one host, over a Unix socket.
+
+``InMemoryChannelLayer`` only reaches the sockets of its own process. Here
+the channels, groups and queued messages live in a small broker
+(``ChannelBroker``) listening on a Unix socket; every worker talks to it
+with ``UnixSocketChannelLayer``. No extra service is needed: the first
+worker that finds no broker takes a file lock and runs one in a background
+thread. If that worker exits, the lock is released and the next worker that
+fails to connect starts a new broker, and clients replay their group
+memberships on it. ``manage.py run_channel_broker`` runs a standalone broker
+instead (e.g. under the same supervisor as daphne).
+
+The broker applies the semantics of the in-memory layer: per-channel
+capacity (``ChannelFull`` on ``send``, silent drop on ``group_send``),
+message expiry, and removal from every group of a channel whose messages
+expire unread (its consumer is gone). Frames are length-prefixed msgpack,
+so messages must contain only msgpack types (no UUID or datetime objects).
+"""
+import asyncio
+import errno
+import fcntl
+import itertools
+import logging
+import os
+import random
+import string
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+
+import msgpack
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct('!I')
+CONNECT_ATTEMPTS = 50
+CONNECT_DELAY = 0.1
+CLEANUP_INTERVAL = 1
+
+# Réponses du broker
+OK, FULL, MESSAGE, ERROR = 'ok', 'full', 'message', 'error'
+# Requête sans réponse
+NO_REPLY = 0
+
+
+async def read_frame(reader):
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (length,) = FRAME_HEADER.unpack(header)
+    return msgpack.unpackb(await reader.readexactly(length), raw=False)
+
+
+def write_frame(writer, payload):
+    data = msgpack.packb(payload, use_bin_type=True)
+    writer.write(FRAME_HEADER.pack(len(data)) + data)
+
+
+# ==================== BROKER ====================
+
+class ChannelBroker:
+    """Channels, groups and queued messages of every worker, served on a Unix socket."""
+
+    def __init__(self, path, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None):
+        self.path = path
+        self.expiry = expiry
+        self.group_expiry = group_expiry
+        # Même résolution des capacités que les couches de Channels
+        self.capacity_layer = BaseChannelLayer(capacity=capacity, channel_capacity=channel_capacity)
+        self.channels = {}   # canal -> deque[(expiration, message)]
+        self.waiters = {}    # canal -> deque[(writer, id de requête)]
+        self.groups = {}     # groupe -> {canal: date d'ajout}
+        self.server = None
+
+    # --- Serveur ---
+
+    async def start(self):
+        """Listen on the socket; the caller must hold ``acquire_broker_lock(path)``."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.server = await asyncio.start_unix_server(self.handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        asyncio.get_running_loop().create_task(self._cleanup_loop())
+        logger.info("Channel broker listening on %s", self.path)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_id, command, *args = await read_frame(reader)
+                reply = self.dispatch(writer, request_id, command, args)
+                if reply is not None and request_id != NO_REPLY:
+                    write_frame(writer, [request_id, *reply])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._drop_waiters(writer)
+            writer.close()
+
+    def dispatch(self, writer, request_id, command, args):
+        """Run one command; returns the reply, or ``None`` if it is deferred (receive)."""
+        if command == 'send':
+            return (OK, None) if self.deliver(*args) else (FULL, None)
+        if command == 'receive':
+            return self.receive(writer, request_id, *args)
+        if command == 'cancel':
+            self.cancel(writer, *args)
+            return None
+        if command == 'group_add':
+            group, channel = args
+            self.groups.setdefault(group, {})[channel] = time.time()
+            return OK, None
+        if command == 'group_discard':
+            group, channel = args
+            members = self.groups.get(group)
+            if members is not None:
+                members.pop(channel, None)
+                if not members:
+                    del self.groups[group]
+            return OK, None
+        if command == 'group_send':
+            group, message = args
+            for channel in list(self.groups.get(group, ())):
+                # Canal plein : message perdu pour ce membre, comme InMemoryChannelLayer
+                self.deliver(channel, message)
+            return OK, None
+        if command == 'flush':
+            self.channels.clear()
+            self.groups.clear()
+            return OK, None
+        return ERROR, f"Unknown command: {command}"
+
+    # --- Messages ---
+
+    def deliver(self, channel, message):
+        """Hand ``message`` to a waiting receiver or queue it; ``False`` if the channel is full."""
+        waiters = self.waiters.get(channel)
+        while waiters:
+            writer, request_id = waiters.popleft()
+            if not waiters:
+                del self.waiters[channel]
+            if not writer.is_closing():
+                write_frame(writer, [request_id, MESSAGE, message])
+                return True
+        queue = self.channels.setdefault(channel, deque())
+        if len(queue) >= self.capacity_layer.get_capacity(channel):
+            return False
+        queue.append((time.time() + self.expiry, message))
+        return True
+
+    def receive(self, writer, request_id, channel):
+        queue = self.channels.get(channel)
+        now = time.time()
+        while queue:
+            expires, message = queue.popleft()
+            if not queue:
+                del self.channels[channel]
+            if expires >= now:
+                return MESSAGE, message
+        self.waiters.setdefault(channel, deque()).append((writer, request_id))
+        return None
+
+    def cancel(self, writer, request_id, channel):
+        waiters = self.waiters.get(channel)
+        if waiters:
+            try:
+                waiters.remove((writer, request_id))
+            except ValueError:
+                pass
+            if not waiters:
+                del self.waiters[channel]
+
+    def _drop_waiters(self, writer):
+        for channel, waiters in list(self.waiters.items()):
+            remaining = deque(waiter for waiter in waiters if waiter[0] is not writer)
+            if remaining:
+                self.waiters[channel] = remaining
+            else:
+                del self.waiters[channel]
+
+    # --- Expiration ---
+
+    def clean_expired(self):
+        now = time.time()
+        for channel, queue in list(self.channels.items()):
+            expired = False
+            while queue and queue[0][0] < now:
+                queue.popleft()
+                expired = True
+            if not queue:
+                del self.channels[channel]
+            if expired:
+                # Personne ne lit ce canal : il quitte ses groupes
+                for members in self.groups.values():
+                    members.pop(channel, None)
+        timeout = now - self.group_expiry
+        for group, members in list(self.groups.items()):
+            for channel, joined in list(members.items()):
+                if joined < timeout:
+                    del members[channel]
+            if not members:
+                del self.groups[group]
+
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(CLEANUP_INTERVAL)
+            self.clean_expired()
+
+
+# ==================== EMBEDDED BROKER ====================
+
+_embedded_lock = threading.Lock()
+_embedded = {}
+
+
+def acquire_broker_lock(path):
+    """
+    Lock reserving the broker role for ``path`` to this process.
+
+    Returns the open lock file (keep it open as long as the broker runs), or
+    ``None`` if another process holds it. The OS releases it when the
+    process exits, whatever the way.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    lock_file = open(f"{path}.lock", 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError as e:
+        lock_file.close()
+        if e.errno in (errno.EAGAIN, errno.EACCES):
+            return None
+        raise
+    return lock_file
+
+
+def start_embedded_broker(path, **options):
+    """
+    Run a broker in a thread of this process if no other process holds the lock.
+
+    Returns ``True`` if this process now runs the broker for ``path``.
+    """
+    with _embedded_lock:
+        if path in _embedded:
+            return True
+        lock_file = acquire_broker_lock(path)
+        if lock_file is None:
+            return False
+
+        broker = ChannelBroker(path, **options)
+        ready = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(broker.start())
+            ready.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name='channel-broker', daemon=True)
+        thread.start()
+        ready.wait(5)
+        # Le verrou reste tenu tant que le processus vit
+        _embedded[path] = (broker, lock_file, thread)
+        return True
+
+
+# ==================== CLIENT ====================
+
+class _Connection:
+    """One socket to the broker, multiplexing the requests of an event loop."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.futures = {}
+        self.ids = itertools.count(1)
+        self.closed = False
+        self.reader_task = asyncio.get_running_loop().create_task(self._read())
+
+    async def _read(self):
+        try:
+            while True:
+                request_id, status, payload = await read_frame(self.reader)
+                future = self.futures.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result((status, payload))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+            for future in self.futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Channel broker connection lost"))
+            self.futures.clear()
+
+    def start(self, command, *args):
+        """Send a request; returns ``(request id, future of the reply)``."""
+        if self.closed:
+            raise ConnectionError("Channel broker connection lost")
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.futures[request_id] = future
+        write_frame(self.writer, [request_id, command, *args])
+        return request_id, future
+
+    def notify(self, command, *args):
+        if not self.closed:
+            write_frame(self.writer, [NO_REPLY, command, *args])
+
+    async def request(self, command, *args):
+        _, future = self.start(command, *args)
+        return await future
+
+    def close(self):
+        self.closed = True
+        self.reader_task.cancel()
+        self.writer.close()
+
+
+class UnixSocketChannelLayer(BaseChannelLayer):
+    """
+    Channel layer talking to a ``ChannelBroker`` over a Unix socket.
+
+    Options: ``path`` of the socket, ``expiry``, ``group_expiry``,
+    ``capacity`` and ``channel_capacity`` (applied by the broker), and
+    ``embedded_broker`` (start a broker in this process when none answers).
+    """
+
+    extensions = ['groups', 'flush']
+
+    def __init__(self, path, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+                 embedded_broker=True, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.path = path
+        self.broker_options = {
+            'expiry': expiry,
+            'group_expiry': group_expiry,
+            'capacity': capacity,
+            'channel_capacity': channel_capacity,
+        }
+        self.embedded_broker = embedded_broker
+        self.client_prefix = uuid.uuid4().hex[:12]
+        # Une connexion par boucle d'événements (async_to_sync en crée de nouvelles)
+        self.connections = {}
+        # Appartenances aux groupes, rejouées si le broker redémarre
+        self.memberships = set()
+
+    # --- Connexion ---
+
+    async def _connect(self):
+        for attempt in range(CONNECT_ATTEMPTS):
+            try:
+                return await asyncio.open_unix_connection(self.path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if self.embedded_broker:
+                    start_embedded_broker(self.path, **self.broker_options)
+                await asyncio.sleep(CONNECT_DELAY if attempt else 0)
+        raise ConnectionError(f"No channel broker on {self.path}")
+
+    async def _connection(self):
+        loop = asyncio.get_running_loop()
+        connection = self.connections.get(loop)
+        if connection is not None and not connection.closed:
+            return connection
+        reconnect = connection is not None
+        reader, writer = await self._connect()
+        connection = self.connections[loop] = _Connection(reader, writer)
+        self._close_with_loop(loop)
+        if reconnect and self.memberships:
+            logger.warning("Channel broker restarted, replaying %d group memberships", len(self.memberships))
+            for group, channel in list(self.memberships):
+                await connection.request('group_add', group, channel)
+        return connection
+
+    def _close_with_loop(self, loop):
+        """Close the connection when its loop is closed (loops of ``async_to_sync``)."""
+        if getattr(loop, '_channel_layer_close_wrapped', False):
+            return
+        original_close = loop.close
+
+        def close():
+            for layer_loop, connection in list(self.connections.items()):
+                if layer_loop is loop:
+                    connection.close()
+                    del self.connections[layer_loop]
+            original_close()
+
+        loop.close = close
+        loop._channel_layer_close_wrapped = True
+
+    async def _request(self, command, *args):
+        # Une seule reprise : le broker a pu changer de processus
+        for attempt in range(2):
+            connection = await self._connection()
+            try:
+                return await connection.request(command, *args)
+            except ConnectionError:
+                if attempt:
+                    raise
+
+    # --- API des couches ---
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        status, _ = await self._request('send', channel, message)
+        if status == FULL:
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        while True:
+            connection = await self._connection()
+            try:
+                request_id, future = connection.start('receive', channel)
+            except ConnectionError:
+                continue
+            try:
+                status, message = await future
+                return message
+            except ConnectionError:
+                # Nouveau broker : on se remet en attente dessus
+                continue
+            except asyncio.CancelledError:
+                connection.futures.pop(request_id, None)
+                connection.notify('cancel', request_id, channel)
+                raise
+
+    async def new_channel(self, prefix='specific.'):
+        suffix = ''.join(random.choice(string.ascii_letters) for _ in range(12))
+        return f"{prefix}.{self.client_prefix}!{suffix}"
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        self.memberships.add((group, channel))
+        await self._request('group_add', group, channel)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        self.memberships.discard((group, channel))
+        await self._request('group_discard', group, channel)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        await self._request('group_send', group, message)
+
+    async def flush(self):
+        self.memberships.clear()
+        await self._request('flush')
+
+    async def close(self):
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
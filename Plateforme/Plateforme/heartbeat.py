@@ -0,0 +1,101 @@
+"""
+Server-side heartbeat of the WebSocket consumers.
+
+A browser that went to sleep or lost its network leaves a half-open socket:
+the consumer, its group memberships and its buffers stay in memory until a
+write fails, which may never happen on a quiet chatroom. One task per event
+loop (not one per socket) sends ``{"type": "ping"}`` every
+``WEBSOCKET_HEARTBEAT_INTERVAL`` seconds to the sockets accepted by a
+``HeartbeatMixin`` consumer, and closes (code 4000) those from which nothing
+was received for ``WEBSOCKET_IDLE_TIMEOUT`` seconds. Clients answer pings
+with ``{"action": "pong"}``; any frame received counts as activity.
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = getattr(settings, 'WEBSOCKET_HEARTBEAT_INTERVAL', 30)
+IDLE_TIMEOUT = getattr(settings, 'WEBSOCKET_IDLE_TIMEOUT', 90)
+PING = json.dumps({'type': 'ping'})
+CLOSE_IDLE = 4000
+
+
+class Heartbeat:
+    """Pings the sockets of one event loop and reaps the idle ones."""
+
+    def __init__(self, interval=HEARTBEAT_INTERVAL, idle_timeout=IDLE_TIMEOUT):
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.sockets = weakref.WeakSet()
+        self.reaped = 0
+        self._task = None
+
+    def add(self, consumer):
+        self.sockets.add(consumer)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def discard(self, consumer):
+        self.sockets.discard(consumer)
+
+    async def _run(self):
+        while self.sockets:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.beat()
+            except Exception as e:
+                logger.warning("WebSocket heartbeat failed: %s", e)
+
+    async def beat(self):
+        """Ping every live socket and close the idle ones; returns how many were closed."""
+        deadline = time.monotonic() - self.idle_timeout
+        reaped = 0
+        for consumer in list(self.sockets):
+            try:
+                if consumer.last_activity < deadline:
+                    self.sockets.discard(consumer)
+                    reaped += 1
+                    await consumer.close(code=CLOSE_IDLE)
+                else:
+                    await consumer.send(text_data=PING)
+            except Exception as e:
+                # Socket déjà fermé côté serveur ASGI
+                self.sockets.discard(consumer)
+                logger.debug("Heartbeat dropped a socket: %s", e)
+        self.reaped += reaped
+        return reaped
+
+
+_heartbeats = weakref.WeakKeyDictionary()
+
+
+def heartbeat():
+    """``Heartbeat`` of the running event loop."""
+    loop = asyncio.get_running_loop()
+    beat = _heartbeats.get(loop)
+    if beat is None:
+        beat = _heartbeats[loop] = Heartbeat()
+    return beat
+
+
+class HeartbeatMixin:
+    """Put before ``AsyncWebsocketConsumer``: accepted sockets are pinged and reaped when idle."""
+
+    async def accept(self, *args, **kwargs):
+        await super().accept(*args, **kwargs)
+        self.last_activity = time.monotonic()
+        heartbeat().add(self)
+
+    async def websocket_receive(self, message):
+        self.last_activity = time.monotonic()
+        await super().websocket_receive(message)
+
+    async def websocket_disconnect(self, message):
+        heartbeat().discard(self)
+        await super().websocket_disconnect(message)
@@ -88,8 +88,16 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    # Présence (dernière activité) en mémoire, sans écriture de session
+    "accounts.middleware.UserActivityMiddleware",
 ]
 
+# Présence : un utilisateur est en ligne s'il a été vu dans les ONLINE_THRESHOLD
+# dernières secondes ; last_seen est écrit en base toutes les PRESENCE_FLUSH_INTERVAL secondes
+ONLINE_THRESHOLD = int(os.getenv("ONLINE_THRESHOLD", "300"))
+PRESENCE_TOUCH_INTERVAL = int(os.getenv("PRESENCE_TOUCH_INTERVAL", "30"))
+PRESENCE_FLUSH_INTERVAL = int(os.getenv("PRESENCE_FLUSH_INTERVAL", "60"))
+
 # ----------------------------------------------------
 # URLs / Templates
 # ----------------------------------------------------
@@ -117,12 +125,73 @@ TEMPLATES = [
 # ----------------------------------------------------
 ASGI_APPLICATION = "Plateforme.asgi.application"
 
-CHANNEL_LAYERS = {
+# "inmemory" : un seul processus ASGI ; "unix" : plusieurs workers par machine,
+# reliés par un broker sur socket Unix (voir Plateforme/channel_layer.py)
+CHANNEL_LAYER = os.getenv("CHANNEL_LAYER", "inmemory")
+
+if CHANNEL_LAYER == "unix":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "Plateforme.channel_layer.UnixSocketChannelLayer",
+            "CONFIG": {
+                "path": os.getenv("CHANNEL_LAYER_SOCKET", "/tmp/plateforme-channels.sock"),
+                "capacity": int(os.getenv("CHANNEL_LAYER_CAPACITY", "100")),
+                "expiry": int(os.getenv("CHANNEL_LAYER_EXPIRY", "60")),
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+
+# Nombre de publications par page du fil d'actualité QA (défilement infini)
+QA_FEED_PAGE_SIZE = int(os.getenv("QA_FEED_PAGE_SIZE", "10"))
+
+# WebSockets : ping serveur toutes les WEBSOCKET_HEARTBEAT_INTERVAL secondes,
+# fermeture des sockets muets depuis WEBSOCKET_IDLE_TIMEOUT secondes (Plateforme/heartbeat.py)
+WEBSOCKET_HEARTBEAT_INTERVAL = int(os.getenv("WEBSOCKET_HEARTBEAT_INTERVAL", "30"))
+WEBSOCKET_IDLE_TIMEOUT = int(os.getenv("WEBSOCKET_IDLE_TIMEOUT", "90"))
+
+# Notifications "à tous les utilisateurs" : créées par lots dans un thread de fond
+NOTIFICATION_FANOUT_ASYNC = os.getenv("NOTIFICATION_FANOUT_ASYNC", "True") == "True"
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.getenv("NOTIFICATION_FANOUT_CHUNK_SIZE", "1000"))
+# Likes et commentaires regroupés par destinataire et cible sur cette fenêtre (secondes),
+# poussés au plus une fois par intervalle de debounce
+NOTIFICATION_COALESCE_WINDOW = int(os.getenv("NOTIFICATION_COALESCE_WINDOW", str(60 * 60 * 24)))
+NOTIFICATION_PUSH_DEBOUNCE = int(os.getenv("NOTIFICATION_PUSH_DEBOUNCE", "5"))
+# Rétention (manage.py prune_notifications) : notifications lues archivées après
+# NOTIFICATION_RETENTION_DAYS jours, archives et annonces supprimées après
+# NOTIFICATION_ARCHIVE_RETENTION_DAYS jours
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_ARCHIVE_RETENTION_DAYS = int(os.getenv("NOTIFICATION_ARCHIVE_RETENTION_DAYS", "365"))
+
+# Chat : messages écrits par lots de CHAT_WRITE_BATCH_SIZE, au plus toutes les
+# CHAT_WRITE_INTERVAL secondes après leur diffusion
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "100"))
+CHAT_WRITE_INTERVAL = float(os.getenv("CHAT_WRITE_INTERVAL", "0.1"))
+# Messages affichés à l'ouverture d'une salle (les plus anciens sont chargés à la demande)
+CHAT_HISTORY_SIZE = int(os.getenv("CHAT_HISTORY_SIZE", "50"))
+
+# ----------------------------------------------------
+# Cache (mémoire locale par défaut, partagé via .env en production)
+# ----------------------------------------------------
+# Compteurs de notifications non lues, debounce des pushs et générations du cache
+# des pages de détail y sont gardés : avec plusieurs workers (CHANNEL_LAYER=unix),
+# CACHE_BACKEND doit être partagé (Redis, Memcached, base de données...), sinon le
+# démarrage échoue (notifications/checks.py)
+CACHES = {
     "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "plateforme-default"),
     }
 }
 
+# Durée de vie des fragments des pages de détail des ressources (secondes)
+RESOURCE_DETAIL_CACHE_TIMEOUT = int(os.getenv("RESOURCE_DETAIL_CACHE_TIMEOUT", str(60 * 60 * 24)))
+
 # ----------------------------------------------------
 # Base de données (PostgreSQL via .env)
 # ----------------------------------------------------
@@ -187,6 +256,10 @@ STATIC_ROOT = str(BASE_DIR / "staticfiles")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Index positionnels des corpus (concordances), construits hors ligne : fichiers
+# générés, hors du dépôt et hors de MEDIA_ROOT (non servis)
+CORPUS_INDEX_ROOT = os.getenv("CORPUS_INDEX_ROOT", os.path.join(BASE_DIR, "var", "corpus_index"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # ----------------------------------------------------
@@ -206,6 +279,16 @@ else:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
     DEFAULT_FROM_EMAIL = "webmaster@localhost"
 
+# Destinataire des messages du formulaire de contact (vide : pas d'email)
+ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "")
+
+# File d'envoi des emails : la requête insère, la commande send_queued_mail envoie.
+# False : envoi direct dans la requête (développement sans worker)
+EMAIL_QUEUE_ENABLED = os.getenv("EMAIL_QUEUE_ENABLED", "True") == "True"
+# Débit maximal (emails par seconde) et nombre de tentatives avant abandon
+EMAIL_QUEUE_RATE_LIMIT = float(os.getenv("EMAIL_QUEUE_RATE_LIMIT", "5"))
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv("EMAIL_QUEUE_MAX_ATTEMPTS", "5"))
+
 # ----------------------------------------------------
 # Elasticsearch (via .env)
 # ----------------------------------------------------
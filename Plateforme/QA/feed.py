@@ -0,0 +1,78 @@
+"""
+News feed of the QA posts.
+
+The feed is read page by page, newest first, with a keyset cursor on
+``(created_at, id)`` (index ``qa_post_feed_idx``): a page costs the same
+whatever its depth, and posts published meanwhile do not shift the next
+pages. One query returns the posts with their author, like and comment
+counts (the like count is a column, see ``QA.likes``) and whether the
+reader liked them; one more query fetches the first
+``FEED_COMMENTS`` comments of every post of the page with their authors.
+"""
+import uuid
+
+from django.conf import settings
+from django.db.models import Count, Exists, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Post
+
+FEED_PAGE_SIZE = getattr(settings, 'QA_FEED_PAGE_SIZE', 10)
+FEED_COMMENTS = 3
+
+
+def encode_cursor(post):
+    """Keyset cursor of ``post``: ``"<created_at ISO>_<id>"``."""
+    return f"{post.created_at.isoformat()}_{post.id}"
+
+
+def decode_cursor(value):
+    """``(created_at, id)`` of a cursor, ``None`` if it is invalid."""
+    try:
+        created_at, post_id = value.rsplit('_', 1)
+        created_at = parse_datetime(created_at)
+        post_id = uuid.UUID(post_id)
+    except (AttributeError, ValueError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, post_id
+
+
+def _count(queryset):
+    # Sous-requête corrélée : pas de jointure qui multiplierait les lignes
+    return Coalesce(
+        Subquery(queryset.order_by().values('post').annotate(n=Count('*')).values('n'), output_field=IntegerField()),
+        0,
+    )
+
+
+def annotated_posts(user):
+    """Posts with ``num_comments``, ``is_liked`` (by ``user``) and their author."""
+    likes = Post.likes.through.objects.filter(post=OuterRef('pk'))
+    return Post.objects.select_related('author').annotate(
+        num_comments=_count(Comment.objects.filter(post=OuterRef('pk'))),
+        is_liked=Exists(likes.filter(**{Post.likes.field.m2m_reverse_field_name(): user.pk})),
+    )
+
+
+def feed_page(user, before=None, limit=FEED_PAGE_SIZE):
+    """
+    The ``limit`` posts preceding the ``before`` cursor (the latest ones
+    without cursor), newest first, each with its first comments in
+    ``preview_comments``.
+
+    Returns ``(posts, has_more)``.
+    """
+    queryset = annotated_posts(user)
+    if before is not None:
+        created_at, post_id = before
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=post_id))
+    queryset = queryset.prefetch_related(Prefetch(
+        'comments',
+        queryset=Comment.objects.select_related('author').order_by('-created_at')[:FEED_COMMENTS],
+        to_attr='preview_comments',
+    ))
+    page = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+    return page[:limit], len(page) > limit
@@ -0,0 +1,81 @@
+"""
+Likes of the posts and comments.
+
+``Post.like_count`` and ``Comment.like_count`` are denormalized counters.
+``toggle`` runs in one transaction: it deletes the like row (the unique
+``(object, user)`` index of the ``likes`` table makes it a single index
+lookup), inserts it if there was none, and moves the counter with an ``F()``
+expression. The cost is the same whatever the number of likers, and two
+concurrent clicks of the same user cannot count twice: the second insert
+hits the unique index and is treated as "already liked".
+
+Rows changed outside ``toggle`` (admin site, deleted users) are caught up
+by ``reconcile()``, run by the ``reconcile_like_counts`` command.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Post
+
+RECONCILE_BATCH_SIZE = 500
+
+
+def _fields(model):
+    """``(object, user)`` column names of the ``likes`` table of ``model``."""
+    field = model.likes.field
+    return f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+
+
+def toggle(obj, user):
+    """Like ``obj`` (a post or a comment) as ``user``, or unlike it; returns ``(liked, like_count)``."""
+    model = type(obj)
+    through = model.likes.through
+    object_field, user_field = _fields(model)
+    row = {object_field: obj.pk, user_field: user.pk}
+    with transaction.atomic():
+        if through.objects.filter(**row).delete()[0]:
+            liked, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    through.objects.create(**row)
+                liked, delta = True, 1
+            except IntegrityError:
+                # Like concurrent du même utilisateur déjà enregistré
+                liked, delta = True, 0
+        if delta:
+            model.objects.filter(pk=obj.pk).update(like_count=Greatest(F('like_count') + delta, Value(0)))
+        obj.like_count = model.objects.filter(pk=obj.pk).values_list('like_count', flat=True).get()
+    return liked, obj.like_count
+
+
+def liked_ids(user, objects):
+    """Ids of the ``objects`` (posts or comments of one model) that ``user`` liked, in one query."""
+    objects = list(objects)
+    if not objects or not user.is_authenticated:
+        return set()
+    object_field, user_field = _fields(type(objects[0]))
+    return set(type(objects[0]).likes.through.objects.filter(
+        **{f'{object_field}__in': [obj.pk for obj in objects], user_field: user.pk}
+    ).values_list(object_field, flat=True))
+
+
+def _reconcile(model):
+    object_field, _ = _fields(model)
+    likes = model.likes.through.objects.filter(**{object_field: OuterRef('pk')}).order_by()
+    expected = Coalesce(
+        Subquery(likes.values(object_field).annotate(n=Count('*')).values('n'), output_field=IntegerField()),
+        0,
+    )
+    drifted = list(
+        model.objects.annotate(expected=expected).exclude(like_count=F('expected')).values_list('pk', flat=True)
+    )
+    for start in range(0, len(drifted), RECONCILE_BATCH_SIZE):
+        model.objects.filter(pk__in=drifted[start:start + RECONCILE_BATCH_SIZE]).update(like_count=expected)
+    return len(drifted)
+
+
+def reconcile():
+    """Recompute ``like_count`` from the ``likes`` tables; returns ``(posts, comments)`` fixed."""
+    return _reconcile(Post), _reconcile(Comment)
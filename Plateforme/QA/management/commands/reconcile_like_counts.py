@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from QA.likes import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute the like counters of the QA posts and comments from their likes"
+
+    def handle(self, *args, **options):
+        posts, comments = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"{posts} post(s) and {comments} comment(s) fixed"))
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-19 19:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_like_counts(apps, schema_editor):
+    for name in ('Post', 'Comment'):
+        model = apps.get_model('QA', name)
+        field = model._meta.get_field('likes')
+        object_field = field.m2m_field_name()
+        likes = field.remote_field.through.objects.filter(**{object_field: OuterRef('pk')}).order_by()
+        model.objects.update(like_count=Coalesce(
+            Subquery(likes.values(object_field).annotate(n=Count('*')).values('n'), output_field=IntegerField()),
+            0,
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('QA', '0003_post_feed_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_like_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-like_count', '-created_at'], name='qa_post_popular_idx'),
+        ),
+    ]
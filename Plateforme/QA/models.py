@@ -33,12 +33,20 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     likes = models.ManyToManyField(get_user_model(), related_name='liked_posts', blank=True)
+    # Nombre de likes, tenu à jour par QA.likes
+    like_count = models.PositiveIntegerField(default=0, editable=False)
     slug = models.SlugField(unique=True, blank=True, max_length=255)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Publication"
         verbose_name_plural = "Publications"
+        indexes = [
+            # Fil d'actualité paginé par curseur (QA.feed)
+            models.Index(fields=['-created_at', '-id'], name='qa_post_feed_idx'),
+            # Publications populaires (les plus likées)
+            models.Index(fields=['-like_count', '-created_at'], name='qa_post_popular_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -52,7 +60,7 @@ class Post(models.Model):
         return reverse('QA:post_detail', kwargs={'slug': self.slug})
 
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
 
     def total_comments(self):
         return self.comments.count()
@@ -65,6 +73,8 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     likes = models.ManyToManyField(get_user_model(), related_name='liked_comments', blank=True)
+    # Nombre de likes, tenu à jour par QA.likes
+    like_count = models.PositiveIntegerField(default=0, editable=False)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
 
     class Meta:
@@ -76,7 +86,7 @@ class Comment(models.Model):
         return f"Commentaire de {self.author.full_name} sur {self.post}"
 
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
 
     def total_replies(self):
         return self.replies.count()
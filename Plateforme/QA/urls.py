@@ -9,6 +9,7 @@ urlpatterns = [
     path('question/<int:pk>/', views.question_detail, name='question_detail'),
     path('search/', views.search_questions, name='search'),
     path('feed/', views.feed, name='feed'),
+    path('feed/page/', views.feed_page_json, name='feed_page'),
     path('post/create/', views.create_post, name='create_post'),
     path('post/<slug:slug>/', views.post_detail, name='post_detail'),
     path('post/<uuid:post_id>/comment/', views.add_comment, name='add_comment'),
@@ -1,5 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from .models import Question, Post, Comment
+from .feed import decode_cursor, encode_cursor, feed_page
+from .likes import liked_ids, toggle
 from .forms import QuestionForm, AnswerForm, PostForm, CommentForm
 from django.db.models import Q, Count
 from django.contrib.auth import get_user_model
@@ -8,6 +10,7 @@ from notifications.services import NotificationService
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
 from django.db import models
 from django.urls import reverse
@@ -91,9 +94,7 @@ def search_questions(request):
 
 def qa_home(request):
     # Posts populaires (les plus likés)
-    popular_posts = Post.objects.annotate(
-        like_count=models.Count('likes')
-    ).order_by('-like_count', '-created_at')[:5]
+    popular_posts = Post.objects.order_by('-like_count', '-created_at')[:5]
 
     # Posts récents
     recent_posts = Post.objects.order_by('-created_at')[:5]
@@ -119,16 +120,37 @@ def qa_home(request):
 @login_required
 @login_and_verified_required
 def feed(request):
-    posts = Post.objects.all()
+    # Première page seulement ; la suite est chargée par feed_page_json
+    posts, has_more = feed_page(request.user)
     post_form = PostForm()
     comment_form = CommentForm()
     return render(request, 'QA/feed.html', {
         'posts': posts,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(posts[-1]) if posts else '',
         'post_form': post_form,
         'comment_form': comment_form,
         'page': 'feed'
     })
 
+@login_required
+@login_and_verified_required
+def feed_page_json(request):
+    """Posts following the ``before`` cursor, rendered for the infinite scroll of the feed."""
+    before = decode_cursor(request.GET.get('before'))
+    if before is None:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    posts, has_more = feed_page(request.user, before=before)
+    html = ''.join(
+        render_to_string('QA/partials/post_card.html', {'post': post}, request=request)
+        for post in posts
+    )
+    return JsonResponse({
+        'html': html,
+        'has_more': has_more,
+        'cursor': encode_cursor(posts[-1]) if posts else None,
+    })
+
 @login_required
 @login_and_verified_required
 def create_post(request):
@@ -153,6 +175,9 @@ def post_detail(request, slug):
     comment_form = CommentForm()
     return render(request, 'QA/post_detail.html', {
         'post': post,
+        # Likes de l'utilisateur : deux recherches indexées au lieu de charger tous les likeurs
+        'post_liked': bool(liked_ids(request.user, [post])),
+        'liked_comment_ids': liked_ids(request.user, post.comments.only('pk')),
         'comment_form': comment_form,
         'page': 'feed'
     })
@@ -176,11 +201,13 @@ def add_comment(request, post_id):
             
             # Notification à l'auteur du commentaire parent
             if parent_comment.author != request.user:
-                NotificationService.create_notification(
+                NotificationService.create_coalesced(
                     recipient=parent_comment.author,
                     notification_type='comment_reply',
                     title="New reply to your comment",
-                    message=f"{request.user.full_name} replied to your comment.",
+                    actor=request.user,
+                    action="replied to your comment.",
+                    group_key=f"reply:comment:{parent_comment.id}",
                     related_object=post
                 )
         
@@ -188,11 +215,13 @@ def add_comment(request, post_id):
         
         # Notification à l'auteur du post si ce n'est pas le même utilisateur
         if post.author != request.user and not parent_id:
-            NotificationService.create_notification(
+            NotificationService.create_coalesced(
                 recipient=post.author,
                 notification_type='comment',
                 title="New comment",
-                message=f"{request.user.full_name} commented on your post.",
+                actor=request.user,
+                action="commented on your post.",
+                group_key=f"comment:post:{post.id}",
                 related_object=post
             )
         
@@ -217,61 +246,62 @@ def add_comment(request, post_id):
 @require_POST
 @login_and_verified_required
 def like_post(request, post_id):
-    print(f"Like post appelé pour post_id: {post_id}")
-    post = get_object_or_404(Post, id=post_id)
-    print(f"Post trouvé: {post}")
-    
-    if request.user in post.likes.all():
-        print(f"User {request.user} remove your like")
-        post.likes.remove(request.user)
-        liked = False
-    else:
-        print(f"User {request.user} add a like")
-        post.likes.add(request.user)
-        liked = True
-        
-        # Notification à l'auteur du post si ce n'est pas le même utilisateur
-        if post.author != request.user:
-            NotificationService.create_notification(
-                recipient=post.author,
-                notification_type='like',
-                title="New I like",
-                message=f"{request.user.full_name} liked your post.",
-                related_object=post
-            )
-    
-    response_data = {
+    post = get_object_or_404(Post.objects.select_related('author'), id=post_id)
+    liked, total_likes = toggle(post, request.user)
+
+    # Notification à l'auteur du post si ce n'est pas le même utilisateur
+    if liked and post.author != request.user:
+        NotificationService.create_coalesced(
+            recipient=post.author,
+            notification_type='like',
+            title="New I like",
+            actor=request.user,
+            action="liked your post.",
+            group_key=f"like:post:{post.id}",
+            related_object=post
+        )
+    elif not liked and post.author != request.user:
+        NotificationService.withdraw_coalesced(
+            recipient=post.author,
+            actor=request.user,
+            action="liked your post.",
+            group_key=f"like:post:{post.id}",
+        )
+
+    return JsonResponse({
         'liked': liked,
-        'total_likes': post.total_likes()
-    }
-    print(f"Response sent: {response_data}")
-    return JsonResponse(response_data)
+        'total_likes': total_likes
+    })
 
 @login_required
 @require_POST
 @login_and_verified_required
 def like_comment(request, comment_id):
-    comment = get_object_or_404(Comment, id=comment_id)
-    if request.user in comment.likes.all():
-        comment.likes.remove(request.user)
-        liked = False
-    else:
-        comment.likes.add(request.user)
-        liked = True
-        
-        # Notification à l'auteur du commentaire si ce n'est pas le même utilisateur
-        if comment.author != request.user:
-            NotificationService.create_notification(
-                recipient=comment.author,
-                notification_type='like',
-                title="New I like",
-                message=f"{request.user.full_name} liked your comment.",
-                related_object=comment.post
-            )
-    
+    comment = get_object_or_404(Comment.objects.select_related('author', 'post'), id=comment_id)
+    liked, total_likes = toggle(comment, request.user)
+
+    # Notification à l'auteur du commentaire si ce n'est pas le même utilisateur
+    if liked and comment.author != request.user:
+        NotificationService.create_coalesced(
+            recipient=comment.author,
+            notification_type='like',
+            title="New I like",
+            actor=request.user,
+            action="liked your comment.",
+            group_key=f"like:comment:{comment.id}",
+            related_object=comment.post
+        )
+    elif not liked and comment.author != request.user:
+        NotificationService.withdraw_coalesced(
+            recipient=comment.author,
+            actor=request.user,
+            action="liked your comment.",
+            group_key=f"like:comment:{comment.id}",
+        )
+
     return JsonResponse({
         'liked': liked,
-        'total_likes': comment.total_likes()
+        'total_likes': total_likes
     })
 
 @login_required
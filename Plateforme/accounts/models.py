@@ -49,6 +49,8 @@ class CustomUser(AbstractUser):
     facebook_url = models.URLField(max_length=200, blank=True, null=True)
     is_verified = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    # Dernière activité, écrite par lots par accounts.presence
+    last_seen = models.DateTimeField(null=True, blank=True, db_index=True)
 
     objects = CustomUserManager()
 
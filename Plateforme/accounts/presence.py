@@ -0,0 +1,104 @@
+"""
+Presence of the users ("last seen", "who's online").
+
+``touch()`` records activity in a dict of the process, at most once per
+``PRESENCE_TOUCH_INTERVAL`` for a user: no session, cache or database write
+on the request path. A background thread writes the buffered dates to
+``CustomUser.last_seen`` every ``PRESENCE_FLUSH_INTERVAL`` seconds, in one
+``UPDATE`` per batch of users.
+
+A user is online if seen in the last ``ONLINE_THRESHOLD`` seconds: the
+indexed ``last_seen`` column, lagging by at most one flush interval, plus
+the not yet flushed dates of this process.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Case, DateTimeField, Q, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ONLINE_THRESHOLD = getattr(settings, 'ONLINE_THRESHOLD', 300)
+TOUCH_INTERVAL = getattr(settings, 'PRESENCE_TOUCH_INTERVAL', 30)
+FLUSH_INTERVAL = getattr(settings, 'PRESENCE_FLUSH_INTERVAL', 60)
+FLUSH_BATCH_SIZE = 500
+
+_lock = threading.Lock()
+# user_id -> dernière activité pas encore écrite en base
+_pending = {}
+# user_id -> time.monotonic() du dernier touch pris en compte
+_touched = {}
+_flusher = None
+
+
+def touch(user_id):
+    """Record that ``user_id`` is active now."""
+    now = time.monotonic()
+    last = _touched.get(user_id)
+    if last is not None and now - last < TOUCH_INTERVAL:
+        return
+    with _lock:
+        _touched[user_id] = now
+        _pending[user_id] = timezone.now()
+    _start_flusher()
+
+
+def flush():
+    """Write the buffered dates to ``last_seen``; returns the number of users updated."""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        # Oublie les utilisateurs inactifs depuis longtemps
+        horizon = time.monotonic() - ONLINE_THRESHOLD
+        for user_id in [user_id for user_id, last in _touched.items() if last < horizon]:
+            del _touched[user_id]
+    if not pending:
+        return 0
+    User = get_user_model()
+    items = list(pending.items())
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        batch = items[start:start + FLUSH_BATCH_SIZE]
+        User.objects.filter(pk__in=[user_id for user_id, _ in batch]).update(last_seen=Case(
+            *[When(pk=user_id, then=Value(seen)) for user_id, seen in batch],
+            output_field=DateTimeField(),
+        ))
+    return len(items)
+
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception as e:
+            logger.warning("Presence flush failed: %s", e)
+        finally:
+            connections.close_all()
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_forever, name='presence-flush', daemon=True)
+            _flusher.start()
+            atexit.register(flush)
+
+
+def online_users(queryset=None):
+    """Users of ``queryset`` (all users by default) seen in the last ``ONLINE_THRESHOLD`` seconds."""
+    if queryset is None:
+        queryset = get_user_model().objects.all()
+    cutoff = timezone.now() - timedelta(seconds=ONLINE_THRESHOLD)
+    with _lock:
+        recent = [user_id for user_id, seen in _pending.items() if seen >= cutoff]
+    return queryset.filter(Q(last_seen__gte=cutoff) | Q(pk__in=recent))
@@ -5,7 +5,6 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth import get_user_model
 from django.contrib.auth import login, logout
 from django.http import HttpResponse, HttpResponseRedirect
-from django.core.mail import send_mail
 from django.utils import timezone
 from django.conf import settings
 from django.views import View
@@ -14,6 +13,7 @@ from django.contrib import messages
 from projects.models import Project, ProjectMember
 from notifications.models import Notification
 from notifications.services import NotificationService
+from notifications.mailqueue import queue_mail
 from functools import wraps
 from django.shortcuts import redirect
 from django.urls import reverse
@@ -48,8 +48,8 @@ class SignUp(CreateView):
         user.is_active = False  # désactive le compte temporairement
         user.generate_verification_code()
         
-        # Envoi de l'email avec le code
-        send_mail(
+        # Envoi de l'email avec le code (mis en file, envoyé par send_queued_mail)
+        queue_mail(
             subject='Verifying your email address',
             message=f'Your verification code is : {user.email_verification_code}',
             from_email=settings.DEFAULT_FROM_EMAIL,
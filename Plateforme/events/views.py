@@ -139,10 +139,7 @@ class EventCreateView(LoginRequiredMixin, CreateView):
         if self.object.is_approved:
             messages.success(self.request, _('Event created successfully!'))
             # Notifier tous les utilisateurs actifs
-            User = get_user_model()
-            active_users = User.objects.filter(is_active=True)
-            NotificationService.notify_group(
-                active_users,
+            NotificationService.notify_all_users(
                 'EVENT_APPROVED',
                 f"New event approved : {self.object.title}",
                 f"A new event has been approved: {self.object.title}. Date : {self.object.start_date}",
@@ -289,10 +286,7 @@ def event_validate(request, pk):
     )
     
     # Notifier tous les utilisateurs actifs
-    User = get_user_model()
-    active_users = User.objects.filter(is_active=True)
-    NotificationService.notify_group(
-        active_users,
+    NotificationService.notify_all_users(
         'EVENT_APPROVED',
         f"New event approved : {event.title}",
         f"A new event has been approved : {event.title}. Date : {event.start_date}",
@@ -0,0 +1,228 @@
+"""
+Live chat state shared by the ``ChatroomConsumer`` instances of a process.
+
+Ban sets
+    The banned users of a chatroom are loaded once per process, when the
+    first socket of this process joins the room, and kept while sockets of
+    the room remain; later sockets of the room connect without any query. ``BanUserView`` and ``UnbanUserView`` publish a
+    ``chat_ban`` event to the room group (``notify_ban``); every consumer of
+    the room receives it and updates the shared set, so each process holding
+    a set is invalidated. Sets are also reloaded after ``BAN_CACHE_TIMEOUT``
+    in case an event was dropped by the channel layer.
+
+Write-behind persistence
+    Messages are broadcast as soon as they are received and queued to the
+    ``MessageWriter`` of the event loop, which inserts them with
+    ``bulk_create`` every ``CHAT_WRITE_INTERVAL`` seconds or
+    ``CHAT_WRITE_BATCH_SIZE`` messages. Ids and timestamps are set before the
+    broadcast and batches are written one after the other, so the stored
+    order is the broadcast order. Messages received less than
+    ``CHAT_WRITE_INTERVAL`` before a worker crash are lost.
+
+History
+    A chatroom page renders its last ``CHAT_HISTORY_SIZE`` messages; older
+    ones are fetched page by page with ``history(before=cursor)``, a keyset
+    query on the ``(chatroom, timestamp, id)`` index.
+"""
+import asyncio
+import logging
+import time
+import uuid
+import weakref
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .counters import messages_added
+from .models import BannedUser, ChatRoom, Message
+
+logger = logging.getLogger(__name__)
+
+BAN_CACHE_TIMEOUT = 300
+WRITE_BATCH_SIZE = getattr(settings, 'CHAT_WRITE_BATCH_SIZE', 100)
+WRITE_INTERVAL = getattr(settings, 'CHAT_WRITE_INTERVAL', 0.1)
+HISTORY_SIZE = getattr(settings, 'CHAT_HISTORY_SIZE', 50)
+
+
+def room_group(chatroom_id):
+    return f'chat_{chatroom_id}'
+
+
+def _banned_user_ids(chatroom_id):
+    """Banned user ids of the chatroom, ``None`` if it does not exist."""
+    try:
+        if not ChatRoom.objects.filter(pk=chatroom_id).exists():
+            return None
+    except ValidationError:
+        # Identifiant invalide (pas un UUID)
+        return None
+    return {str(user_id) for user_id in BannedUser.objects.filter(chatroom_id=chatroom_id).values_list('user_id', flat=True)}
+
+
+class BanCache:
+    """Banned user ids of the chatrooms with an open socket in this process."""
+
+    def __init__(self):
+        # chatroom_id -> {"banned": set (None : salle inexistante), "loaded_at": float, "sockets": int}
+        self._rooms = {}
+
+    async def _load(self, chatroom_id):
+        # None : salle inexistante ou supprimée, plus rien n'y est accepté
+        banned = await database_sync_to_async(_banned_user_ids)(chatroom_id)
+        room = self._rooms.setdefault(chatroom_id, {'sockets': 0})
+        room['banned'] = banned
+        room['loaded_at'] = time.monotonic()
+        return room
+
+    async def join(self, chatroom_id):
+        """Count a socket in the chatroom; ``False`` if the chatroom does not exist."""
+        room = self._rooms.get(chatroom_id)
+        if room is None or 'banned' not in room:
+            room = await self._load(chatroom_id)
+        if room['banned'] is None:
+            if room['sockets'] <= 0:
+                self._rooms.pop(chatroom_id, None)
+            return False
+        room['sockets'] += 1
+        return True
+
+    def leave(self, chatroom_id):
+        room = self._rooms.get(chatroom_id)
+        if room is None:
+            return
+        room['sockets'] -= 1
+        if room['sockets'] <= 0:
+            # Plus aucun socket de la salle ici : on ne recevrait plus les invalidations
+            del self._rooms[chatroom_id]
+
+    async def is_banned(self, chatroom_id, user_id):
+        room = self._rooms.get(chatroom_id)
+        if room is None or time.monotonic() - room['loaded_at'] > BAN_CACHE_TIMEOUT:
+            room = await self._load(chatroom_id)
+        return room['banned'] is None or str(user_id) in room['banned']
+
+    def update(self, chatroom_id, user_id, banned):
+        room = self._rooms.get(chatroom_id)
+        if room is None or room['banned'] is None:
+            return
+        if banned:
+            room['banned'].add(str(user_id))
+        else:
+            room['banned'].discard(str(user_id))
+
+
+bans = BanCache()
+
+
+def notify_ban(chatroom_id, user_id, banned):
+    """Tell the sockets of the chatroom, once the transaction commits, that ``user_id`` was (un)banned."""
+    def send():
+        try:
+            async_to_sync(get_channel_layer().group_send)(room_group(chatroom_id), {
+                'type': 'chat_ban',
+                'user_id': str(user_id),
+                'banned': banned,
+            })
+        except Exception as e:
+            # Le cache des sockets sera rechargé au plus tard après BAN_CACHE_TIMEOUT
+            logger.warning("Chat ban event failed: %s", e)
+
+    transaction.on_commit(send)
+
+
+def encode_cursor(message):
+    """Keyset cursor of ``message``: ``"<timestamp ISO>_<id>"``."""
+    return f"{message.timestamp.isoformat()}_{message.id}"
+
+
+def decode_cursor(value):
+    """``(timestamp, id)`` of a cursor, ``None`` if it is invalid."""
+    try:
+        timestamp, message_id = value.rsplit('_', 1)
+        timestamp = parse_datetime(timestamp)
+        message_id = uuid.UUID(message_id)
+    except (AttributeError, ValueError):
+        return None
+    if timestamp is None:
+        return None
+    return timestamp, message_id
+
+
+def history(chatroom_id, before=None, limit=HISTORY_SIZE):
+    """
+    The ``limit`` messages of the chatroom preceding the ``before`` cursor
+    (the latest ones without cursor), oldest first, with their authors.
+
+    Returns ``(messages, has_more)``.
+    """
+    queryset = Message.objects.filter(chatroom_id=chatroom_id).select_related('user')
+    if before is not None:
+        timestamp, message_id = before
+        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id))
+    page = list(queryset.order_by('-timestamp', '-id')[:limit + 1])
+    return page[:limit][::-1], len(page) > limit
+
+
+def persist(messages):
+    """Insert ``messages`` in one query, one by one if the batch fails, and count them."""
+    try:
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+            messages_added(messages)
+    except Exception as e:
+        logger.warning("Chat batch insert failed (%s), inserting messages one by one", e)
+        for message in messages:
+            try:
+                with transaction.atomic():
+                    message.save(force_insert=True)
+                    messages_added([message])
+            except Exception as e:
+                logger.error("Chat message %s lost: %s", message.id, e)
+
+
+class MessageWriter:
+    """Write-behind queue of the messages received by the consumers of one event loop."""
+
+    def __init__(self, batch_size=WRITE_BATCH_SIZE, interval=WRITE_INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = []
+        self.written = 0
+        self._task = None
+
+    def add(self, message):
+        self.pending.append(message)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self.pending:
+            if len(self.pending) < self.batch_size:
+                await asyncio.sleep(self.interval)
+            batch = self.pending[:self.batch_size]
+            self.pending = self.pending[self.batch_size:]
+            await database_sync_to_async(persist)(batch)
+            self.written += len(batch)
+
+    async def flush(self):
+        """Wait until every queued message is written."""
+        while self._task is not None and not self._task.done():
+            await self._task
+
+
+_writers = weakref.WeakKeyDictionary()
+
+
+def message_writer():
+    """``MessageWriter`` of the running event loop."""
+    loop = asyncio.get_running_loop()
+    writer = _writers.get(loop)
+    if writer is None:
+        writer = _writers[loop] = MessageWriter()
+    return writer
@@ -1,74 +1,93 @@
 # consumers.py
-from channels.generic.websocket import WebsocketConsumer
-from django.shortcuts import get_object_or_404
-from django.template.loader import render_to_string
-from asgiref.sync import async_to_sync
 import json
-from .models import ChatRoom, Message, BannedUser
+import logging
+import uuid
 
-class ChatroomConsumer(WebsocketConsumer):
-    def connect(self):
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.utils import timezone
+
+from accounts.presence import touch
+from Plateforme.heartbeat import HeartbeatMixin
+
+from .chat import bans, message_writer, room_group
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+
+class ChatroomConsumer(HeartbeatMixin, AsyncWebsocketConsumer):
+    """
+    Live messages of a chatroom.
+
+    Existence and ban checks use the per-process ban set of ``forum.chat``
+    (no query once a socket of this process is in the room), and messages
+    are broadcast before being written by the write-behind ``MessageWriter``.
+    """
+
+    async def connect(self):
         self.user = self.scope['user']
-        
+
         # Vérifier si l'utilisateur est authentifié
         if not self.user.is_authenticated:
-            self.close()
+            await self.close()
             return
-            
-        self.chatroom_id = self.scope['url_route']['kwargs']['chatroom_id']
-        
-        try:
-            self.chatroom = get_object_or_404(ChatRoom, id=self.chatroom_id)
-        except:
-            self.close()
+
+        self.chatroom_id = str(self.scope['url_route']['kwargs']['chatroom_id'])
+
+        # Use the chatroom ID as the channel group name
+        self.room_group_name = room_group(self.chatroom_id)
+
+        # Rejoindre le groupe avant de charger les bannis : aucune invalidation n'est perdue
+        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        if not await bans.join(self.chatroom_id):
+            # Salle inexistante
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+            await self.close()
             return
-        
+        self.joined = True
+
         # Vérifier si l'utilisateur est banni
-        if BannedUser.objects.filter(chatroom=self.chatroom, user=self.user).exists():
-            self.close()
+        if await bans.is_banned(self.chatroom_id, self.user.id):
+            await self.disconnect(None)
+            await self.close()
             return
-        
-        # Use the chatroom ID as the channel group name
-        self.room_group_name = f'chat_{self.chatroom_id}'
-        
-        # Join the channel group
-        async_to_sync(self.channel_layer.group_add)(
-            self.room_group_name, 
-            self.channel_name
-        )
-        
-        self.accept()
-    
-    def disconnect(self, close_code):
+
+        await self.accept()
+        touch(self.user.id)
+
+    async def disconnect(self, close_code):
         # Leave the channel group
-        if hasattr(self, 'room_group_name'):
-            async_to_sync(self.channel_layer.group_discard)(
-                self.room_group_name, 
-                self.channel_name
-            )
-    
-    def receive(self, text_data):
+        if getattr(self, 'joined', False):
+            self.joined = False
+            bans.leave(self.chatroom_id)
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+
+    async def receive(self, text_data):
         try:
             text_data_json = json.loads(text_data)
             message_content = text_data_json.get('message', '').strip()
-            
+
             # Vérifier que le message n'est pas vide
             if not message_content:
                 return
-            
-            # Vérifier à nouveau si l'utilisateur est banni (sécurité)
-            if BannedUser.objects.filter(chatroom=self.chatroom, user=self.user).exists():
+
+            # Vérifier à nouveau si l'utilisateur est banni (sécurité, en mémoire)
+            if await bans.is_banned(self.chatroom_id, self.user.id):
                 return
-            
-            # Create a new message in the database
-            message = Message.objects.create(
-                chatroom=self.chatroom,
-                user=self.user,
-                content=message_content
+
+            touch(self.user.id)
+
+            # Id et date fixés ici : l'ordre diffusé est celui de l'écriture
+            message = Message(
+                id=uuid.uuid4(),
+                chatroom_id=self.chatroom_id,
+                user_id=self.user.id,
+                content=message_content,
+                timestamp=timezone.now(),
             )
-            
+
             # Send the message to the channel group
-            async_to_sync(self.channel_layer.group_send)(
+            await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     'type': 'chat_message',
@@ -76,22 +95,24 @@ class ChatroomConsumer(WebsocketConsumer):
                     'content': message.content,
                     'user_id': str(self.user.id),
                     'user_name': str(self.user),
-                    'timestamp': message.timestamp.strftime('%d/%m/%Y %H:%M'),
+                    'timestamp': timezone.localtime(message.timestamp).strftime('%d/%m/%Y %H:%M'),
                     'is_edited': message.is_edited,
                     'profile_url': f'/accounts/profile/{self.user.id}/'  # Ajout de l'URL du profil
                 }
             )
-            
+
+            # Écriture différée, par lots
+            message_writer().add(message)
+
         except json.JSONDecodeError:
             # Ignorer les messages mal formatés
             pass
         except Exception as e:
-            # Log l'erreur en production
-            print(f"Erreur dans ChatroomConsumer.receive: {e}")
-    
-    def chat_message(self, event):
+            logger.exception("Erreur dans ChatroomConsumer.receive: %s", e)
+
+    async def chat_message(self, event):
         # Send the message to the WebSocket
-        self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps({
             'message_id': event['message_id'],
             'content': event['content'],
             'user_id': event['user_id'],
@@ -100,4 +121,10 @@ class ChatroomConsumer(WebsocketConsumer):
             'is_current_user': str(self.user.id) == event['user_id'],
             'is_edited': event.get('is_edited', False),
             'profile_url': event.get('profile_url', '#')
-        }))
\ No newline at end of file
+        }))
+
+    async def chat_ban(self, event):
+        # Publié par BanUserView / UnbanUserView (voir forum.chat.notify_ban)
+        bans.update(self.chatroom_id, event['user_id'], event['banned'])
+        if event['banned'] and event['user_id'] == str(self.user.id):
+            await self.close()
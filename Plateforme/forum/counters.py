@@ -0,0 +1,127 @@
+"""
+Denormalized counters of the forum.
+
+``ChatRoom.message_count``, ``Topic.message_count``, ``Topic.chatroom_count``
+and the ``last_message_at`` dates are maintained by the code paths creating
+or deleting messages and chatrooms, in the same transaction, with ``F()``
+expressions evaluated by the ``UPDATE`` itself: concurrent writers never
+overwrite each other's increments.
+
+``last_message_at`` is the date of the last message of a chatroom, or its
+creation date while it has none; for a topic it is the latest date of its
+chatrooms, or its creation date. It is never null, so listings sort by
+activity on a plain ``(-last_message_at)`` index.
+
+Deletions outside these paths (admin site, cascades of a user deletion,
+raw queries) are caught up by ``reconcile()``, run by the
+``reconcile_forum_counters`` command.
+"""
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ChatRoom, Message, Topic
+
+RECONCILE_BATCH_SIZE = 500
+
+
+def _minus(field, count):
+    # Jamais négatif, même si le compteur a dérivé (rattrapé par reconcile)
+    return Greatest(F(field) - count, Value(0))
+
+
+def messages_added(messages):
+    """Count ``messages``, just inserted, in their chatrooms and topics."""
+    rooms = {}
+    for message in messages:
+        count, last = rooms.get(message.chatroom_id, (0, message.timestamp))
+        rooms[message.chatroom_id] = (count + 1, max(last, message.timestamp))
+    for chatroom_id, (count, last) in rooms.items():
+        ChatRoom.objects.filter(pk=chatroom_id).update(
+            message_count=F('message_count') + count,
+            last_message_at=Greatest('last_message_at', Value(last)),
+        )
+        Topic.objects.filter(chatrooms=chatroom_id).update(
+            message_count=F('message_count') + count,
+            last_message_at=Greatest('last_message_at', Value(last)),
+        )
+
+
+def _room_last_message():
+    return Coalesce(
+        Subquery(Message.objects.filter(chatroom=OuterRef('pk')).order_by('-timestamp').values('timestamp')[:1]),
+        F('created_at'),
+    )
+
+
+def _topic_last_message():
+    return Coalesce(
+        Subquery(ChatRoom.objects.filter(topic=OuterRef('pk')).order_by('-last_message_at').values('last_message_at')[:1]),
+        F('created_at'),
+    )
+
+
+def messages_removed(chatroom_id, count=1):
+    """Uncount ``count`` messages just deleted from the chatroom."""
+    ChatRoom.objects.filter(pk=chatroom_id).update(
+        message_count=_minus('message_count', count),
+        last_message_at=_room_last_message(),
+    )
+    Topic.objects.filter(chatrooms=chatroom_id).update(
+        message_count=_minus('message_count', count),
+        last_message_at=_topic_last_message(),
+    )
+
+
+def chatroom_added(chatroom):
+    """Count ``chatroom``, just inserted, in its topic."""
+    Topic.objects.filter(pk=chatroom.topic_id).update(
+        chatroom_count=F('chatroom_count') + 1,
+        last_message_at=Greatest('last_message_at', Value(chatroom.last_message_at)),
+    )
+
+
+def chatroom_removed(chatroom):
+    """
+    Uncount ``chatroom``, just deleted, and its messages from its topic.
+
+    ``chatroom`` must have been locked (``select_for_update``) before the
+    deletion so that its ``message_count`` is final.
+    """
+    Topic.objects.filter(pk=chatroom.topic_id).update(
+        chatroom_count=_minus('chatroom_count', 1),
+        message_count=_minus('message_count', chatroom.message_count),
+        last_message_at=_topic_last_message(),
+    )
+
+
+def _aggregate(queryset, group, **aggregates):
+    """Correlated subquery computing one aggregate of ``queryset`` grouped by ``group``."""
+    (name, aggregate), = aggregates.items()
+    return Subquery(queryset.order_by().values(group).annotate(**{name: aggregate}).values(name))
+
+
+def _reconcile(model, **expected):
+    """Rewrite the counters of the ``model`` rows that differ from ``expected``; returns how many."""
+    queryset = model.objects.annotate(**{f'expected_{field}': value for field, value in expected.items()})
+    drifted = list(queryset.exclude(**{field: F(f'expected_{field}') for field in expected}).values_list('pk', flat=True))
+    for start in range(0, len(drifted), RECONCILE_BATCH_SIZE):
+        model.objects.filter(pk__in=drifted[start:start + RECONCILE_BATCH_SIZE]).update(**expected)
+    return len(drifted)
+
+
+def reconcile():
+    """Recompute every counter from the messages; returns ``(chatrooms, topics)`` fixed."""
+    messages = Message.objects.filter(chatroom=OuterRef('pk'))
+    chatrooms = _reconcile(
+        ChatRoom,
+        message_count=Coalesce(_aggregate(messages, 'chatroom', n=Count('pk')), 0),
+        last_message_at=Coalesce(_aggregate(messages, 'chatroom', last=Max('timestamp')), F('created_at')),
+    )
+    rooms = ChatRoom.objects.filter(topic=OuterRef('pk'))
+    topics = _reconcile(
+        Topic,
+        chatroom_count=Coalesce(_aggregate(rooms, 'topic', n=Count('pk')), 0),
+        message_count=Coalesce(_aggregate(rooms, 'topic', n=Sum('message_count')), 0),
+        last_message_at=Coalesce(_aggregate(rooms, 'topic', last=Max('last_message_at')), F('created_at')),
+    )
+    return chatrooms, topics
@@ -0,0 +1,101 @@
+import asyncio
+import statistics
+import time
+import uuid
+
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from forum import chat
+from forum.consumers import ChatroomConsumer
+from forum.models import ChatRoom, Message, Topic
+
+
+class Command(BaseCommand):
+    help = "Measure the chat messages per second one worker broadcasts and persists through ChatroomConsumer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=20, help="Sockets connected to the chatroom")
+        parser.add_argument('--messages', type=int, default=1000, help="Messages sent (round-robin over the clients)")
+        parser.add_argument('--window', type=int, default=50,
+                            help="Messages in flight (below the channel layer capacity)")
+        parser.add_argument('--batch-size', type=int, default=chat.WRITE_BATCH_SIZE, help="Write-behind batch size")
+        parser.add_argument('--interval', type=float, default=chat.WRITE_INTERVAL, help="Write-behind interval (s)")
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help="Also run with one INSERT per message (batch size 1, no delay)",
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        tag = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create_user(f'chat-bench-{tag}-{i}@example.invalid', None, full_name=f'Bench {i}')
+            for i in range(options['clients'])
+        ]
+        topic = Topic.objects.create(title=f'Chat benchmark {tag}', description='benchmark', creator=users[0])
+        chatroom = ChatRoom.objects.create(topic=topic, name=f'Chat benchmark {tag}', description='benchmark',
+                                           creator=users[0])
+        runs = [('write-behind', options['batch_size'], options['interval'])]
+        if options['compare']:
+            runs.append(('per message', 1, 0))
+        try:
+            self.stdout.write(
+                f"{'mode':<14} {'msg/s':>8} {'deliveries/s':>13} {'p50 ms':>8} {'p99 ms':>8} {'persisted/s':>12} {'rows':>7}"
+            )
+            for name, batch_size, interval in runs:
+                Message.objects.filter(chatroom=chatroom).delete()
+                result = asyncio.run(self._run(chatroom, users, options['messages'], options['window'], batch_size, interval))
+                rate, deliveries, latencies, persisted = result
+                rows = Message.objects.filter(chatroom=chatroom).count()
+                self.stdout.write(
+                    f"{name:<14} {rate:>8.0f} {deliveries:>13.0f} {statistics.median(latencies):>8.2f} "
+                    f"{sorted(latencies)[int(len(latencies) * 0.99) - 1]:>8.2f} {persisted:>12.0f} {rows:>7}"
+                )
+        finally:
+            topic.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    async def _run(self, chatroom, users, count, window, batch_size, interval):
+        writer = chat.MessageWriter(batch_size, interval)
+        chat._writers[asyncio.get_running_loop()] = writer
+        clients = []
+        for user in users:
+            communicator = WebsocketCommunicator(ChatroomConsumer.as_asgi(), f'/ws/forum/chatroom/{chatroom.id}/')
+            communicator.scope['user'] = user
+            communicator.scope['url_route'] = {'kwargs': {'chatroom_id': str(chatroom.id)}}
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError("Benchmark socket refused")
+            clients.append(communicator)
+
+        sent_at = {}
+        latencies = []
+        # Le premier client libère une place dans la fenêtre à chaque message reçu
+        slots = asyncio.Semaphore(window)
+
+        async def listen(communicator, is_timer):
+            for _ in range(count):
+                data = await communicator.receive_json_from(timeout=30)
+                if is_timer:
+                    latencies.append((time.perf_counter() - sent_at[data['content']]) * 1000)
+                    slots.release()
+
+        start = time.perf_counter()
+        listeners = [asyncio.ensure_future(listen(c, i == 0)) for i, c in enumerate(clients)]
+        for i in range(count):
+            await slots.acquire()
+            content = f'message {i}'
+            sent_at[content] = time.perf_counter()
+            await clients[i % len(clients)].send_json_to({'message': content})
+        await asyncio.gather(*listeners)
+        elapsed = time.perf_counter() - start
+        await writer.flush()
+        persisted = time.perf_counter() - start
+
+        for communicator in clients:
+            await communicator.disconnect()
+        return count / elapsed, count * len(clients) / elapsed, latencies, count / persisted
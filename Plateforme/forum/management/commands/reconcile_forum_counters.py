@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from forum.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute the message and chatroom counters of the forum topics and chatrooms"
+
+    def handle(self, *args, **options):
+        chatrooms, topics = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"{chatrooms} chatroom(s) and {topics} topic(s) fixed"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0002_message_timestamp_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chatroom', 'timestamp', 'id'], name='forum_message_history_idx'),
+        ),
+    ]
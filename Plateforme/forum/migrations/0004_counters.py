@@ -0,0 +1,73 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:55
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def _aggregate(queryset, group, name, aggregate):
+    return Subquery(queryset.order_by().values(group).annotate(**{name: aggregate}).values(name))
+
+
+def fill_counters(apps, schema_editor):
+    Topic = apps.get_model('forum', 'Topic')
+    ChatRoom = apps.get_model('forum', 'ChatRoom')
+    Message = apps.get_model('forum', 'Message')
+    messages = Message.objects.filter(chatroom=OuterRef('pk'))
+    ChatRoom.objects.update(
+        message_count=Coalesce(_aggregate(messages, 'chatroom', 'n', Count('pk')), 0),
+        last_message_at=Coalesce(_aggregate(messages, 'chatroom', 'last', Max('timestamp')), F('created_at')),
+    )
+    rooms = ChatRoom.objects.filter(topic=OuterRef('pk'))
+    Topic.objects.update(
+        chatroom_count=Coalesce(_aggregate(rooms, 'topic', 'n', Count('pk')), 0),
+        message_count=Coalesce(_aggregate(rooms, 'topic', 'n', Sum('message_count')), 0),
+        last_message_at=Coalesce(_aggregate(rooms, 'topic', 'last', Max('last_message_at')), F('created_at')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0003_message_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='chatroom_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['topic', '-last_message_at'], name='forum_chatroom_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['-last_message_at'], name='forum_topic_activity_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 import uuid
 class Topic(models.Model):
     id = models.UUIDField(
@@ -13,6 +14,16 @@ class Topic(models.Model):
     creator = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='topics')
     created_at = models.DateTimeField(auto_now_add=True)
     is_closed = models.BooleanField(default=False)
+    # Compteurs dénormalisés, tenus à jour par forum.counters
+    chatroom_count = models.PositiveIntegerField(default=0, editable=False)
+    message_count = models.PositiveIntegerField(default=0, editable=False)
+    # Dernière activité de ses salles (date de création tant qu'il n'y en a pas)
+    last_message_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-last_message_at'], name='forum_topic_activity_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -31,6 +42,15 @@ class ChatRoom(models.Model):
     description = models.TextField()
     creator = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='created_chatrooms')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Compteurs dénormalisés, tenus à jour par forum.counters
+    message_count = models.PositiveIntegerField(default=0, editable=False)
+    # Date du dernier message (date de création tant qu'il n'y en a pas)
+    last_message_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', '-last_message_at'], name='forum_chatroom_activity_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -47,12 +67,17 @@ class Message(models.Model):
     chatroom = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='messages')
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='forum_messages')
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Fixé à la réception (et non à l'insertion) : les messages du chat sont écrits par lots
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     is_edited = models.BooleanField(default=False)
     edited_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['timestamp']  # Tri par défaut des messages par ordre chronologique
+        indexes = [
+            # Historique paginé par curseur (forum.chat.history)
+            models.Index(fields=['chatroom', 'timestamp', 'id'], name='forum_message_history_idx'),
+        ]
 
     def __str__(self):
         return f"Message de {self.user.username} à {self.timestamp.strftime('%H:%M:%S')}"
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import TopicListView, TopicCreateView, TopicUpdateView, TopicDeleteView, ChatRoomDetailView, ChatRoomCreateView, MessageDeleteView, ChatRoomListView, MessageUpdateView, BanUserView, UnbanUserView, TopicToggleStatusView, ChatRoomUpdateView, ChatRoomDeleteView
+from .views import TopicListView, TopicCreateView, TopicUpdateView, TopicDeleteView, ChatRoomDetailView, ChatRoomHistoryView, ChatRoomCreateView, MessageDeleteView, ChatRoomListView, MessageUpdateView, BanUserView, UnbanUserView, TopicToggleStatusView, ChatRoomUpdateView, ChatRoomDeleteView
 app_name = 'forum'
 
 urlpatterns = [
@@ -9,6 +9,7 @@ urlpatterns = [
     path('topics/<uuid:pk>/delete/', TopicDeleteView.as_view(), name='topic-delete'),
     path('topics/<uuid:pk>/toggle-status/', TopicToggleStatusView.as_view(), name='topic-toggle-status'),
     path('chatroom/<uuid:pk>/', ChatRoomDetailView.as_view(), name='chatroom-detail'),
+    path('chatroom/<uuid:pk>/messages/', ChatRoomHistoryView.as_view(), name='chatroom-history'),
     path('chatroom/<uuid:pk>/edit/', ChatRoomUpdateView.as_view(), name='chatroom-update'),
     path('chatroom/<uuid:pk>/delete/', ChatRoomDeleteView.as_view(), name='chatroom-delete'),
     path('topics/<uuid:topic_id>/chatroom/', ChatRoomListView.as_view(), name='chatroom-list'),
@@ -3,12 +3,17 @@ from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View
 from .models import Topic, ChatRoom, Message, BannedUser
+from .chat import decode_cursor, encode_cursor, history, notify_ban
+from .counters import chatroom_added, chatroom_removed, messages_added, messages_removed
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.template.loader import render_to_string
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from notifications.services import NotificationService
 from accounts.views import LoginAndVerifiedRequiredMixin
+from accounts.presence import online_users
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.http import HttpResponseForbidden, JsonResponse
 
@@ -16,7 +21,10 @@ class TopicListView(LoginAndVerifiedRequiredMixin, ListView):
         model = Topic
         template_name = 'forum/topic_list.html'  # Ajout du préfixe 'forum/'
         context_object_name = 'topics'
-        ordering = ['-created_at']  # Tri par date de création décroissante
+        ordering = ['-last_message_at']  # Tri par activité (index forum_topic_activity_idx)
+
+        def get_queryset(self):
+            return super().get_queryset().select_related('creator')
 
         def get_context_data(self, **kwargs):
             context = super().get_context_data(**kwargs)
@@ -37,17 +45,14 @@ class TopicCreateView(LoginAndVerifiedRequiredMixin, CreateView):
         form.instance.creator = self.request.user
         response = super().form_valid(form)
         # NOTIFICATION à tous les utilisateurs actifs via le service
-        User = get_user_model()
-        for user in User.objects.filter(is_active=True):
-            # Évite d'envoyer la notification à l'utilisateur qui vient de créer le topic
-            if user != self.request.user:
-                NotificationService.create_notification(
-                    recipient=user,
-                    notification_type='SYSTEM', # Ou un type spécifique si tu en crées un pour le forum
-                    title="New topic in the forum",
-                    message=f"{self.request.user.username} created a new topic : {form.instance.title}",
-                    related_object=form.instance # Optionnel: lie la notification à l'objet Topic créé
-                )
+        # Évite d'envoyer la notification à l'utilisateur qui vient de créer le topic
+        NotificationService.notify_all_users(
+            'SYSTEM', # Ou un type spécifique si tu en crées un pour le forum
+            "New topic in the forum",
+            f"{self.request.user.username} created a new topic : {form.instance.title}",
+            related_object=form.instance, # Optionnel: lie la notification à l'objet Topic créé
+            exclude=[self.request.user]
+        )
         return response
     def get_context_data(self, **kwargs):
             context = super().get_context_data(**kwargs)
@@ -98,10 +103,10 @@ class ChatRoomListView(LoginAndVerifiedRequiredMixin, ListView):
     model = ChatRoom
     template_name = 'forum/chatroom_list.html'  # Ajout du préfixe 'forum/'
     context_object_name = 'chatrooms'
-    ordering = ['-created_at']  # Tri par date de création décroissante
+    ordering = ['-last_message_at']  # Tri par activité (index forum_chatroom_activity_idx)
     def get_queryset(self):
         topic_id = self.kwargs.get('topic_id')  # récupérer l'id du topic depuis l'URL
-        return ChatRoom.objects.filter(topic_id=topic_id).order_by('-created_at')
+        return ChatRoom.objects.filter(topic_id=topic_id).select_related('topic', 'creator').order_by('-last_message_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -119,8 +124,16 @@ class ChatRoomDetailView(LoginAndVerifiedRequiredMixin, DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['messages'] = Message.objects.filter(chatroom=self.object).order_by('timestamp')
+        # Seulement les derniers messages ; les plus anciens sont chargés à la demande
+        messages, has_older = history(self.object.pk)
+        context['messages'] = messages
+        context['has_older'] = has_older
+        context['older_cursor'] = encode_cursor(messages[0]) if messages else ''
         context['banned_users'] = BannedUser.objects.filter(chatroom=self.object)
+        # Participants de la salle (auteurs de messages, créateur) actuellement en ligne
+        context['online_users'] = online_users(get_user_model().objects.filter(
+            Q(pk=self.object.creator_id) | Q(pk__in=Message.objects.filter(chatroom=self.object).values('user_id'))
+        ))
         context['page'] = 'community'
         return context
     
@@ -136,11 +149,13 @@ class ChatRoomDetailView(LoginAndVerifiedRequiredMixin, DetailView):
         self.object = self.get_object()
         content = request.POST.get('message', '').strip()
         if content:
-            message = Message.objects.create(
-                chatroom=self.object,
-                user=request.user,
-                content=content
-            )
+            with transaction.atomic():
+                message = Message.objects.create(
+                    chatroom=self.object,
+                    user=request.user,
+                    content=content
+                )
+                messages_added([message])
             # Utiliser NotificationService pour les notifications de nouveau message dans une chatroom
             if self.object.topic: # S'assurer que la chatroom est liée à un topic
                 # Notifier le créateur du topic si ce n'est pas l'utilisateur actuel
@@ -166,7 +181,8 @@ class ChatRoomDetailView(LoginAndVerifiedRequiredMixin, DetailView):
                 'forum/partials/message_item.html',
                 {
                     'message': message,
-                    'user': request.user
+                    'user': request.user,
+                    'chatroom': self.object,
                 },
                 request=request
             )
@@ -175,6 +191,31 @@ class ChatRoomDetailView(LoginAndVerifiedRequiredMixin, DetailView):
         # sinon on redirige normalement
         return redirect('forum:chatroom-detail', pk=self.object.pk)
 
+class ChatRoomHistoryView(LoginAndVerifiedRequiredMixin, View):
+    """Messages antérieurs au curseur ``before`` (bouton « charger les messages plus anciens »)."""
+
+    def get(self, request, pk):
+        chatroom = get_object_or_404(ChatRoom, pk=pk)
+        if BannedUser.objects.filter(chatroom=chatroom, user=request.user).exists():
+            return HttpResponseForbidden("Vous avez été banni de cette salle de discussion.")
+        before = decode_cursor(request.GET.get('before'))
+        if before is None:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        messages, has_more = history(chatroom.pk, before=before)
+        html = ''.join(
+            render_to_string('forum/partials/message_item.html', {
+                'message': message,
+                'user': request.user,
+                'chatroom': chatroom,
+            }, request=request)
+            for message in messages
+        )
+        return JsonResponse({
+            'html': html,
+            'has_more': has_more,
+            'cursor': encode_cursor(messages[0]) if messages else None,
+        })
+
 class ChatRoomCreateView(LoginAndVerifiedRequiredMixin, CreateView):
     model = ChatRoom
     fields = ['name', 'description']
@@ -185,7 +226,10 @@ class ChatRoomCreateView(LoginAndVerifiedRequiredMixin, CreateView):
         topic_id = self.kwargs.get('topic_id')
         form.instance.topic = get_object_or_404(Topic, id=topic_id)
         form.instance.creator = self.request.user  # Ajout de l'attribution du créateur
-        return super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            chatroom_added(self.object)
+        return response
     
     def get_success_url(self):
         return reverse_lazy('forum:chatroom-detail', kwargs={'pk': self.object.pk})
@@ -219,6 +263,14 @@ class ChatRoomDeleteView(LoginAndVerifiedRequiredMixin, UserPassesTestMixin, Del
     def test_func(self):
         chatroom = self.get_object()
         return self.request.user.is_staff or chatroom.creator == self.request.user
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            # Verrou : aucun message ne peut plus être compté dans la salle
+            self.object = ChatRoom.objects.select_for_update().get(pk=self.object.pk)
+            response = super().form_valid(form)
+            chatroom_removed(self.object)
+        return response
     
     def get_success_url(self):
         # Rediriger vers la liste des chatrooms du topic parent
@@ -236,6 +288,12 @@ class MessageDeleteView(LoginAndVerifiedRequiredMixin, UserPassesTestMixin, Dele
     
     def test_func(self):
         return self.get_object().user == self.request.user
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            messages_removed(self.object.chatroom_id)
+        return response
     
     def get_success_url(self):
         return reverse_lazy('forum:chatroom-detail', kwargs={'pk': self.object.chatroom.pk})
@@ -287,7 +345,10 @@ class BanUserView(LoginAndVerifiedRequiredMixin, UserPassesTestMixin, CreateView
             related_object=chatroom
         )
         
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        # Invalide le cache des bannis des sockets de la salle et déconnecte l'utilisateur
+        notify_ban(chatroom.pk, user_to_ban.pk, True)
+        return response
     
     def get_success_url(self):
         return reverse_lazy('forum:chatroom-detail', kwargs={'pk': self.kwargs['chatroom_pk']})
@@ -300,6 +361,11 @@ class UnbanUserView(LoginAndVerifiedRequiredMixin, UserPassesTestMixin, DeleteVi
         banned_user = self.get_object()
         return self.request.user.is_staff or banned_user.chatroom.creator == self.request.user
     
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        notify_ban(self.object.chatroom_id, self.object.user_id, False)
+        return response
+
     def get_success_url(self):
         return reverse_lazy('forum:chatroom-detail', kwargs={'pk': self.object.chatroom.pk})
 
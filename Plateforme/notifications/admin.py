@@ -1,6 +1,43 @@
 from django.contrib import admin
-from .models import Notification
+from django.utils import timezone
+from .models import Broadcast, Notification, NotificationArchive, NotificationFanout, OutboundEmail
 
   
 
 admin.site.register(Notification)
+
+
+@admin.register(NotificationFanout)
+class NotificationFanoutAdmin(admin.ModelAdmin):
+    list_display = ('title', 'type', 'status', 'created_count', 'total', 'progress', 'throughput', 'created_at')
+    list_filter = ('status', 'type')
+    search_fields = ('title',)
+    readonly_fields = ('created_count', 'total', 'chunk_count', 'started_at', 'finished_at', 'error')
+
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ('title', 'type', 'created_at')
+    list_filter = ('type',)
+    search_fields = ('title', 'message')
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ('title', 'recipient', 'type', 'created_at', 'archived_at')
+    list_filter = ('type',)
+    search_fields = ('title', 'recipient__email')
+    raw_id_fields = ('recipient',)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at')
+    actions = ['retry']
+
+    @admin.action(description="Retry the selected emails now")
+    def retry(self, request, queryset):
+        queryset.exclude(status='sent').update(status='pending', attempts=0, available_at=timezone.now())
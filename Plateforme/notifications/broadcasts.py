@@ -0,0 +1,206 @@
+"""
+Announcements to every user, fanned out on read.
+
+An announcement (new resource, topic, project or approved event) is stored
+once, as a ``Broadcast``, instead of one ``Notification`` row per active
+user. What a user has done with it is derived at read time:
+
+* ``NotificationCursor.read_until``: announcements up to this date are read
+  ("mark all as read" only moves the watermark);
+* ``NotificationCursor.cleared_until``: announcements up to this date are
+  deleted for the user, as are those older than their account;
+* ``BroadcastReceipt``: sparse per-announcement rows, created only when a
+  user reads one announcement or is excluded from it.
+
+``inbox()`` merges the personal notifications and the announcements in one
+``UNION`` query; the watermarks are scalar subqueries of that query.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Case, CharField, DateTimeField, F, FilteredRelation, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Broadcast, BroadcastReceipt, Notification, NotificationCursor
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_GROUP = 'notifications_broadcast'
+
+TYPE_LABELS = dict(Notification.NOTIFICATION_TYPES)
+
+# Colonnes communes aux deux parties de l'UNION, dans cet ordre (celles de
+# Notification, pour que les gabarits lisent indifféremment les deux)
+INBOX_FIELDS = [
+    'id', 'type', 'title', 'message', 'created_at', 'project_id', 'sender_id',
+    'read', 'read_at', 'response_given', 'response', 'is_broadcast',
+]
+
+
+# ==================== WRITE ====================
+
+def announce(notification_type, title, message, related_object=None, exclude=None,
+             project_id=None, sender_id=None):
+    """Store one announcement for every user and push it with one channel-layer message."""
+    broadcast = Broadcast.objects.create(
+        type=notification_type,
+        title=title,
+        message=message,
+        content_type=ContentType.objects.get_for_model(related_object) if related_object else None,
+        object_id=related_object.pk if related_object else None,
+        project_id=project_id,
+        sender_id=sender_id,
+    )
+    excluded = [getattr(user, 'pk', user) for user in exclude or []]
+    # Les utilisateurs exclus (l'auteur...) ne la voient pas
+    BroadcastReceipt.objects.bulk_create([
+        BroadcastReceipt(broadcast=broadcast, user_id=user_id, dismissed=True) for user_id in excluded
+    ])
+
+    message = {
+        'type': 'notification_broadcast',
+        'notification': {
+            'id': str(broadcast.id),
+            'type': broadcast.get_type_display(),
+            'title': broadcast.title,
+            'message': broadcast.message,
+            'created_at': broadcast.created_at.isoformat(),
+            'project_id': str(project_id) if project_id else None,
+            'sender_id': str(sender_id) if sender_id else None,
+        },
+        'exclude': [str(user_id) for user_id in excluded],
+    }
+
+    def push():
+        try:
+            async_to_sync(get_channel_layer().group_send)(BROADCAST_GROUP, message)
+        except Exception as e:
+            # L'annonce est déjà en base
+            logger.warning("Broadcast push failed: %s", e)
+
+    transaction.on_commit(push)
+    return broadcast
+
+
+# ==================== READ ====================
+
+def _cursor(user, field):
+    return Subquery(NotificationCursor.objects.filter(user=user).values(field)[:1])
+
+
+def _personal(user):
+    return Notification.objects.filter(recipient=user).annotate(
+        is_broadcast=Value(False, output_field=BooleanField()),
+    )
+
+
+def _broadcasts(user):
+    floor = Coalesce(_cursor(user, 'cleared_until'), Value(user.date_joined, output_field=DateTimeField()))
+    read_until = _cursor(user, 'read_until')
+    return Broadcast.objects.annotate(
+        receipt=FilteredRelation('receipts', condition=Q(receipts__user=user)),
+    ).filter(
+        Q(receipt__dismissed__isnull=True) | Q(receipt__dismissed=False),
+        created_at__gt=floor,
+    ).annotate(
+        read=Case(
+            When(Q(created_at__lte=read_until) | Q(receipt__read_at__isnull=False), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+        read_at=Case(
+            When(receipt__read_at__isnull=False, then=F('receipt__read_at')),
+            When(created_at__lte=read_until, then=read_until),
+            default=Value(None, output_field=DateTimeField()),
+        ),
+        response_given=Value(False, output_field=BooleanField()),
+        response=Value(None, output_field=CharField()),
+        is_broadcast=Value(True, output_field=BooleanField()),
+    )
+
+
+def inbox(user, read=None, since=None):
+    """
+    Personal notifications and announcements of ``user``, newest first.
+
+    One query returning dicts with the keys of ``INBOX_FIELDS``; ``read``
+    keeps only the read (``True``) or unread (``False``) entries, ``since``
+    those created (or moved to the top by coalescing) after that date.
+    """
+    parts = [_personal(user), _broadcasts(user)]
+    if read is not None:
+        parts = [part.filter(read=read) for part in parts]
+    if since is not None:
+        # Plage sur l'index (recipient, read, -created_at) des notifications
+        parts = [part.filter(created_at__gt=since) for part in parts]
+    personal, broadcasts = (part.order_by().values(*INBOX_FIELDS) for part in parts)
+    return personal.union(broadcasts, all=True).order_by('-created_at')
+
+
+def unread_count(user):
+    return inbox(user, read=False).count()
+
+
+def serialize(entry):
+    """JSON form of an ``inbox()`` entry, as sent by the API and the WebSocket."""
+    return {
+        'id': str(entry['id']),
+        'type': TYPE_LABELS.get(entry['type'], "Inconnu"),
+        'type_code': entry['type'],
+        'title': entry['title'],
+        'message': entry['message'],
+        'created_at': entry['created_at'].isoformat(),
+        'read': entry['read'],
+        'read_at': entry['read_at'].isoformat() if entry['read_at'] else None,
+        'broadcast': entry['is_broadcast'],
+    }
+
+
+# ==================== STATE ====================
+
+def mark_as_read(user, notification_id):
+    """Mark a personal notification or an announcement as read; ``False`` if neither exists."""
+    now = timezone.now()
+    if Notification.objects.filter(id=notification_id, recipient=user).update(read=True, read_at=now):
+        return True
+    if not Broadcast.objects.filter(id=notification_id).exists():
+        return False
+    BroadcastReceipt.objects.update_or_create(
+        broadcast_id=notification_id, user=user, defaults={'read_at': now}
+    )
+    return True
+
+
+def mark_broadcasts_as_read(user, notification_ids):
+    """Mark the announcements among ``notification_ids`` as read; returns how many there were."""
+    now = timezone.now()
+    found = set(Broadcast.objects.filter(id__in=notification_ids).values_list('id', flat=True))
+    if not found:
+        return 0
+    BroadcastReceipt.objects.filter(user=user, broadcast_id__in=found, read_at__isnull=True).update(read_at=now)
+    existing = set(BroadcastReceipt.objects.filter(user=user, broadcast_id__in=found).values_list('broadcast_id', flat=True))
+    BroadcastReceipt.objects.bulk_create(
+        [BroadcastReceipt(broadcast_id=broadcast_id, user=user, read_at=now) for broadcast_id in found - existing],
+        ignore_conflicts=True,
+    )
+    return len(found)
+
+
+def mark_all_as_read(user):
+    now = timezone.now()
+    Notification.objects.filter(recipient=user, read=False).update(read=True, read_at=now)
+    NotificationCursor.objects.update_or_create(user=user, defaults={'read_until': now})
+
+
+def clear(user):
+    """Delete every notification of ``user``, announcements included."""
+    now = timezone.now()
+    Notification.objects.filter(recipient=user).delete()
+    NotificationCursor.objects.update_or_create(user=user, defaults={'cleared_until': now, 'read_until': now})
+    BroadcastReceipt.objects.filter(user=user, broadcast__created_at__lte=now).delete()
@@ -0,0 +1,31 @@
+"""
+Startup check of the cache shared by the ASGI workers.
+
+The unread-notification snapshots (``notifications.unread``), the push
+debounce flags (``notifications.coalesce``) and the resource detail cache
+generations (``resources.cache``) are kept in ``django.core.cache``. With
+several workers (``CHANNEL_LAYER=unix``) a per-process backend such as
+``LocMemCache`` gives each worker its own copy: updates made by one worker
+are invisible to the others, which keep serving stale counts and pages.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if getattr(settings, 'CHANNEL_LAYER', 'inmemory') != 'unix':
+        return []
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f"CHANNEL_LAYER=unix runs several workers but the default cache ({backend}) is local to each process.",
+        hint="Set CACHE_BACKEND to a shared backend (Redis, Memcached, database or file cache).",
+        id='notifications.E001',
+    )]
@@ -0,0 +1,187 @@
+"""
+Coalescing of high-frequency notifications (likes, comments).
+
+Every like or comment on a post used to create its own ``Notification`` and
+WebSocket push. Here events sharing a ``group_key`` ("like:post:<id>"...)
+are merged into the recipient's latest unread notification with that key,
+if it is younger than ``COALESCE_WINDOW``: its ``actor_count`` and message
+("Ali and 41 others liked your post.") are updated in place and it moves
+back to the top of the list. The notification keeps the ids of its distinct
+actors (``actor_ids``), so the same user liking, unliking and liking again
+is counted once, and ``withdraw`` takes an actor back out when the like is
+removed (the notification is deleted with its last actor).
+
+Pushes are debounced: the first event creates the row and is pushed right
+away; later events only schedule one push of the row's latest state after
+``PUSH_DEBOUNCE`` seconds (a cache flag shared by the workers prevents
+scheduling it twice).
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import unread
+from .fanout import user_group
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW = timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 60 * 60 * 24))
+PUSH_DEBOUNCE = getattr(settings, 'NOTIFICATION_PUSH_DEBOUNCE', 5)
+PENDING_PUSH_KEY = 'notifications:pending_push:{}'
+
+
+def actors_message(actor_name, count, action):
+    """``"Ali liked your post."``, ``"Ali and 41 others liked your post."``"""
+    if count <= 1:
+        return f"{actor_name} {action}"
+    others = count - 1
+    return f"{actor_name} and {others} other{'s' if others > 1 else ''} {action}"
+
+
+def _actor_name(actor):
+    return getattr(actor, 'full_name', None) or str(actor)
+
+
+def payload(notification):
+    return {
+        'id': str(notification.id),
+        'type': notification.get_type_display(),
+        'title': notification.title,
+        'message': notification.message,
+        'created_at': notification.created_at.isoformat(),
+        'project_id': str(notification.project_id) if notification.project_id else None,
+        'sender_id': str(notification.sender_id) if notification.sender_id else None,
+        'actor_count': notification.actor_count,
+    }
+
+
+def push(notification):
+    try:
+        async_to_sync(get_channel_layer().group_send)(user_group(notification.recipient_id), {
+            'type': 'notification_message',
+            'notification': payload(notification),
+        })
+    except Exception as e:
+        # La notification est déjà en base
+        logger.warning("Notification push failed: %s", e)
+
+
+def push_withdrawn(recipient_id, notification_id):
+    try:
+        async_to_sync(get_channel_layer().group_send)(user_group(recipient_id), {
+            'type': 'notification_withdrawn',
+            'notification_id': str(notification_id),
+        })
+    except Exception as e:
+        logger.warning("Notification push failed: %s", e)
+
+
+def _push_latest(notification_id):
+    try:
+        cache.delete(PENDING_PUSH_KEY.format(notification_id))
+        notification = Notification.objects.filter(id=notification_id).first()
+        if notification is not None and not notification.read:
+            push(notification)
+    finally:
+        connections.close_all()
+
+
+def schedule_push(notification):
+    """Push the state of ``notification`` in ``PUSH_DEBOUNCE`` seconds, once for a burst of updates."""
+    if not cache.add(PENDING_PUSH_KEY.format(notification.id), True, PUSH_DEBOUNCE * 2):
+        return
+    timer = threading.Timer(PUSH_DEBOUNCE, _push_latest, args=[notification.id])
+    timer.daemon = True
+    transaction.on_commit(timer.start)
+
+
+def coalesce(recipient, notification_type, title, actor, action, group_key, related_object=None,
+             window=COALESCE_WINDOW):
+    """
+    Record that ``actor`` did ``action`` (e.g. ``"liked your post."``) for ``recipient``.
+
+    Returns the created or updated ``Notification``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        notification = Notification.objects.select_for_update().filter(
+            recipient=recipient, group_key=group_key, read=False, created_at__gte=now - window,
+        ).order_by('-created_at').first()
+
+        if notification is None:
+            notification = Notification(
+                recipient=recipient,
+                type=notification_type,
+                title=title,
+                message=actors_message(_actor_name(actor), 1, action),
+                sender_id=actor.pk,
+                group_key=group_key,
+                actor_ids=[str(actor.pk)],
+            )
+            if related_object is not None:
+                notification.content_type = ContentType.objects.get_for_model(related_object)
+                notification.object_id = related_object.pk
+            notification.save()
+            unread.added(notification)
+            transaction.on_commit(lambda: push(notification))
+            return notification
+
+        # Un acteur déjà compté (like / unlike / like, plusieurs commentaires) ne l'est pas deux fois
+        if str(actor.pk) not in notification.actor_ids:
+            notification.actor_ids.append(str(actor.pk))
+            notification.actor_count += 1
+        notification.sender_id = actor.pk
+        notification.message = actors_message(_actor_name(actor), notification.actor_count, action)
+        # Remonte en tête de liste
+        notification.created_at = now
+        notification.save(update_fields=['actor_ids', 'actor_count', 'sender_id', 'message', 'created_at'])
+        unread.updated(notification)
+        schedule_push(notification)
+        return notification
+
+
+def withdraw(recipient, actor, action, group_key):
+    """
+    Take ``actor`` back out of the unread ``group_key`` notification of
+    ``recipient`` (e.g. after an unlike).
+
+    The notification is deleted when ``actor`` was its only actor, otherwise
+    its count and message are updated, naming the latest remaining actor.
+    Returns the updated ``Notification``, ``None`` if there was nothing to
+    withdraw or it was deleted.
+    """
+    with transaction.atomic():
+        notification = Notification.objects.select_for_update().filter(
+            recipient=recipient, group_key=group_key, read=False,
+        ).order_by('-created_at').first()
+        if notification is None or str(actor.pk) not in notification.actor_ids:
+            return None
+
+        notification.actor_ids.remove(str(actor.pk))
+        notification.actor_count = max(notification.actor_count - 1, 0)
+        # Compte hérité d'avant actor_ids : plus aucun acteur connu, la notification disparaît aussi
+        if not notification.actor_count or not notification.actor_ids:
+            notification_id = notification.id
+            notification.delete()
+            unread.read(recipient.pk, notification_id)
+            transaction.on_commit(lambda: push_withdrawn(recipient.pk, notification_id))
+            return None
+
+        latest = get_user_model().objects.filter(pk=notification.actor_ids[-1]).first()
+        notification.sender_id = latest.pk if latest else None
+        name = _actor_name(latest) if latest else "Someone"
+        notification.message = actors_message(name, notification.actor_count, action)
+        notification.save(update_fields=['actor_ids', 'actor_count', 'sender_id', 'message'])
+        # Entrée du cache à remplacer sans changer sa place : recalcul à la prochaine lecture
+        unread.forget(recipient.pk)
+        return notification
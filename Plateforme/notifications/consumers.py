@@ -1,29 +1,87 @@
 import json
+import uuid
+from datetime import timezone as dt_timezone
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Notification
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from Plateforme.heartbeat import HeartbeatMixin
+from . import broadcasts, unread
+from .broadcasts import BROADCAST_GROUP
+from .services import NotificationService
+
+# Nombre maximum de notifications renvoyées par une synchronisation
+SYNC_LIMIT = 50
+# Nombre maximum d'identifiants par lot "mark_read"
+MARK_READ_BATCH = 100
+
+
+def parse_cursor(value):
+    """Last ``created_at`` seen by the client (ISO 8601), ``None`` if missing or invalid."""
+    try:
+        since = parse_datetime(value) if value else None
+    except ValueError:
+        return None
+    if since is not None and timezone.is_naive(since):
+        # Curseur sans fuseau : les dates envoyées au client sont en UTC
+        since = timezone.make_aware(since, dt_timezone.utc)
+    return since
+
+
+class NotificationConsumer(HeartbeatMixin, AsyncWebsocketConsumer):
+    """
+    Real-time notifications of the connected user.
+
+    On connect the client passes the ``created_at`` of the newest
+    notification it has seen (``/ws/notifications/?since=<iso>``); only the
+    unread notifications created after it are sent back, with the unread
+    count (``notification_sync``). Without cursor the latest unread
+    notifications are sent (``notification_list``).
+
+    Both are answered from the cached unread snapshot when it is fresh, so a
+    reconnecting client costs no query. Actions received: ``sync``
+    (``since``), ``mark_read`` (``ids``), ``mark_as_read``
+    (``notification_id``), ``mark_all_as_read`` and ``pong`` (heartbeat).
+    """
 
-class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
         if self.user.is_authenticated:
             self.group_name = f"user_{self.user.id}_notifications"
             await self.channel_layer.group_add(self.group_name, self.channel_name)
+            # Notifications envoyées à tous les utilisateurs (un seul message)
+            await self.channel_layer.group_add(BROADCAST_GROUP, self.channel_name)
             await self.accept()
-            await self.send_unread_notifications()
+            query = parse_qs(self.scope.get('query_string', b'').decode())
+            since = parse_cursor(query.get('since', [None])[0])
+            if since is None:
+                await self.send_unread_notifications()
+            else:
+                await self.send_sync(since)
         else:
             await self.close()
 
     async def disconnect(self, close_code):
         if self.user.is_authenticated:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self.channel_layer.group_discard(BROADCAST_GROUP, self.channel_name)
 
     async def receive(self, text_data):
         data = json.loads(text_data)
         if data.get('action') == 'mark_as_read':
             await self.mark_as_read(data.get('notification_id'))
+        elif data.get('action') == 'mark_read':
+            await self.mark_read(data.get('ids'))
         elif data.get('action') == 'mark_all_as_read':
             await self.mark_all_as_read()
+        elif data.get('action') == 'sync':
+            since = parse_cursor(data.get('since'))
+            if since is None:
+                await self.send_unread_notifications()
+            else:
+                await self.send_sync(since)
 
     async def notification_message(self, event):
         await self.send(text_data=json.dumps({
@@ -31,6 +89,17 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'notification': event['notification']
         }))
 
+    async def notification_withdrawn(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'notification_withdrawn',
+            'notification_id': event['notification_id'],
+        }))
+
+    async def notification_broadcast(self, event):
+        if str(self.user.id) in event.get('exclude', []):
+            return
+        await self.notification_message(event)
+
     async def send_unread_notifications(self):
         notifications = await self.get_unread_notifications()
         await self.send(text_data=json.dumps({
@@ -38,23 +107,60 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'notifications': notifications
         }))
 
+    async def send_sync(self, since):
+        notifications, unread_count = await self.get_notifications_since(since)
+        await self.send(text_data=json.dumps({
+            'type': 'notification_sync',
+            'notifications': notifications[:SYNC_LIMIT],
+            # Plus de SYNC_LIMIT nouveautés : le client recharge la liste complète
+            'truncated': len(notifications) > SYNC_LIMIT,
+            'unread_count': unread_count,
+            'cursor': notifications[0]['created_at'] if notifications else since.isoformat(),
+        }))
+
+    async def mark_read(self, ids):
+        if not isinstance(ids, list):
+            return
+        notification_ids = []
+        for notification_id in ids[:MARK_READ_BATCH]:
+            try:
+                notification_ids.append(uuid.UUID(str(notification_id)))
+            except ValueError:
+                continue
+        if not notification_ids:
+            return
+        unread_count = await self.mark_many_as_read(notification_ids)
+        await self.send(text_data=json.dumps({
+            'type': 'notifications_marked_read',
+            'ids': [str(notification_id) for notification_id in notification_ids],
+            'unread_count': unread_count,
+        }))
+
     @database_sync_to_async
     def get_unread_notifications(self):
-        return [
-            {
-                'id': n.id,
-                'title': n.title,
-                'message': n.message,
-                'created_at': n.created_at.isoformat(),
-                'read': n.read,
-            }
-            for n in Notification.objects.filter(recipient=self.user, read=False).order_by('-created_at')[:10]
-        ]
+        return [broadcasts.serialize(n) for n in NotificationService.get_unread(self.user)['latest'][:10]]
+
+    @database_sync_to_async
+    def get_notifications_since(self, since):
+        cached = unread.cached_since(self.user.pk, since)
+        if cached is not None:
+            entries, unread_count = cached
+            return [broadcasts.serialize(n) for n in entries], unread_count
+        # Une seule requête de plage indexée ; le compteur vient du cache
+        entries = broadcasts.inbox(self.user, read=False, since=since)[:SYNC_LIMIT + 1]
+        notifications = [broadcasts.serialize(n) for n in entries]
+        return notifications, NotificationService.get_unread(self.user)['count']
 
     @database_sync_to_async
     def mark_as_read(self, notification_id):
-        Notification.objects.filter(id=notification_id, recipient=self.user).update(read=True)
+        if notification_id:
+            NotificationService.mark_as_read(self.user, notification_id)
+
+    @database_sync_to_async
+    def mark_many_as_read(self, notification_ids):
+        NotificationService.mark_many_as_read(self.user, notification_ids)
+        return NotificationService.get_unread(self.user)['count']
 
     @database_sync_to_async
     def mark_all_as_read(self):
-        Notification.objects.filter(recipient=self.user, read=False).update(read=True)
\ No newline at end of file
+        NotificationService.mark_all_as_read(self.user)
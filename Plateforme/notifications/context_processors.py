@@ -10,12 +10,10 @@ def notification_processor(request):
     }
     
     if request.user.is_authenticated:
-        # Récupérer les 5 dernières notifications non lues
-        notifications = NotificationService.get_user_notifications(
-            request.user, read=False, limit=5
-        )
+        # Compteur et 5 dernières notifications non lues, en cache (voir notifications.unread)
+        unread = NotificationService.get_unread(request.user)
         
-        context['unread_notifications'] = notifications
-        context['unread_notifications_count'] = notifications.count()
+        context['unread_notifications'] = unread['latest'][:5]
+        context['unread_notifications_count'] = unread['count']
     
-    return context
\ No newline at end of file
+    return context
@@ -0,0 +1,225 @@
+"""
+Fan-out of one notification to a group of users.
+
+Notifying a group used to create one ``Notification`` per user, each with its
+own ``ContentType`` lookup and channel-layer message, inside the HTTP request.
+Here the request only reads the recipient ids (one query) into a
+``NotificationFanout`` job; once the transaction is committed, a background
+worker writes the notifications by chunks with one ``bulk_create`` each,
+pushes them to the connected recipients and updates the job's progress.
+
+Announcements to every user do not go through here: they are stored once, as
+a ``Broadcast`` (see ``notifications.broadcasts``).
+
+The worker is a single thread of the web process: there is no task queue in
+this project. ``NOTIFICATION_FANOUT_ASYNC = False`` runs the fan-out inline
+(management commands, tests). The job row keeps what is needed to resume it
+if that process stops: the sorted recipient ids and the last one written,
+saved in the transaction of each chunk. The ``resume_notification_fanouts``
+command restarts the jobs that made no progress for a while.
+"""
+import logging
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import unread
+from .models import Notification, NotificationFanout
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = getattr(settings, 'NOTIFICATION_FANOUT_CHUNK_SIZE', 1000)
+# Job sans progression depuis ce délai : considéré comme interrompu
+STALE_AFTER = timedelta(minutes=10)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notification-fanout')
+
+
+def user_group(user_id):
+    return f"user_{user_id}_notifications"
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def notification_payload(job, notification_id):
+    """Message sent to the WebSocket clients (same shape as ``create_notification``)."""
+    return {
+        'id': str(notification_id),
+        'type': job.get_type_display(),
+        'title': job.title,
+        'message': job.message,
+        'created_at': job.created_at.isoformat(),
+        'project_id': str(job.project_id) if job.project_id else None,
+        'sender_id': str(job.sender_id) if job.sender_id else None,
+    }
+
+
+def _send(group, message):
+    try:
+        async_to_sync(get_channel_layer().group_send)(group, message)
+    except Exception as e:
+        # Les notifications sont déjà en base, seul le temps réel est perdu
+        logger.warning("Notification push to %s failed: %s", group, e)
+
+
+def remaining_recipients(job):
+    """Ids of the recipients of ``job`` not processed yet, in processing order."""
+    recipient_ids = job.recipient_ids
+    if job.last_recipient_id:
+        recipient_ids = recipient_ids[bisect_right(recipient_ids, str(job.last_recipient_id)):]
+    return recipient_ids
+
+
+def run_fanout(job, chunk_size=CHUNK_SIZE):
+    """
+    Create the notifications of ``job`` for its recipients and push them.
+
+    A job interrupted earlier resumes after its ``last_recipient_id``.
+    """
+    job.status = 'running'
+    job.progress_at = timezone.now()
+    if job.started_at is None:
+        job.started_at = job.progress_at
+    job.save(update_fields=['status', 'started_at', 'progress_at'])
+    User = get_user_model()
+
+    for chunk in _chunks(remaining_recipients(job), chunk_size):
+        # Notifications et progression validées ensemble : une reprise ne crée pas de doublons
+        with transaction.atomic():
+            # Utilisateurs supprimés depuis la création du job écartés
+            existing = User.objects.filter(pk__in=chunk).values_list('pk', flat=True)
+            notifications = Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=recipient_id,
+                    type=job.type,
+                    title=job.title,
+                    message=job.message,
+                    content_type_id=job.content_type_id,
+                    object_id=job.object_id,
+                    project_id=job.project_id,
+                    sender_id=job.sender_id,
+                )
+                for recipient_id in existing
+            ])
+            job.created_count += len(notifications)
+            job.chunk_count += 1
+            job.last_recipient_id = chunk[-1]
+            job.progress_at = timezone.now()
+            # Progression visible pendant l'envoi
+            NotificationFanout.objects.filter(pk=job.pk).update(
+                created_count=job.created_count, chunk_count=job.chunk_count,
+                last_recipient_id=job.last_recipient_id, progress_at=job.progress_at,
+            )
+        unread.forget(*(notification.recipient_id for notification in notifications))
+        for notification in notifications:
+            _send(user_group(notification.recipient_id), {
+                'type': 'notification_message',
+                'notification': notification_payload(job, notification.id),
+            })
+
+    job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    logger.info(
+        "Notification fan-out %s: %d notifications in %d chunks, %.2fs (%.0f/s)",
+        job.pk, job.created_count, job.chunk_count, job.duration or 0, job.throughput or 0,
+    )
+    return job
+
+
+def _run_safely(job, chunk_size=CHUNK_SIZE):
+    try:
+        return run_fanout(job, chunk_size)
+    except Exception as e:
+        logger.exception("Notification fan-out %s failed", job.pk)
+        NotificationFanout.objects.filter(pk=job.pk).update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+        return None
+
+
+def _run_in_worker(job_pk, chunk_size):
+    try:
+        _run_safely(NotificationFanout.objects.get(pk=job_pk), chunk_size)
+    finally:
+        # Le thread garde sinon sa connexion ouverte indéfiniment
+        connections.close_all()
+
+
+def interrupted(stale_after=STALE_AFTER):
+    """Pending or running jobs without progress for ``stale_after`` (their process stopped)."""
+    deadline = timezone.now() - stale_after
+    return NotificationFanout.objects.filter(status__in=['pending', 'running']).filter(
+        Q(progress_at__lt=deadline) | Q(progress_at__isnull=True, created_at__lt=deadline)
+    ).order_by('created_at')
+
+
+def resume(job, chunk_size=CHUNK_SIZE):
+    """
+    Resume an interrupted ``job`` in this process; returns it, or ``None``
+    if another process claimed it first or it cannot be resumed.
+    """
+    # Réservation : une seule reprise l'emporte si la commande tourne deux fois
+    claimed = NotificationFanout.objects.filter(
+        pk=job.pk, status=job.status, progress_at=job.progress_at,
+    ).update(progress_at=timezone.now())
+    if not claimed:
+        return None
+    if job.recipient_ids is None:
+        # Job créé avant l'enregistrement des destinataires
+        NotificationFanout.objects.filter(pk=job.pk).update(
+            status='failed', error="Recipients not stored, cannot resume", finished_at=timezone.now()
+        )
+        return None
+    return _run_safely(job, chunk_size=chunk_size)
+
+
+def fan_out(recipients, notification_type, title, message, related_object=None,
+            project_id=None, sender_id=None, exclude=None, chunk_size=CHUNK_SIZE):
+    """
+    Notify every user of ``recipients`` (a queryset) and return the ``NotificationFanout`` job.
+
+    ``exclude`` is an iterable of users (or ids) left out.
+    """
+    excluded_ids = [str(getattr(user, 'pk', user)) for user in exclude or []]
+    if excluded_ids:
+        recipients = recipients.exclude(pk__in=excluded_ids)
+    # Triés comme chaînes : ordre de reprise après last_recipient_id
+    recipient_ids = sorted(str(pk) for pk in recipients.order_by().values_list('pk', flat=True))
+    job = NotificationFanout.objects.create(
+        type=notification_type,
+        title=title,
+        message=message,
+        # get_for_model est mis en cache par ContentTypeManager
+        content_type=ContentType.objects.get_for_model(related_object) if related_object else None,
+        object_id=related_object.pk if related_object else None,
+        project_id=project_id,
+        sender_id=sender_id,
+        excluded_ids=excluded_ids,
+        recipient_ids=recipient_ids,
+        total=len(recipient_ids),
+    )
+    if getattr(settings, 'NOTIFICATION_FANOUT_ASYNC', True):
+        # Après le commit : le worker doit voir l'objet lié et la ligne du job
+        transaction.on_commit(lambda: _executor.submit(_run_in_worker, job.pk, chunk_size))
+    else:
+        run_fanout(job, chunk_size)
+    return job
+
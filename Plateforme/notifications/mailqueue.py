@@ -0,0 +1,186 @@
+"""
+Outbound email queue.
+
+Views used to call ``send_mail`` inside the request, opening a new SMTP/TLS
+session each time, so a slow SMTP server stalled signups. ``queue_mail``
+only inserts an ``OutboundEmail`` row; the ``send_queued_mail`` command
+sends the queue:
+
+* rows are claimed by batches (``SELECT ... FOR UPDATE SKIP LOCKED`` where
+  supported) and leased by moving ``available_at`` forward, so several
+  workers can run and a crashed worker's rows come back after ``LEASE``;
+* one SMTP connection is kept open for all the messages of the worker and
+  reopened if the server drops it;
+* sending is throttled to ``RATE_LIMIT`` messages per second;
+* a failed message is retried after ``RETRY_DELAY`` seconds, doubled at each
+  attempt, and marked failed after ``MAX_ATTEMPTS``.
+
+``queue_digests`` queues one summary email per user who enabled the
+notification digest, with the unread notifications received since the
+previous one.
+"""
+import logging
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .broadcasts import inbox
+from .models import NotificationCursor, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+QUEUE_ENABLED = getattr(settings, 'EMAIL_QUEUE_ENABLED', True)
+RATE_LIMIT = getattr(settings, 'EMAIL_QUEUE_RATE_LIMIT', 5)
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', 5)
+RETRY_DELAY = 60
+LEASE = timedelta(minutes=5)
+BATCH_SIZE = 50
+DIGEST_SIZE = 20
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    """Queue an email (same arguments as ``send_mail``); sent directly when the queue is disabled."""
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    if not QUEUE_ENABLED:
+        send_mail(subject, message, from_email, recipient_list)
+        return None
+    return OutboundEmail.objects.create(
+        subject=subject, body=message, from_email=from_email, recipients=list(recipient_list),
+    )
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Lease up to ``batch_size`` due messages to this worker."""
+    now = timezone.now()
+    due = OutboundEmail.objects.filter(status='pending', available_at__lte=now).order_by('available_at')
+    if connection.features.has_select_for_update_skip_locked:
+        due = due.select_for_update(skip_locked=True)
+    with transaction.atomic():
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        OutboundEmail.objects.filter(id__in=ids).update(available_at=now + LEASE, attempts=F('attempts') + 1)
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('created_at'))
+
+
+class SendStats:
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        return self.sent / self.seconds if self.seconds else 0
+
+    def __str__(self):
+        return (f"{self.sent} sent, {self.retried} to retry, {self.failed} failed "
+                f"in {self.seconds:.2f}s ({self.throughput:.1f} emails/s)")
+
+
+class MailSender:
+    """One SMTP connection reused for every message, throttled to ``rate`` messages per second."""
+
+    def __init__(self, rate=RATE_LIMIT):
+        self.interval = 1 / rate if rate else 0
+        self.connection = None
+        self._last_send = 0.0
+
+    def _throttle(self):
+        wait = self._last_send + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_send = time.monotonic()
+
+    def _open(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+        return self.connection
+
+    def send(self, email):
+        self._throttle()
+        message = EmailMessage(email.subject, email.body, email.from_email, email.recipients)
+        try:
+            message.connection = self._open()
+            message.send()
+        except smtplib.SMTPServerDisconnected:
+            # Connexion fermée par le serveur (inactivité) : une seule reconnexion
+            self.close()
+            message.connection = self._open()
+            message.send()
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+
+def _failed(email, error, max_attempts, stats):
+    email.last_error = f"{type(error).__name__}: {error}"
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+        stats.failed += 1
+    else:
+        email.available_at = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (email.attempts - 1))
+        stats.retried += 1
+    email.save(update_fields=['status', 'last_error', 'available_at'])
+    logger.warning("Email %s to %s failed (attempt %s): %s", email.pk, email.recipients, email.attempts, error)
+
+
+def send_queued(sender, batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS, stats=None):
+    """Send every due message with ``sender``; returns the ``SendStats``."""
+    stats = stats or SendStats()
+    while True:
+        batch = claim(batch_size)
+        if not batch:
+            return stats
+        start = time.perf_counter()
+        for email in batch:
+            try:
+                sender.send(email)
+            except Exception as e:
+                sender.close()
+                _failed(email, e, max_attempts, stats)
+                continue
+            OutboundEmail.objects.filter(pk=email.pk).update(status='sent', sent_at=timezone.now(), last_error='')
+            stats.sent += 1
+        stats.seconds += time.perf_counter() - start
+
+
+def digest_message(entries, truncated):
+    lines = [f"- {entry['title']}: {entry['message']}" for entry in entries]
+    if truncated:
+        lines.append("...")
+    return (
+        "Hello,\n\nYou have unread notifications on the Arabic NLP Platform:\n\n"
+        + "\n".join(lines)
+        + "\n\nBest regards,\nArabic NLP Platform Team"
+    )
+
+
+def queue_digests():
+    """Queue a digest for each user who enabled it and received unread notifications; returns how many."""
+    now = timezone.now()
+    queued = 0
+    cursors = NotificationCursor.objects.filter(email_digest=True, user__is_active=True).select_related('user')
+    for cursor in cursors.iterator(chunk_size=100):
+        user = cursor.user
+        entries = list(inbox(user, read=False, since=cursor.digest_until or user.date_joined)[:DIGEST_SIZE + 1])
+        if entries:
+            queue_mail(
+                f"[Arabic NLP Platform] {len(entries[:DIGEST_SIZE])} unread notification(s)",
+                digest_message(entries[:DIGEST_SIZE], len(entries) > DIGEST_SIZE),
+                [user.email],
+            )
+            queued += 1
+        NotificationCursor.objects.filter(pk=cursor.pk).update(digest_until=now)
+    return queued
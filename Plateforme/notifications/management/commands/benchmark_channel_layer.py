@@ -0,0 +1,157 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from Plateforme.channel_layer import UnixSocketChannelLayer
+
+GROUP = 'benchmark'
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def bench_latency(layer, count, payload):
+    """Sequential send -> receive, one message in flight."""
+    channel = await layer.new_channel()
+    latencies = []
+    for _ in range(count):
+        receiver = asyncio.ensure_future(layer.receive(channel))
+        start = time.perf_counter()
+        await layer.send(channel, {'type': 'bench', 'payload': payload})
+        await receiver
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def bench_throughput(layer, count, payload):
+    """One sender and one receiver running concurrently; messages per second."""
+    channel = await layer.new_channel()
+
+    async def consume():
+        for _ in range(count):
+            await layer.receive(channel)
+
+    start = time.perf_counter()
+    consumer = asyncio.ensure_future(consume())
+    for _ in range(count):
+        await layer.send(channel, {'type': 'bench', 'payload': payload})
+    await consumer
+    return count / (time.perf_counter() - start)
+
+
+async def bench_group(layer, count, members, payload):
+    """``count`` group sends to ``members`` receivers; deliveries per second."""
+    channels = [await layer.new_channel() for _ in range(members)]
+    for channel in channels:
+        await layer.group_add(GROUP, channel)
+
+    async def consume(channel):
+        for _ in range(count):
+            await layer.receive(channel)
+
+    start = time.perf_counter()
+    consumers = [asyncio.ensure_future(consume(channel)) for channel in channels]
+    for _ in range(count):
+        await layer.group_send(GROUP, {'type': 'bench', 'payload': payload})
+        # Laisse les consommateurs vider les canaux (capacité)
+        await asyncio.sleep(0)
+    await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - start
+    for channel in channels:
+        await layer.group_discard(GROUP, channel)
+    return count * members / elapsed
+
+
+def _worker(path, count, ready, done):
+    """Another process: join the group and receive ``count`` messages."""
+    async def run():
+        layer = UnixSocketChannelLayer(path, capacity=count, embedded_broker=False)
+        channel = await layer.new_channel()
+        await layer.group_add(GROUP, channel)
+        ready.put(True)
+        received = 0
+        for _ in range(count):
+            await layer.receive(channel)
+            received += 1
+        await layer.close()
+        done.put(received)
+
+    asyncio.run(run())
+
+
+class Command(BaseCommand):
+    help = "Measure latency and throughput of the Unix-socket channel layer against the in-memory layer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help="Messages per test")
+        parser.add_argument('--members', type=int, default=50, help="Group members in the fan-out test")
+        parser.add_argument('--processes', type=int, default=4, help="Receiving processes in the cross-process test")
+        parser.add_argument('--payload', type=int, default=200, help="Message payload size in bytes")
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        payload = 'x' * options['payload']
+        directory = tempfile.mkdtemp(prefix='channels-bench-')
+        path = os.path.join(directory, 'bench.sock')
+        try:
+            layers = [
+                ('in-memory', InMemoryChannelLayer(capacity=count)),
+                ('unix socket', UnixSocketChannelLayer(path, capacity=count)),
+            ]
+            self.stdout.write(
+                f"{'layer':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'msg/s':>10} {'group deliveries/s':>20}"
+            )
+            for name, layer in layers:
+                latencies, throughput, group = asyncio.run(self._run(layer, count, options['members'], payload))
+                self.stdout.write(
+                    f"{name:<12} {statistics.median(latencies):>8.3f} {_percentile(latencies, 0.95):>8.3f} "
+                    f"{_percentile(latencies, 0.99):>8.3f} {throughput:>10.0f} {group:>20.0f}"
+                )
+            if options['processes']:
+                self._cross_process(path, options['processes'], count // 10 or 1, payload)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    async def _run(self, layer, count, members, payload):
+        latencies = await bench_latency(layer, count, payload)
+        throughput = await bench_throughput(layer, count, payload)
+        group = await bench_group(layer, max(count // members, 1), members, payload)
+        await layer.close()
+        return latencies, throughput, group
+
+    def _cross_process(self, path, processes, count, payload):
+        """Group sends from this process reach receivers in ``processes`` other processes."""
+        context = multiprocessing.get_context('spawn')
+        ready, done = context.Queue(), context.Queue()
+        workers = [context.Process(target=_worker, args=(path, count, ready, done)) for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for _ in workers:
+            ready.get(timeout=60)
+
+        async def send():
+            layer = UnixSocketChannelLayer(path)
+            start = time.perf_counter()
+            for _ in range(count):
+                await layer.group_send(GROUP, {'type': 'bench', 'payload': payload})
+            await layer.close()
+            return start
+
+        start = asyncio.run(send())
+        received = sum(done.get(timeout=60) for _ in workers)
+        elapsed = time.perf_counter() - start
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS(
+            f"Cross-process: {received}/{count * processes} messages to {processes} processes "
+            f"in {elapsed:.2f}s ({received / elapsed:.0f} deliveries/s)"
+        ))
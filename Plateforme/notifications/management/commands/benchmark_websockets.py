@@ -0,0 +1,173 @@
+import asyncio
+import gc
+import os
+import resource
+import statistics
+import time
+import uuid
+from urllib.parse import quote
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from forum.chat import room_group
+from forum.consumers import ChatroomConsumer
+from forum.models import ChatRoom, Topic
+from notifications.broadcasts import BROADCAST_GROUP
+from notifications.consumers import NotificationConsumer
+from Plateforme.heartbeat import heartbeat
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def _rss():
+    """Resident memory of the process in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # Pas de /proc : pic de mémoire (en Ko sous Linux, en octets sous macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class QueryCounter:
+    """Counts the queries of every database connection opened after ``install``."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        connection_created.connect(self._wrap, weak=False)
+
+    def _wrap(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = (
+        "Open N WebSockets on NotificationConsumer or ChatroomConsumer in this process and measure "
+        "connect latency, queries per connect, memory per socket, broadcast fan-out and heartbeat cost"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', choices=['notifications', 'chatroom'], default='notifications')
+        parser.add_argument('--connections', type=int, default=1000, help="Sockets kept open")
+        parser.add_argument('--concurrency', type=int, default=100, help="Connects in flight")
+        parser.add_argument('--broadcasts', type=int, default=20, help="Group sends to every socket")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        tag = uuid.uuid4().hex[:8]
+        # Un seul utilisateur : toutes les sockets partagent son cache de notifications
+        user = User.objects.create_user(f'ws-bench-{tag}@example.invalid', None, full_name='WS bench')
+        topic = chatroom = None
+        if options['consumer'] == 'chatroom':
+            topic = Topic.objects.create(title=f'WS benchmark {tag}', description='benchmark', creator=user)
+            chatroom = ChatRoom.objects.create(topic=topic, name=f'WS benchmark {tag}', description='benchmark',
+                                               creator=user)
+        queries = QueryCounter()
+        queries.install()
+        try:
+            result = asyncio.run(self._run(user, chatroom, options, queries))
+        finally:
+            if topic is not None:
+                topic.delete()
+            user.delete()
+        self._report(options, *result)
+
+    def _communicator(self, user, chatroom):
+        if chatroom is None:
+            since = quote(timezone.now().isoformat())
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), f'/ws/notifications/?since={since}')
+        else:
+            communicator = WebsocketCommunicator(ChatroomConsumer.as_asgi(), f'/ws/forum/chatroom/{chatroom.id}/')
+            communicator.scope['url_route'] = {'kwargs': {'chatroom_id': str(chatroom.id)}}
+        communicator.scope['user'] = user
+        return communicator
+
+    async def _connect(self, communicator, chatroom):
+        start = time.perf_counter()
+        connected, _ = await communicator.connect(timeout=30)
+        if not connected:
+            raise RuntimeError("Benchmark socket refused")
+        if chatroom is None:
+            # Synchronisation initiale envoyée à la connexion
+            await communicator.receive_json_from(timeout=30)
+        return (time.perf_counter() - start) * 1000
+
+    async def _run(self, user, chatroom, options, queries):
+        count = options['connections']
+        # Première connexion : remplit les caches (compteur de notifications, bannis de la salle)
+        warm = self._communicator(user, chatroom)
+        await self._connect(warm, chatroom)
+
+        gc.collect()
+        rss_before = _rss()
+        queries_before = queries.count
+        slots = asyncio.Semaphore(options['concurrency'])
+        clients = [self._communicator(user, chatroom) for _ in range(count)]
+
+        async def connect(communicator):
+            async with slots:
+                return await self._connect(communicator, chatroom)
+
+        start = time.perf_counter()
+        connect_latencies = await asyncio.gather(*[connect(c) for c in clients])
+        connect_seconds = time.perf_counter() - start
+        connect_queries = queries.count - queries_before
+        gc.collect()
+        rss_per_socket = (_rss() - rss_before) / count
+
+        clients.append(warm)
+        layer = get_channel_layer()
+        group = BROADCAST_GROUP if chatroom is None else room_group(chatroom.id)
+        fanout = []
+        for i in range(options['broadcasts']):
+            if chatroom is None:
+                message = {'type': 'notification_broadcast', 'exclude': [],
+                           'notification': {'id': str(i), 'title': 'benchmark'}}
+            else:
+                message = {'type': 'chat_message', 'message_id': str(i), 'content': 'benchmark',
+                           'user_id': str(user.id), 'user_name': 'bench', 'timestamp': '', 'is_edited': False}
+            start = time.perf_counter()
+            await layer.group_send(group, message)
+            await asyncio.gather(*[c.receive_from(timeout=30) for c in clients])
+            fanout.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await heartbeat().beat()
+        await asyncio.gather(*[c.receive_from(timeout=30) for c in clients])
+        heartbeat_ms = (time.perf_counter() - start) * 1000
+
+        for communicator in clients:
+            await communicator.disconnect()
+        return connect_latencies, connect_seconds, connect_queries, rss_per_socket, fanout, heartbeat_ms
+
+    def _report(self, options, connect_latencies, connect_seconds, connect_queries, rss_per_socket, fanout,
+                heartbeat_ms):
+        count = options['connections']
+        self.stdout.write(f"{options['consumer']}: {count} sockets, {options['concurrency']} connects in flight")
+        self.stdout.write(
+            f"  connect      {count / connect_seconds:>8.0f}/s  p50 {statistics.median(connect_latencies):.2f} ms"
+            f"  p99 {_percentile(connect_latencies, 0.99):.2f} ms  {connect_queries / count:.2f} queries/socket"
+        )
+        # Inclut les objets du client de test (WebsocketCommunicator) : majorant
+        self.stdout.write(f"  memory       {rss_per_socket / 1024:>8.1f} KiB RSS/socket (client side included)")
+        if fanout:
+            self.stdout.write(
+                f"  fan-out      {count * len(fanout) / (sum(fanout) / 1000):>8.0f} deliveries/s"
+                f"  p50 {statistics.median(fanout):.2f} ms  p99 {_percentile(fanout, 0.99):.2f} ms per broadcast"
+            )
+        self.stdout.write(f"  heartbeat    {heartbeat_ms:>8.2f} ms to ping every socket")
+        self.stdout.write(self.style.SUCCESS("Done"))
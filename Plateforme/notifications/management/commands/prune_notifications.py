@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from notifications import retention
+
+
+def _size(value):
+    if value is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024 or unit == 'GB':
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class Command(BaseCommand):
+    help = "Archive old read notifications, purge expired archives and report the table sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=retention.RETENTION_DAYS,
+            help="Archive read notifications older than this many days",
+        )
+        parser.add_argument(
+            '--archive-days',
+            type=int,
+            default=retention.ARCHIVE_RETENTION_DAYS,
+            help="Delete archived notifications and announcements older than this many days",
+        )
+        parser.add_argument('--batch-size', type=int, default=retention.BATCH_SIZE, help="Rows per transaction")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to wait between batches")
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help="Delete old read notifications instead of archiving them",
+        )
+        parser.add_argument('--report', action='store_true', help="Only print the table report")
+
+    def handle(self, *args, **options):
+        if not options['report']:
+            steps = [retention.archive_read(
+                options['days'], options['batch_size'], options['pause'], archive=not options['no_archive']
+            )]
+            steps += retention.purge_archive(options['archive_days'], options['batch_size'], options['pause'])
+            for stats in steps:
+                self.stdout.write(str(stats))
+
+        for table, rows, size in retention.table_report():
+            self.stdout.write(f"{table:<40} {rows:>10} rows {_size(size):>10}")
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from notifications import fanout
+
+
+class Command(BaseCommand):
+    help = "Resume the notification fan-outs interrupted by a restart of the web process"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=int(fanout.STALE_AFTER.total_seconds() // 60),
+            help="Minutes without progress after which a pending or running job is resumed",
+        )
+
+    def handle(self, *args, **options):
+        resumed = failed = 0
+        for job in fanout.interrupted(timedelta(minutes=options['stale_after'])):
+            result = fanout.resume(job)
+            if result is None:
+                job.refresh_from_db()
+                if job.status == 'failed':
+                    failed += 1
+                    self.stderr.write(f"{job.pk}: {job.error}")
+                continue
+            resumed += 1
+            self.stdout.write(f"{job.title}: {job.created_count}/{job.total} notifications")
+
+        self.stdout.write(self.style.SUCCESS(f"{resumed} resumed, {failed} failed"))
@@ -0,0 +1,34 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Plateforme.channel_layer import ChannelBroker, acquire_broker_lock
+
+
+class Command(BaseCommand):
+    help = "Run the Unix-socket channel broker in the foreground (instead of inside an ASGI worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Socket path (CHANNEL_LAYERS['default'] by default)")
+
+    def handle(self, *args, **options):
+        config = settings.CHANNEL_LAYERS['default'].get('CONFIG', {})
+        path = options['path'] or config.get('path')
+        if not path:
+            raise CommandError("No socket path: set CHANNEL_LAYER=unix or pass --path")
+        lock_file = acquire_broker_lock(path)
+        if lock_file is None:
+            raise CommandError(f"A channel broker is already running on {path}")
+        broker = ChannelBroker(path, **{
+            name: config[name]
+            for name in ('expiry', 'group_expiry', 'capacity', 'channel_capacity')
+            if name in config
+        })
+        self.stdout.write(f"Channel broker on {path}")
+        try:
+            asyncio.run(broker.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            lock_file.close()
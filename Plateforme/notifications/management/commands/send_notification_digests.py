@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from notifications import mailqueue
+
+
+class Command(BaseCommand):
+    help = "Queue a digest email of their unread notifications for the users who enabled it (run daily)"
+
+    def handle(self, *args, **options):
+        queued = mailqueue.queue_digests()
+        self.stdout.write(self.style.SUCCESS(f"{queued} digest(s) queued"))
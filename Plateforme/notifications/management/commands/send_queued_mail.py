@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications import mailqueue
+
+
+class Command(BaseCommand):
+    help = "Send the queued outbound emails over one SMTP connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling the queue instead of exiting when it is empty")
+        parser.add_argument('--interval', type=float, default=2, help="Seconds between two polls with --loop")
+        parser.add_argument('--idle-close', type=float, default=60,
+                            help="Close the SMTP connection after this many idle seconds with --loop")
+        parser.add_argument('--batch-size', type=int, default=mailqueue.BATCH_SIZE, help="Messages claimed at once")
+        parser.add_argument('--rate', type=float, default=mailqueue.RATE_LIMIT, help="Maximum messages per second")
+        parser.add_argument('--max-attempts', type=int, default=mailqueue.MAX_ATTEMPTS,
+                            help="Attempts before a message is marked failed")
+
+    def handle(self, *args, **options):
+        sender = mailqueue.MailSender(options['rate'])
+        try:
+            if not options['loop']:
+                stats = mailqueue.send_queued(sender, options['batch_size'], options['max_attempts'])
+                self.stdout.write(self.style.SUCCESS(str(stats)))
+                return
+
+            self.stdout.write("Sending queued emails (Ctrl+C to stop)")
+            idle_since = time.monotonic()
+            while True:
+                stats = mailqueue.send_queued(sender, options['batch_size'], options['max_attempts'])
+                if stats.sent or stats.retried or stats.failed:
+                    self.stdout.write(str(stats))
+                    idle_since = time.monotonic()
+                elif sender.connection is not None and time.monotonic() - idle_since > options['idle_close']:
+                    # Le serveur SMTP coupe de toute façon les sessions inactives
+                    sender.close()
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sender.close()
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:23
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationFanout',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('SYSTEM', 'Système'), ('PROJECT_INVITATION', 'Invitation à un projet'), ('MEMBERSHIP_REQUEST', "Demande d'adhésion"), ('PROJECT_UPDATE', 'Mise à jour de projet'), ('TASK_ASSIGNED', 'Tâche assignée'), ('COMMENT', 'Commentaire'), ('EVENT_CREATED', 'Événement créé'), ('EVENT_APPROVED', 'Événement approuvé')], default='SYSTEM', max_length=50)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('object_id', models.UUIDField(blank=True, null=True)),
+                ('project_id', models.UUIDField(blank=True, null=True)),
+                ('sender_id', models.UUIDField(blank=True, null=True)),
+                ('broadcast', models.BooleanField(default=False)),
+                ('excluded_ids', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('chunk_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='contenttypes.contenttype')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
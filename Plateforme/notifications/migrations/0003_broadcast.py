@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:26
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_customuser_avatar_alter_customuser_email_and_more'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0002_notification_fanout'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCursor',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_cursor', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('read_until', models.DateTimeField(blank=True, null=True)),
+                ('cleared_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='notificationfanout',
+            name='broadcast',
+        ),
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('SYSTEM', 'Système'), ('PROJECT_INVITATION', 'Invitation à un projet'), ('MEMBERSHIP_REQUEST', "Demande d'adhésion"), ('PROJECT_UPDATE', 'Mise à jour de projet'), ('TASK_ASSIGNED', 'Tâche assignée'), ('COMMENT', 'Commentaire'), ('EVENT_CREATED', 'Événement créé'), ('EVENT_APPROVED', 'Événement approuvé')], default='SYSTEM', max_length=50)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('object_id', models.UUIDField(blank=True, null=True)),
+                ('project_id', models.UUIDField(blank=True, null=True)),
+                ('sender_id', models.UUIDField(blank=True, null=True)),
+                ('content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('dismissed', models.BooleanField(default=False)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='notifications.broadcast')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_receipts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('broadcast', 'user'), name='unique_broadcast_receipt')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-19 19:14
+
+from django.db import migrations, models
+
+
+def fill_actor_ids(apps, schema_editor):
+    # Seul le dernier acteur est connu ; actor_count est conservé tel quel
+    Notification = apps.get_model('notifications', 'Notification')
+    grouped = Notification.objects.exclude(group_key='').filter(read=False, sender_id__isnull=False)
+    for notification in grouped.only('pk', 'sender_id').iterator():
+        Notification.objects.filter(pk=notification.pk).update(actor_ids=[str(notification.sender_id)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fill_actor_ids, migrations.RunPython.noop),
+    ]
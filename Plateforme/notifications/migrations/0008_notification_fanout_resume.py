@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-19 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_notification_actor_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationfanout',
+            name='last_recipient_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationfanout',
+            name='progress_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationfanout',
+            name='recipient_query',
+            field=models.BinaryField(null=True),
+        ),
+    ]
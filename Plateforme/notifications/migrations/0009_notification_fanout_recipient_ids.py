@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-19 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_notification_fanout_resume'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notificationfanout',
+            name='recipient_query',
+        ),
+        migrations.AddField(
+            model_name='notificationfanout',
+            name='recipient_ids',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
@@ -44,8 +45,22 @@ class Notification(models.Model):
     project_id = models.UUIDField(null=True, blank=True)
     sender_id = models.UUIDField(null=True, blank=True)
 
+    # Regroupement des événements fréquents (« Ali and 41 others liked your post »),
+    # voir notifications.coalesce
+    group_key = models.CharField(max_length=255, blank=True, default='')
+    actor_count = models.PositiveIntegerField(default=1)
+    # Identifiants distincts des acteurs regroupés (actor_count en est la taille)
+    actor_ids = models.JSONField(default=list, blank=True)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'group_key'], name='notification_group_idx'),
+            # Boîte de réception : notifications (non) lues d'un utilisateur, les plus récentes d'abord
+            models.Index(fields=['recipient', 'read', '-created_at'], name='notification_inbox_idx'),
+            # Sélection des notifications lues à archiver (notifications.retention)
+            models.Index(fields=['created_at'], condition=models.Q(read=True), name='notification_read_age_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.recipient.username}"
@@ -55,4 +70,204 @@ class Notification(models.Model):
         for type_code, type_display in self.NOTIFICATION_TYPES:
             if self.type == type_code:
                 return type_display
-        return "Inconnu"
\ No newline at end of file
+        return "Inconnu"
+
+class NotificationFanout(models.Model):
+    """
+    Envoi d'une même notification à un ensemble d'utilisateurs.
+
+    Les notifications sont créées hors de la requête par ``notifications.fanout`` ;
+    cette ligne en garde les paramètres, les identifiants des destinataires, la
+    progression (dernier destinataire traité) et le débit, de quoi reprendre
+    l'envoi après un redémarrage (``resume_notification_fanouts``).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES, default='SYSTEM')
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    content_type = models.ForeignKey(ContentType, on_delete=models.SET_NULL, null=True, blank=True)
+    object_id = models.UUIDField(null=True, blank=True)
+    project_id = models.UUIDField(null=True, blank=True)
+    sender_id = models.UUIDField(null=True, blank=True)
+    excluded_ids = models.JSONField(default=list, blank=True)
+    # Identifiants des destinataires, triés (null : job antérieur, non reprenable)
+    recipient_ids = models.JSONField(null=True, blank=True, editable=False)
+    # Destinataires traités dans cet ordre : reprise après celui-ci
+    last_recipient_id = models.UUIDField(null=True, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    chunk_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    progress_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.title} ({self.created_count}/{self.total})"
+
+    @property
+    def duration(self):
+        """Durée de l'envoi en secondes (``None`` s'il n'a pas commencé)."""
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
+
+    @property
+    def throughput(self):
+        """Notifications créées par seconde."""
+        duration = self.duration
+        if not duration:
+            return None
+        return self.created_count / duration
+
+    @property
+    def progress(self):
+        """Avancement en pourcentage."""
+        if not self.total:
+            return 100 if self.status == 'done' else 0
+        return round(100 * self.created_count / self.total)
+
+
+class Broadcast(models.Model):
+    """
+    Annonce adressée à tous les utilisateurs actifs.
+
+    Une seule ligne par annonce quel que soit le nombre d'utilisateurs : l'état
+    de lecture est dérivé des filigranes de ``NotificationCursor`` et des
+    quelques ``BroadcastReceipt`` créés quand un utilisateur agit dessus.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES, default='SYSTEM')
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    object_id = models.UUIDField(null=True, blank=True)
+    content_object = GenericForeignKey('content_type', 'object_id')
+    project_id = models.UUIDField(null=True, blank=True)
+    sender_id = models.UUIDField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.title
+
+
+class BroadcastReceipt(models.Model):
+    """Lecture ou suppression d'une annonce par un utilisateur (ligne créée à la demande)"""
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, related_name='receipts')
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='broadcast_receipts')
+    read_at = models.DateTimeField(null=True, blank=True)
+    dismissed = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['broadcast', 'user'], name='unique_broadcast_receipt'),
+        ]
+
+    def __str__(self):
+        return f"{self.broadcast} - {self.user}"
+
+
+class NotificationCursor(models.Model):
+    """
+    Filigranes d'un utilisateur pour les annonces : celles antérieures à
+    ``read_until`` sont lues, celles antérieures à ``cleared_until`` supprimées.
+    """
+    user = models.OneToOneField(
+        get_user_model(), on_delete=models.CASCADE, primary_key=True, related_name='notification_cursor'
+    )
+    read_until = models.DateTimeField(null=True, blank=True)
+    cleared_until = models.DateTimeField(null=True, blank=True)
+    # Résumé par email des notifications non lues (commande send_notification_digests)
+    email_digest = models.BooleanField(default=False)
+    digest_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} ({self.read_until})"
+
+
+class NotificationArchive(models.Model):
+    """
+    Notification lue archivée par ``prune_notifications``.
+
+    Mêmes colonnes que ``Notification``, hors de la table consultée à chaque
+    page ; supprimée à son tour après ``NOTIFICATION_ARCHIVE_RETENTION_DAYS``.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    recipient = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='archived_notifications')
+    type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES, default='SYSTEM')
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    response_given = models.BooleanField(default=False)
+    response = models.CharField(max_length=10, null=True, blank=True)
+    response_date = models.DateTimeField(null=True, blank=True)
+    content_type = models.ForeignKey(ContentType, on_delete=models.SET_NULL, null=True, blank=True)
+    object_id = models.UUIDField(null=True, blank=True)
+    project_id = models.UUIDField(null=True, blank=True)
+    sender_id = models.UUIDField(null=True, blank=True)
+    group_key = models.CharField(max_length=255, blank=True, default='')
+    actor_count = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at'], name='notification_archive_idx'),
+            models.Index(fields=['created_at'], name='notification_archive_age_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.recipient_id}"
+
+
+class OutboundEmail(models.Model):
+    """
+    Email en attente d'envoi.
+
+    La requête ne fait qu'insérer la ligne (``notifications.mailqueue.queue_mail``) ;
+    la commande ``send_queued_mail`` l'envoie, avec une seule connexion SMTP
+    pour tout un lot, et la reprogramme en cas d'échec.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Prochaine tentative ; repoussée pendant l'envoi pour qu'un autre worker ne la prenne pas
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbound_email_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
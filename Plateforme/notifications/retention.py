@@ -0,0 +1,119 @@
+"""
+Retention of notifications.
+
+Read notifications older than ``NOTIFICATION_RETENTION_DAYS`` are moved to
+``NotificationArchive``; archived rows, announcements and fan-out jobs older
+than ``NOTIFICATION_ARCHIVE_RETENTION_DAYS`` are deleted. Unread
+notifications are never touched.
+
+Rows are moved by batches of primary keys, each batch in its own short
+transaction (copy + delete), so the table is never locked for long and the
+work can be interrupted at any time. The batches are selected through the
+partial index on ``created_at`` of read notifications.
+
+An archive table was preferred to monthly partitioning: PostgreSQL
+partitions require the partition key in every unique constraint, which
+does not fit the UUID primary key and foreign keys of ``Notification``.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Broadcast, Notification, NotificationArchive, NotificationFanout
+
+RETENTION_DAYS = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+ARCHIVE_RETENTION_DAYS = getattr(settings, 'NOTIFICATION_ARCHIVE_RETENTION_DAYS', 365)
+BATCH_SIZE = 1000
+
+ARCHIVED_FIELDS = [
+    'id', 'recipient_id', 'type', 'title', 'message', 'created_at', 'read_at',
+    'response_given', 'response', 'response_date', 'content_type_id', 'object_id',
+    'project_id', 'sender_id', 'group_key', 'actor_count',
+]
+
+
+class PruneStats:
+    """Rows processed by one step and how fast."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        return self.rows / self.seconds if self.seconds else 0
+
+    def __str__(self):
+        return f"{self.name}: {self.rows} rows in {self.batches} batches, {self.seconds:.2f}s ({self.throughput:.0f} rows/s)"
+
+
+def _batches(queryset, stats, process, batch_size, pause):
+    """Run ``process(pks)`` on batches of ``queryset`` until it is empty."""
+    while True:
+        pks = list(queryset.order_by('created_at').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return stats
+        start = time.perf_counter()
+        with transaction.atomic():
+            process(pks)
+        stats.seconds += time.perf_counter() - start
+        stats.rows += len(pks)
+        stats.batches += 1
+        if pause:
+            # Laisse passer les autres transactions entre deux lots
+            time.sleep(pause)
+
+
+def archive_read(days=RETENTION_DAYS, batch_size=BATCH_SIZE, pause=0, archive=True):
+    """Move (or delete, without ``archive``) read notifications older than ``days``."""
+    queryset = Notification.objects.filter(read=True, created_at__lt=timezone.now() - timedelta(days=days))
+
+    def process(pks):
+        if archive:
+            rows = Notification.objects.filter(pk__in=pks).values(*ARCHIVED_FIELDS)
+            NotificationArchive.objects.bulk_create(
+                [NotificationArchive(**row) for row in rows], ignore_conflicts=True
+            )
+        # Sans relation inverse ni signal, Django supprime en une requête
+        Notification.objects.filter(pk__in=pks).delete()
+
+    return _batches(queryset, PruneStats('archived' if archive else 'deleted'), process, batch_size, pause)
+
+
+def purge_archive(days=ARCHIVE_RETENTION_DAYS, batch_size=BATCH_SIZE, pause=0):
+    """Delete archived notifications, announcements and fan-out jobs older than ``days``."""
+    cutoff = timezone.now() - timedelta(days=days)
+    results = []
+    for name, queryset in (
+        ('archive purged', NotificationArchive.objects.filter(created_at__lt=cutoff)),
+        ('announcements purged', Broadcast.objects.filter(created_at__lt=cutoff)),
+        ('fan-out jobs purged', NotificationFanout.objects.filter(created_at__lt=cutoff)),
+    ):
+        model = queryset.model
+        results.append(_batches(
+            queryset, PruneStats(name),
+            # delete() : les accusés de lecture des annonces suivent en cascade
+            lambda pks, model=model: model.objects.filter(pk__in=pks).delete(),
+            batch_size, pause,
+        ))
+    return results
+
+
+def table_report():
+    """``[(table, rows, bytes or None)]`` for the notification tables (size on PostgreSQL only)."""
+    models = [Notification, NotificationArchive, Broadcast, NotificationFanout]
+    report = []
+    for model in models:
+        table = model._meta.db_table
+        size = None
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+                size = cursor.fetchone()[0]
+        report.append((table, model.objects.count(), size))
+    return report
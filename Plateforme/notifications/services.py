@@ -2,6 +2,13 @@ from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 import json
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db import transaction
+from django.utils import timezone
+from . import broadcasts, unread
+from .coalesce import coalesce, withdraw
+from .fanout import fan_out
 from .models import Notification
 
 class NotificationService:
@@ -36,13 +43,14 @@ class NotificationService:
             notification.object_id = related_object.id
         
         notification.save()
+        unread.added(notification)
         
         # Envoyer la notification par WebSocket
         channel_layer = get_channel_layer()
         user_group_name = f"user_{recipient.id}_notifications"
         
         notification_data = {
-            'id': notification.id,
+            'id': str(notification.id),
             'type': notification.get_type_display(),
             'title': notification.title,
             'message': notification.message,
@@ -124,33 +132,117 @@ class NotificationService:
     
     @staticmethod
     def notify_group(users, notification_type, title, message, related_object=None, project_id=None, sender_id=None):
-        """Envoie une notification à un groupe d'utilisateurs"""
-        notifications = []
-        for user in users:
-            notification = NotificationService.create_notification(
-                user, notification_type, title, message, related_object, project_id, sender_id
-            )
-            notifications.append(notification)
-        return notifications
+        """
+        Envoie une notification à un groupe d'utilisateurs
+
+        Les notifications sont créées hors de la requête par lots (voir
+        ``notifications.fanout``) ; renvoie le ``NotificationFanout`` suivi.
+        """
+        if not isinstance(users, QuerySet):
+            users = get_user_model().objects.filter(pk__in=[user.pk for user in users])
+        return fan_out(users, notification_type, title, message, related_object,
+                       project_id=project_id, sender_id=sender_id)
+
+    @staticmethod
+    def notify_all_users(notification_type, title, message, related_object=None, exclude=None):
+        """
+        Envoie une annonce à tous les utilisateurs
+
+        Une seule ligne ``Broadcast`` et un seul message WebSocket, quel que
+        soit le nombre d'utilisateurs (voir ``notifications.broadcasts``).
+        """
+        broadcast = broadcasts.announce(notification_type, title, message, related_object, exclude=exclude)
+        # Compteurs en cache de tous les utilisateurs à recalculer
+        transaction.on_commit(unread.announced)
+        return broadcast
+
+    @staticmethod
+    def create_coalesced(recipient, notification_type, title, actor, action, group_key, related_object=None):
+        """
+        Notification regroupée avec les précédentes de même ``group_key``
+
+        Par exemple « Ali and 41 others liked your post. » au lieu de 42
+        notifications (voir ``notifications.coalesce``).
+        """
+        return coalesce(recipient, notification_type, title, actor, action, group_key, related_object)
+
+    @staticmethod
+    def withdraw_coalesced(recipient, actor, action, group_key):
+        """
+        Retire ``actor`` de la notification regroupée (like annulé)
+
+        La notification est supprimée s'il en était le seul acteur.
+        """
+        return withdraw(recipient, actor, action, group_key)
+
+    @staticmethod
+    def get_unread(user):
+        """Nombre de notifications non lues et les plus récentes (``{"count", "latest"}``), en cache"""
+        return unread.snapshot(user)
+
+    @staticmethod
+    def mark_as_read(user, notification_id):
+        """
+        Marque une notification ou une annonce comme lue
+
+        Renvoie False si elle n'existe pas pour cet utilisateur.
+        """
+        if Notification.objects.filter(id=notification_id, recipient=user, read=False).update(
+            read=True, read_at=timezone.now()
+        ):
+            unread.read(user.pk, notification_id)
+            return True
+        found = broadcasts.mark_as_read(user, notification_id)
+        if found:
+            unread.forget(user.pk)
+        return found
+
+    @staticmethod
+    def mark_many_as_read(user, notification_ids):
+        """
+        Marque un lot de notifications et d'annonces comme lues
+
+        Renvoie le nombre de notifications trouvées pour cet utilisateur.
+        """
+        notification_ids = set(notification_ids)
+        with transaction.atomic():
+            personal = list(Notification.objects.select_for_update().filter(
+                id__in=notification_ids, recipient=user, read=False
+            ).values_list('id', flat=True))
+            if personal:
+                Notification.objects.filter(id__in=personal).update(read=True, read_at=timezone.now())
+        if personal:
+            unread.read(user.pk, *personal)
+        found = broadcasts.mark_broadcasts_as_read(user, notification_ids - set(personal))
+        if found:
+            unread.forget(user.pk)
+        return len(personal) + found
+
+    @staticmethod
+    def mark_all_as_read(user):
+        broadcasts.mark_all_as_read(user)
+        unread.cleared(user.pk)
+
+    @staticmethod
+    def delete_all(user):
+        broadcasts.clear(user)
+        unread.cleared(user.pk)
     
     @staticmethod
     def get_user_notifications(user, read=None, limit=None):
         """
-        Récupère les notifications d'un utilisateur
+        Récupère les notifications d'un utilisateur, annonces comprises
         
         Args:
             user: Utilisateur dont on veut les notifications
             read: Si True, renvoie les notifications lues, si False les non lues, si None toutes
             limit: Nombre maximum de notifications à renvoyer
+
+        Renvoie des dictionnaires (voir ``broadcasts.inbox``), les plus récents d'abord.
         """
-        notifications = Notification.objects.filter(recipient=user)
-        
-        if read is not None:
-            notifications = notifications.filter(read=read)
-        
-        notifications = notifications.order_by('-created_at')
+        notifications = broadcasts.inbox(user, read=read)
         
         if limit:
             notifications = notifications[:limit]
         
-        return notifications
\ No newline at end of file
+        return notifications
@@ -0,0 +1,132 @@
+"""
+Cached unread-notification state of each user.
+
+Every page render shows the unread count and the latest unread entries
+(``context_processors.notification_processor``). They are kept in the cache,
+one key per user holding ``{"count", "latest", "generation"}``, and updated
+in place by ``NotificationService`` when a notification is created or read;
+on a miss they are recomputed with ``broadcasts.inbox()``.
+
+An announcement concerns every user, so instead of touching every key it
+bumps a global generation: snapshots stamped with an older generation are
+recomputed on their next read. Concurrent updates can race (read-modify-
+write), so the entries expire after ``UNREAD_CACHE_TIMEOUT`` anyway.
+"""
+from django.core.cache import cache
+
+from .broadcasts import INBOX_FIELDS, inbox, unread_count
+
+UNREAD_CACHE_KEY = 'notifications:unread:{}'
+GENERATION_KEY = 'notifications:broadcast_generation'
+UNREAD_CACHE_TIMEOUT = 60 * 10
+# Quelques entrées de réserve pour que marquer comme lu ne vide pas la liste
+SNAPSHOT_SIZE = 10
+
+
+def _key(user_id):
+    return UNREAD_CACHE_KEY.format(user_id)
+
+
+def _cached(user_id):
+    """Cached state of the user, ``None`` if missing or older than the last announcement."""
+    key = _key(user_id)
+    values = cache.get_many([key, GENERATION_KEY])
+    state = values.get(key)
+    if state is None or state['generation'] != values.get(GENERATION_KEY, 0):
+        return None
+    return state
+
+
+def _store(user_id, state):
+    cache.set(_key(user_id), state, UNREAD_CACHE_TIMEOUT)
+
+
+def snapshot(user):
+    """``{"count", "latest"}`` of ``user``; two queries on a cache miss, none otherwise."""
+    state = _cached(user.pk)
+    if state is None:
+        generation = cache.get(GENERATION_KEY, 0)
+        state = {
+            'count': unread_count(user),
+            'latest': list(inbox(user, read=False)[:SNAPSHOT_SIZE]),
+            'generation': generation,
+        }
+        _store(user.pk, state)
+    return state
+
+
+def cached_since(user_id, since):
+    """
+    ``(entries, count)``: the unread entries newer than ``since`` and the
+    unread count, from the cached snapshot without any query. ``None`` if
+    there is no fresh snapshot or it cannot tell (all its entries are newer
+    than ``since`` and older unread ones are missing from it).
+    """
+    state = _cached(user_id)
+    if state is None:
+        return None
+    latest = state['latest']
+    entries = [item for item in latest if item['created_at'] > since]
+    if len(entries) == len(latest) and len(latest) < state['count']:
+        return None
+    return entries, state['count']
+
+
+def entry(notification):
+    """``inbox()`` entry of a personal notification."""
+    values = {field: getattr(notification, field, None) for field in INBOX_FIELDS}
+    values['is_broadcast'] = False
+    return values
+
+
+def added(notification):
+    """A personal notification was created."""
+    state = _cached(notification.recipient_id)
+    if state is None:
+        return
+    state['count'] += 1
+    state['latest'] = [entry(notification)] + state['latest'][:SNAPSHOT_SIZE - 1]
+    _store(notification.recipient_id, state)
+
+
+def updated(notification):
+    """An unread personal notification changed and moved to the top (coalescing)."""
+    state = _cached(notification.recipient_id)
+    if state is None:
+        return
+    latest = [item for item in state['latest'] if str(item['id']) != str(notification.id)]
+    state['latest'] = [entry(notification)] + latest[:SNAPSHOT_SIZE - 1]
+    _store(notification.recipient_id, state)
+
+
+def read(user_id, *notification_ids):
+    """Unread notifications of the user were marked as read."""
+    state = _cached(user_id)
+    if state is None:
+        return
+    read_ids = {str(notification_id) for notification_id in notification_ids}
+    latest = [item for item in state['latest'] if str(item['id']) not in read_ids]
+    state['count'] = max(state['count'] - len(read_ids), 0)
+    if len(latest) < min(state['count'], SNAPSHOT_SIZE):
+        # Plus assez d'entrées en réserve : recalcul à la prochaine lecture
+        forget(user_id)
+        return
+    state['latest'] = latest
+    _store(user_id, state)
+
+
+def cleared(user_id):
+    """Everything was marked as read, or deleted."""
+    _store(user_id, {'count': 0, 'latest': [], 'generation': cache.get(GENERATION_KEY, 0)})
+
+
+def forget(*user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+def announced():
+    """A new announcement: every snapshot becomes stale."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
@@ -13,5 +13,6 @@ urlpatterns = [
     path('mark-all-read/', views.mark_all_read, name='mark_all_read'),
     path('delete-all/', views.delete_all_notifications, name='delete_all'),
     path('mark-read/<uuid:notification_id>/', views.mark_read, name='mark_read'),
+    path('email-digest/', views.toggle_email_digest, name='toggle_email_digest'),
     path('ajax/count/', views.api_notification_count, name='ajax_count'),
 ]
\ No newline at end of file
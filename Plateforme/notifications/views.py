@@ -2,16 +2,18 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.utils import timezone
-from .models import Notification
+from .models import Notification, NotificationCursor
 from .services import NotificationService
+from . import broadcasts
+from django.http import Http404
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib import messages
 
 @login_required
 def notification_list(request):
     
-    """Vue pour afficher la liste des notifications"""
-    notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')
+    """Vue pour afficher la liste des notifications (annonces comprises)"""
+    notifications = broadcasts.inbox(request.user)
 
     paginator = Paginator(notifications, 10)  
     page = request.GET.get('page')
@@ -27,43 +29,33 @@ def notification_list(request):
     return render(request, 'notifications/list.html', {
         'notifications': notifications,
         'user': request.user,  # Assurez-vous que l'utilisateur est explicitement passé
+        'email_digest': NotificationCursor.objects.filter(user=request.user, email_digest=True).exists(),
     })
 @login_required
 def api_notification_list(request):
-    notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')[:20]
-    data = [{
-        'id': n.id,
-        'title': n.title,
-        'message': n.message,
-        'created_at': n.created_at.isoformat(),
-        'read': n.read,
-    } for n in notifications]
+    notifications = broadcasts.inbox(request.user)[:20]
+    data = [broadcasts.serialize(n) for n in notifications]
     return JsonResponse({'notifications': data})
 
 @login_required
 def api_mark_as_read(request, notification_id):
-    """API pour marquer une notification comme lue"""
-    notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
-    notification.read = True
-    notification.read_at = timezone.now()
-    notification.save()
+    """API pour marquer une notification (ou une annonce) comme lue"""
+    if not NotificationService.mark_as_read(request.user, notification_id):
+        raise Http404
     
     return JsonResponse({'success': True})
 
 @login_required
 def api_mark_all_as_read(request):
     """API pour marquer toutes les notifications comme lues"""
-    Notification.objects.filter(recipient=request.user, read=False).update(
-        read=True,
-        read_at=timezone.now()
-    )
+    NotificationService.mark_all_as_read(request.user)
     
     return JsonResponse({'success': True})
 
 @login_required
 def api_notification_count(request):
     """API pour obtenir le nombre de notifications non lues"""
-    count = Notification.objects.filter(recipient=request.user, read=False).count()
+    count = NotificationService.get_unread(request.user)['count']
     return JsonResponse({'count': count})
 
 @login_required
@@ -87,40 +79,44 @@ def api_notification_list_filtered(request):
     )
     
     # Formater les données
-    data = [{
-        'id': n.id,
-        'type': n.get_type_display(),
-        'type_code': n.type,
-        'title': n.title,
-        'message': n.message,
-        'created_at': n.created_at.isoformat(),
-        'read': n.read,
-        'read_at': n.read_at.isoformat() if n.read_at else None,
-    } for n in notifications]
+    data = [broadcasts.serialize(n) for n in notifications]
     
     return JsonResponse({'notifications': data})
 
 @login_required
 def mark_all_read(request):
     """Marque toutes les notifications non lues de l'utilisateur comme lues."""
-    request.user.notifications.filter(read=False).update(read=True)
+    NotificationService.mark_all_as_read(request.user)
     messages.success(request, "All notifications have been marked as read.")
     return redirect('notifications:list')
 
 @login_required
 def mark_read(request, notification_id):
     """Marque une notification spécifique comme lue et redirige vers la liste."""
-    notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
-    notification.read = True
-    notification.read_at = timezone.now()
-    notification.save()
+    if not NotificationService.mark_as_read(request.user, notification_id):
+        raise Http404
     messages.success(request, "Notification marked as read.")
     # Rediriger vers la page d'où la requête provenait, ou par défaut la liste
     next_url = request.GET.get('next', request.META.get('HTTP_REFERER', redirect('notifications:list').url))
     return redirect(next_url)
 
+@login_required
+def toggle_email_digest(request):
+    """Active ou désactive le résumé quotidien des notifications non lues par email."""
+    if request.method == 'POST':
+        enabled = request.POST.get('email_digest') == 'on'
+        # Le résumé ne reprend que les notifications reçues après l'activation
+        NotificationCursor.objects.update_or_create(
+            user=request.user, defaults={'email_digest': enabled, 'digest_until': timezone.now()}
+        )
+        if enabled:
+            messages.success(request, "You will receive a daily email digest of your unread notifications.")
+        else:
+            messages.success(request, "Email digest disabled.")
+    return redirect('notifications:list')
+
 def delete_all_notifications(request):
-    Notification.objects.filter(recipient=request.user).delete()
+    NotificationService.delete_all(request.user)
     messages.success(request, "All your notifications have been deleted.")
     return redirect('notifications:list') 
 
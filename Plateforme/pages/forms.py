@@ -1,6 +1,7 @@
 
 from django import forms
 from django.utils.translation import gettext_lazy as _
+from resources.importers import detect_format
 from .models import ContactMessage
 
 
@@ -56,4 +57,38 @@ class AdminResponseForm(forms.ModelForm):
         labels = {
             'admin_response': _('Response'),
             'status': _('Status'),
-        }
\ No newline at end of file
+        }
+
+class ResourceImportForm(forms.Form):
+    FORMAT_CHOICES = [
+        ('', _('Detect from extension')),
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+        ('bibtex', 'BibTeX'),
+    ]
+
+    file = forms.FileField(
+        label=_('File'),
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson,.json,.bib'})
+    )
+    format = forms.ChoiceField(
+        label=_('Format'),
+        choices=FORMAT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    dry_run = forms.BooleanField(
+        label=_('Validate only (nothing is saved)'),
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('file')
+        if upload and not cleaned_data.get('format'):
+            fmt = detect_format(upload.name)
+            if not fmt:
+                self.add_error('format', _("Cannot guess the format of this file, please select it"))
+            cleaned_data['format'] = fmt
+        return cleaned_data
@@ -12,6 +12,8 @@ urlpatterns = [
     path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('admin/users/', views.admin_users, name='admin_users'),
     path('admin/publications/', views.admin_publications, name='admin_publications'),
+    path('admin/publications/import/', views.admin_import_resources, name='admin_import_resources'),
+    path('admin/export/<str:kind>/', views.admin_export, name='admin_export'),
     path('admin/corpora/', views.admin_corpora, name='admin_corpora'),
     path('admin/tools/', views.admin_tools, name='admin_tools'),
     path('admin/projects/', views.admin_projects, name='admin_projects'),
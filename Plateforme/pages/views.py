@@ -1,22 +1,29 @@
 from django.conf import settings
 from django.db import transaction
 from django.urls import reverse
-from django.core.mail import send_mail
 from django.views.generic import TemplateView
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
-from pages.forms import AdminResponseForm, ContactForm
+from pages.forms import AdminResponseForm, ContactForm, ResourceImportForm
 from accounts.models import CustomUser
 from events.models import Event
 from resources.models import Corpus, NLPTool ,Document , Course
+from resources.importers import import_resources
+from resources.exporters import (
+    CONTENT_TYPES, EXPORTS, FORMATS as EXPORT_FORMATS, export_filename, filter_corpora, filter_courses,
+    filter_publications, filter_tools, stream_export,
+)
 from projects.models import Project ,ProjectMember
 from django.contrib.auth import get_user_model
 from forum.models import Topic , ChatRoom, Message
 from django.db.models.functions import TruncDate, TruncMonth
-from notifications.models import Notification
+from notifications.services import NotificationService
+from notifications.mailqueue import queue_mail
+from accounts.presence import online_users
 from QA.models import Post , Question
 from django.db.models import Count, Sum
 import datetime
+import io
 import json
 from datetime import timedelta
 from django.utils import timezone
@@ -24,6 +31,9 @@ from django.core.paginator import Paginator
 
 User = get_user_model()
 
+# Nombre maximal d'erreurs affichées après un import
+IMPORT_REPORT_MAX_ERRORS = 200
+
 class HomePageView(TemplateView):
     template_name = 'home.html'
 
@@ -42,9 +52,7 @@ class HomePageView(TemplateView):
         context['members_count'] = User.objects.count()
         
         # Posts populaires (les plus likés)
-        context['popular_posts'] = Post.objects.annotate(
-            total_likes=Count('likes')
-        ).order_by('-total_likes', '-created_at')[:3]
+        context['popular_posts'] = Post.objects.select_related('author').order_by('-like_count', '-created_at')[:3]
 
 
 
@@ -90,7 +98,7 @@ class HomePageView(TemplateView):
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.utils import timezone
 from django.db.models import Count, Q
 from .models import  ContactMessage, Stats ,UserStatusHistory
@@ -129,6 +137,7 @@ def admin_dashboard(request):
     
     # Count statistics
     users_count = User.objects.count()
+    online_users_count = online_users().count()
     resources_count = (
         Document.objects.count() + 
         Corpus.objects.count() + 
@@ -296,6 +305,7 @@ def admin_dashboard(request):
         'recent_tools': recent_tools,
         'recent_projects': recent_projects,
         'users_count': users_count,
+        'online_users_count': online_users_count,
         'resources_count': resources_count,
         'projects_count': projects_count,
         'forum_posts_count': forum_posts_count,
@@ -470,8 +480,9 @@ def admin_user_activate(request, user_id):
     )
     
     # Notification d'activation
-    Notification.objects.create(
+    NotificationService.create_notification(
         recipient=user,
+        notification_type='SYSTEM',
         title="Account activated",
         message="Your account has been activated by an administrator. You can now access all features."
     )
@@ -515,8 +526,9 @@ def admin_user_block(request, user_id):
         )
         
         # Notification de blocage
-        Notification.objects.create(
+        NotificationService.create_notification(
             recipient=user,
+            notification_type='SYSTEM',
             title="Blocked account",
             message="Your account has been locked by an administrator. Please contact support if necessary."
         )
@@ -649,19 +661,7 @@ def admin_publications(request):
     publication_type = request.GET.get('publication_type', '')
     search = request.GET.get('search', '')
     
-    # Base queryset
-    publications = Document.objects.all().order_by('-creation_date')
-    
-    # Apply filters
-    if publication_type:
-        publications = publications.filter(document_type=publication_type)
-    if search:
-        publications = publications.filter(
-            Q(title__icontains=search) | 
-            Q(description__icontains=search) |
-            Q(keywords__icontains=search) |
-            Q(authors__full_name__icontains=search)
-        ).distinct()
+    publications = filter_publications(request.GET)
     
     context = {
         'publications': publications,
@@ -672,6 +672,64 @@ def admin_publications(request):
     return render(request, 'admin/publications.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+def admin_export(request, kind):
+    """Stream the filtered admin list as CSV or JSON Lines (?format=, ?gzip=1)"""
+    if kind not in EXPORTS:
+        raise Http404
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    compress = request.GET.get('gzip') in ('1', 'true')
+
+    response = StreamingHttpResponse(
+        stream_export(kind, fmt, request.GET, compress=compress),
+        content_type='application/gzip' if compress else CONTENT_TYPES[fmt],
+    )
+    filename = export_filename(kind, fmt, compress=compress, date=timezone.now())
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin)
+def admin_import_resources(request):
+    """Bulk import of resources from an uploaded CSV / JSON Lines / BibTeX file"""
+    report = None
+    if request.method == 'POST':
+        form = ResourceImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            report = import_resources(
+                stream,
+                form.cleaned_data['format'],
+                request.user,
+                dry_run=form.cleaned_data['dry_run'],
+            )
+            stream.detach()
+            if report.file_error:
+                messages.error(request, report.file_error)
+            if report.dry_run:
+                messages.info(request, _("%(count)s valid rows, %(errors)s errors") % {
+                    'count': report.rows - len(report.errors), 'errors': len(report.errors)})
+            else:
+                messages.success(request, _("%(count)s resources imported, %(errors)s errors") % {
+                    'count': report.created_count, 'errors': len(report.errors)})
+                if report.created_count and not report.indexed:
+                    messages.warning(request, _("Search indexing failed, the index must be rebuilt"))
+    else:
+        form = ResourceImportForm()
+
+    context = {
+        'form': form,
+        'report': report,
+        'errors': report.errors[:IMPORT_REPORT_MAX_ERRORS] if report else [],
+    }
+    return render(request, 'admin/import_resources.html', context)
+
+
 @login_required
 @user_passes_test(is_admin)
 def admin_corpora(request):
@@ -680,18 +738,7 @@ def admin_corpora(request):
     corpus_type = request.GET.get('corpus_type', '')
     search = request.GET.get('search', '')
     
-    # Base queryset
-    corpora = Corpus.objects.all().order_by('-creation_date')
-    
-    # Apply filters
-    if corpus_type:
-        corpora = corpora.filter(corpus_type=corpus_type)
-    if search:
-        corpora = corpora.filter(
-            Q(title__icontains=search) | 
-            Q(description__icontains=search) |
-            Q(author__full_name__icontains=search)
-        )
+    corpora = filter_corpora(request.GET)
     
     context = {
         'corpora': corpora,
@@ -709,18 +756,7 @@ def admin_tools(request):
     tool_type = request.GET.get('tool_type', '')
     search = request.GET.get('search', '')
     
-    # Base queryset
-    tools = NLPTool.objects.all().order_by('-creation_date')
-    
-    # Apply filters
-    if tool_type:
-        tools = tools.filter(tool_type=tool_type)
-    if search:
-        tools = tools.filter(
-            Q(title__icontains=search) | 
-            Q(description__icontains=search) |
-            Q(author__full_name__icontains=search)
-        )
+    tools = filter_tools(request.GET)
     
     context = {
         'tools': tools,
@@ -848,20 +884,7 @@ def admin_courses(request):
     is_public = request.GET.get('is_public', '')
     search = request.GET.get('search', '')
     
-    # Base queryset
-    courses = Course.objects.all().order_by('-creation_date')
-    
-    # Apply filters
-    if level:
-        courses = courses.filter(level=level)
-    if is_public:
-        courses = courses.filter(is_public=(is_public == 'true'))
-    if search:
-        courses = courses.filter(
-            Q(title__icontains=search) | 
-            Q(description__icontains=search) |
-            Q(author__full_name__icontains=search)
-        )
+    courses = filter_courses(request.GET)
     
     # Statistiques dynamiques pour les cours
     total_courses_count = courses.count()
@@ -910,10 +933,8 @@ def admin_forum(request):
     search = request.GET.get('search', '')
     page_number = request.GET.get('page')
 
-    # Base queryset with proper prefetch for chatrooms
-    topics = Topic.objects.prefetch_related('chatrooms').annotate(
-        total_messages=Count('chatrooms__messages')
-    ).order_by('-created_at')
+    # Compteurs dénormalisés (forum.counters) : ni jointure ni agrégat par topic
+    topics = Topic.objects.select_related('creator').order_by('-created_at')
 
     # Apply filters
     if status == 'open':
@@ -936,7 +957,7 @@ def admin_forum(request):
     total_topics_count = Topic.objects.count()
     open_topics_count = Topic.objects.filter(is_closed=False).count()
     closed_topics_count = Topic.objects.filter(is_closed=True).count()
-    total_messages_count = Message.objects.count()
+    total_messages_count = Topic.objects.aggregate(total=Sum('message_count'))['total'] or 0
 
     context = {
         'topics': page_obj,
@@ -1484,17 +1505,14 @@ def contact_view(request):
                 contact_message.user = request.user
             contact_message.save()
             
-            # Envoyer une notification email à l'admin (optionnel)
-            try:
-                send_mail(
+            # Notification email à l'admin (optionnel, mise en file)
+            if settings.ADMIN_EMAIL:
+                queue_mail(
                     subject=f"[Arabic NLP Platform] New Contact Message: {contact_message.get_subject_display()}",
                     message=f"New message from {contact_message.name} ({contact_message.email})\n\n{contact_message.message}",
                     from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[settings.ADMIN_EMAIL],  # Vous devez définir cette variable dans settings.py
-                    fail_silently=True,
+                    recipient_list=[settings.ADMIN_EMAIL],
                 )
-            except:
-                pass
             
             messages.success(request, _('Your message has been sent successfully. We will get back to you soon.'))
             return redirect('contact:contact')
@@ -1589,17 +1607,14 @@ def admin_contact_detail(request, pk):
             
             # Envoyer la réponse par email si il y a une réponse
             if response.admin_response:
-                try:
-                    send_mail(
-                        subject=f"[Arabic NLP Platform] Response to your message: {contact_message.get_subject_display()}",
-                        message=f"Hello {contact_message.name},\n\n{response.admin_response}\n\nBest regards,\nArabic NLP Platform Team",
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[contact_message.email],
-                        fail_silently=True,
-                    )
-                    messages.success(request, _('Response sent successfully.'))
-                except:
-                    messages.warning(request, _('Response saved but email could not be sent.'))
+                # Mis en file : envoyé par send_queued_mail
+                queue_mail(
+                    subject=f"[Arabic NLP Platform] Response to your message: {contact_message.get_subject_display()}",
+                    message=f"Hello {contact_message.name},\n\n{response.admin_response}\n\nBest regards,\nArabic NLP Platform Team",
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[contact_message.email],
+                )
+                messages.success(request, _('Response sent successfully.'))
             else:
                 messages.success(request, _('Status updated successfully.'))
             
@@ -118,15 +118,12 @@ class ProjectCreateView(LoginAndVerifiedRequiredMixin, CreateView):
         form.instance.coordinator = self.request.user
         response = super().form_valid(form)
         # NOTIFICATION à tous les utilisateurs actifs via le service
-        User = get_user_model()
-        for user in User.objects.filter(is_active=True):
-            NotificationService.create_notification(
-                recipient=user,
-                notification_type='SYSTEM', # Ou un type spécifique si tu en crées un pour les nouveaux projets
-                title="New research project",
-                message=f"The project « {form.instance.title} » has just been published."
-            )
-           
+        NotificationService.notify_all_users(
+            'SYSTEM', # Ou un type spécifique si tu en crées un pour les nouveaux projets
+            "New research project",
+            f"The project « {form.instance.title} » has just been published."
+        )
+
         return response
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -357,8 +354,8 @@ class RespondToLeaveRequestView(LoginAndVerifiedRequiredMixin, UserPassesTestMix
                 if notification:
                     notification.response_given = True
                     notification.response = 'approve'
-                    notification.read = True
                     notification.save()
+                    NotificationService.mark_as_read(request.user, notification.id)
                 
                 messages.success(request, _('Leave request approved. {} has been removed from the project.').format(leaving_user.full_name))
                 
@@ -380,8 +377,8 @@ class RespondToLeaveRequestView(LoginAndVerifiedRequiredMixin, UserPassesTestMix
                 if notification:
                     notification.response_given = True
                     notification.response = 'reject'
-                    notification.read = True
                     notification.save()
+                    NotificationService.mark_as_read(request.user, notification.id)
                 
                 messages.success(request, _('Leave request rejected.'))
         
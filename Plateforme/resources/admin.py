@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Document, NLPTool, Course , Article, Thesis, Memoir,Corpus 
+from .models import Document, NLPTool, Course , Article, Thesis, Memoir,Corpus, Tag, CorpusProfile, DocumentText
 # Register your models here.
 from django.contrib import admin
 from .models import Document, Article, Thesis, Memoir
@@ -42,3 +42,22 @@ admin.site.register(Article)
 admin.site.register(Thesis)
 admin.site.register(Memoir)
 admin.site.register(Corpus)
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'normalized', 'usage_count']
+    search_fields = ['name', 'normalized']
+
+
+@admin.register(CorpusProfile)
+class CorpusProfileAdmin(admin.ModelAdmin):
+    list_display = ['corpus', 'token_count', 'type_count', 'segment_count', 'dominant_script', 'computed_at']
+    list_filter = ['dominant_script']
+    readonly_fields = ['computed_at']
+
+
+@admin.register(DocumentText)
+class DocumentTextAdmin(admin.ModelAdmin):
+    list_display = ['document', 'status', 'char_count', 'extracted_at']
+    list_filter = ['status']
+    readonly_fields = ['extracted_at']
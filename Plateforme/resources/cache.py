@@ -0,0 +1,66 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+# Durée de vie des fragments mis en cache sur les pages de détail (en secondes)
+DETAIL_CACHE_TIMEOUT = getattr(settings, 'RESOURCE_DETAIL_CACHE_TIMEOUT', 60 * 60 * 24)
+
+GENERATION_KEY = 'resources:detail:generation:{}'
+
+# Types de ressource (au sens des URLs de détail) invalidés par chaque modèle
+MODEL_RESOURCE_TYPES = {
+    'course': ('course',),
+    'nlptool': ('tool',),
+    'corpus': ('corpus',),
+    'corpusprofile': ('corpus',),
+    'document': ('document', 'article', 'thesis', 'memoir'),
+    'article': ('article',),
+    'thesis': ('thesis',),
+    'memoir': ('memoir',),
+    'institution': ('course', 'thesis', 'memoir'),
+}
+
+
+def get_generation(resource_type):
+    """Return the current generation counter of a resource type."""
+    key = GENERATION_KEY.format(resource_type)
+    generation = cache.get(key)
+    if generation is None:
+        # Démarrer à partir de l'horloge : si la clé a été évincée, on ne
+        # retombe jamais sur une génération déjà utilisée par un fragment.
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def bump_generation(*resource_types):
+    """Invalidate every cached detail fragment of the given resource types."""
+    for resource_type in resource_types:
+        key = GENERATION_KEY.format(resource_type)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), None)
+
+
+def bump_generation_for_model(model):
+    bump_generation(*MODEL_RESOURCE_TYPES.get(model._meta.model_name, ()))
+
+
+def detail_cache_version(obj, resource_type):
+    """
+    Build the version string used to key the detail page fragments.
+
+    The fragment changes when the object itself is updated (``update_date``),
+    when anything of the same type is saved or deleted (generation counter)
+    and with the active language, since the fragment contains translations.
+    """
+    stamp = getattr(obj, 'update_date', None) or getattr(obj, 'creation_date', None)
+    return ':'.join([
+        resource_type,
+        str(obj.pk),
+        str(int(stamp.timestamp())) if stamp else '0',
+        str(get_generation(resource_type)),
+        get_language() or '',
+    ])
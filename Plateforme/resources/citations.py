@@ -0,0 +1,268 @@
+"""
+Batch citation export of documents (BibTeX, RIS, CSL-JSON).
+
+``Document.get_citation()`` probes the subtypes one relation at a time and
+then loads the author and the institution, several queries per document.
+Here the documents are read with their subtype, institution and uploader
+joined (``select_related``) and their ``authors`` prefetched, by chunks of
+``.iterator(chunk_size)``: two queries per chunk whatever the number of
+documents. Formatted entries are cached per document version (update date
+and author list), fetched and stored with one cache round trip per chunk.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from itertools import islice
+
+from django.core.cache import cache
+
+from .cache import get_generation
+from .exporters import iter_blocks
+from .models import Document
+
+FORMATS = ('bibtex', 'ris', 'csl-json')
+CONTENT_TYPES = {
+    'bibtex': 'application/x-bibtex; charset=utf-8',
+    'ris': 'application/x-research-info-systems; charset=utf-8',
+    'csl-json': 'application/vnd.citationstyles.csl+json; charset=utf-8',
+}
+EXTENSIONS = {
+    'bibtex': 'bib',
+    'ris': 'ris',
+    'csl-json': 'json',
+}
+
+CHUNK_SIZE = 500
+CITATION_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+CITATION_CACHE_KEY = 'resources:citation:{}:{}:{}'
+# À incrémenter quand le format des entrées change
+CITATION_VERSION = 1
+# Types dont les compteurs de génération (resources.cache) entrent dans la version
+CITED_TYPES = ('document', 'article', 'thesis', 'memoir')
+
+BIBTEX_SPECIAL_RE = re.compile(r'([\\{}%&$#_])')
+
+
+def citation_queryset(queryset=None):
+    """Documents with everything the formatters read, in two queries per chunk."""
+    queryset = Document.objects.all() if queryset is None else queryset
+    return queryset.select_related(
+        'author', 'article', 'thesis__institution', 'memoir__institution'
+    ).prefetch_related('authors')
+
+
+# ==================== FIELDS ====================
+
+def _subtype(document):
+    for name in ('article', 'thesis', 'memoir'):
+        subtype = getattr(document, name, None)
+        if subtype is not None:
+            return name, subtype
+    return None, None
+
+
+def _name(user):
+    return (user.full_name or user.email) if user else ''
+
+
+def citation_fields(document):
+    """Format-independent description of a document."""
+    kind, subtype = _subtype(document)
+    authors = [_name(user) for user in document.authors.all()] or [_name(document.author)]
+    fields = {
+        'kind': kind or 'misc',
+        'title': document.title,
+        'authors': [name for name in authors if name],
+        'year': document.creation_date.year if document.creation_date else None,
+        'abstract': document.description,
+        'keywords': document.get_keywords_list(),
+        'url': document.access_link or '',
+        'language': document.language,
+        'journal': '',
+        'doi': '',
+        'institution': '',
+        'level': '',
+        'supervisor': '',
+    }
+    if kind == 'article':
+        fields.update({
+            'journal': subtype.journal,
+            'doi': subtype.doi or '',
+            'year': subtype.publication_date.year if subtype.publication_date else fields['year'],
+        })
+    elif kind in ('thesis', 'memoir'):
+        fields.update({
+            'institution': subtype.institution.name if subtype.institution else '',
+            'year': subtype.defense_year or fields['year'],
+            'level': 'doctorate' if kind == 'thesis' else subtype.academic_level,
+            'supervisor': getattr(subtype, 'supervisor', ''),
+        })
+    return fields
+
+
+# ==================== FORMATTERS ====================
+
+def _bibtex_escape(value):
+    return BIBTEX_SPECIAL_RE.sub(r'\\\1', str(value))
+
+
+def bibtex_key(document, fields):
+    """``lastnameYEARfirstword`` key, ASCII only, made unique by the id."""
+    def ascii_word(text):
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+        words = re.findall(r'[A-Za-z0-9]+', text)
+        return words[0].lower() if words else ''
+
+    author = fields['authors'][0].split()[-1] if fields['authors'] else ''
+    key = f"{ascii_word(author)}{fields['year'] or ''}{ascii_word(fields['title'])}"
+    return f"{key or 'doc'}-{str(document.pk)[:8]}"
+
+
+def format_bibtex(document, fields):
+    entry_type = {
+        'article': 'article',
+        'thesis': 'phdthesis',
+    }.get(fields['kind'], 'mastersthesis' if fields['level'] == 'master' else 'misc')
+    values = [
+        ('title', fields['title']),
+        ('author', ' and '.join(fields['authors'])),
+        ('year', fields['year']),
+        ('journal', fields['journal']),
+        ('doi', fields['doi']),
+        ('school', fields['institution']),
+        ('type', fields['level'].capitalize() if entry_type == 'misc' and fields['level'] else ''),
+        ('url', fields['url']),
+        ('keywords', ', '.join(fields['keywords'])),
+        ('language', fields['language']),
+    ]
+    lines = [f"@{entry_type}{{{bibtex_key(document, fields)},"]
+    lines += [f"  {name} = {{{_bibtex_escape(value)}}}," for name, value in values if value]
+    return '\n'.join(lines) + '\n}\n\n'
+
+
+def format_ris(document, fields):
+    entry_type = {'article': 'JOUR', 'thesis': 'THES', 'memoir': 'THES'}.get(fields['kind'], 'GEN')
+    lines = [('TY', entry_type), ('TI', fields['title'])]
+    lines += [('AU', author) for author in fields['authors']]
+    lines += [
+        ('PY', fields['year']),
+        ('JO', fields['journal']),
+        ('DO', fields['doi']),
+        ('PB', fields['institution']),
+        ('M3', fields['level'].capitalize() if fields['kind'] == 'memoir' else ''),
+        ('UR', fields['url']),
+        ('LA', fields['language']),
+        ('AB', ' '.join(fields['abstract'].split())),
+    ]
+    lines += [('KW', keyword) for keyword in fields['keywords']]
+    lines.append(('ER', ''))
+    return ''.join(f"{tag}  - {value}\n" for tag, value in lines if value or tag == 'ER') + '\n'
+
+
+def format_csl_json(document, fields):
+    item = {
+        'id': str(document.pk),
+        'type': {'article': 'article-journal', 'thesis': 'thesis', 'memoir': 'thesis'}.get(fields['kind'], 'document'),
+        'title': fields['title'],
+        'author': [{'literal': author} for author in fields['authors']],
+        'abstract': fields['abstract'],
+        'language': fields['language'],
+    }
+    if fields['year']:
+        item['issued'] = {'date-parts': [[fields['year']]]}
+    optional = {
+        'container-title': fields['journal'],
+        'DOI': fields['doi'],
+        'publisher': fields['institution'],
+        'genre': fields['level'].capitalize() if fields['kind'] == 'memoir' else '',
+        'URL': fields['url'],
+        'keyword': ', '.join(fields['keywords']),
+    }
+    item.update({name: value for name, value in optional.items() if value})
+    return json.dumps(item, ensure_ascii=False)
+
+
+FORMATTERS = {
+    'bibtex': format_bibtex,
+    'ris': format_ris,
+    'csl-json': format_csl_json,
+}
+
+
+# ==================== CACHE ====================
+
+def citation_generations():
+    """Detail cache generations of the document types, read once per chunk."""
+    return {resource_type: get_generation(resource_type) for resource_type in CITED_TYPES}
+
+
+def citation_version(document, generations=None):
+    """
+    Version of a document's citation: changes with its update date, its
+    author list and the generation counters of its type, bumped when an
+    Article / Thesis / Memoir row or an institution is saved.
+    """
+    if generations is None:
+        generations = citation_generations()
+    authors = ','.join(sorted(str(user.pk) for user in document.authors.all()))
+    stamp = document.update_date.isoformat() if document.update_date else ''
+    counters = f"{generations.get('document', '')}:{generations.get(document.document_type, '')}"
+    return hashlib.sha1(f"{CITATION_VERSION}:{stamp}:{authors}:{counters}".encode('utf-8')).hexdigest()[:16]
+
+
+def format_documents(documents, fmt):
+    """Formatted entries of ``documents`` (a chunk), with one cache read and one write."""
+    generations = citation_generations()
+    keys = [
+        CITATION_CACHE_KEY.format(fmt, document.pk, citation_version(document, generations))
+        for document in documents
+    ]
+    cached = cache.get_many(keys)
+    missing = {}
+    entries = []
+    for key, document in zip(keys, documents):
+        entry = cached.get(key)
+        if entry is None:
+            entry = missing[key] = FORMATTERS[fmt](document, citation_fields(document))
+        entries.append(entry)
+    if missing:
+        cache.set_many(missing, CITATION_CACHE_TIMEOUT)
+    return entries
+
+
+def format_citation(document, fmt='bibtex'):
+    """Formatted entry of one document (prefetched with ``citation_queryset``)."""
+    return format_documents([document], fmt)[0]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_citations(queryset, fmt, chunk_size=CHUNK_SIZE):
+    """Yield the export of ``queryset`` in ``fmt``, one chunk of documents at a time."""
+    documents = citation_queryset(queryset).iterator(chunk_size=chunk_size)
+    if fmt == 'csl-json':
+        # Tableau JSON produit au fil de l'eau
+        yield '['
+        first = True
+        for chunk in _chunks(documents, chunk_size):
+            for entry in format_documents(chunk, fmt):
+                yield entry if first else ',\n' + entry
+                first = False
+        yield ']\n'
+    else:
+        for chunk in _chunks(documents, chunk_size):
+            yield from format_documents(chunk, fmt)
+
+
+def stream_citations(queryset, fmt, chunk_size=CHUNK_SIZE):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown citation format: {fmt}")
+    return iter_blocks(iter_citations(queryset, fmt, chunk_size))
@@ -0,0 +1,331 @@
+"""
+Positional index and KWIC concordances of hosted corpus files.
+
+The index of a corpus is built offline (``build_concordance_index``) into a
+directory of flat binary files that are opened with ``numpy.memmap``, so a
+query only touches the pages it needs and the corpus is never loaded in
+memory:
+
+* ``tokens.u32``: the corpus as a stream of surface-form ids;
+* ``surface.bin`` / ``surface.idx``: the surface forms (UTF-8 bytes and
+  ``uint64`` offsets), in id order, used to print the context;
+* ``terms.bin`` / ``terms.idx``: the normalized terms, sorted, searched by
+  bisection (exact words and prefixes);
+* ``surface_terms.u32``: normalized term of each surface form;
+* ``postings.u32`` / ``postings.idx``: the positions of each term, grouped
+  by term and sorted, with the ``uint64`` offset of each group. The terms
+  of a prefix are contiguous, so are their positions;
+* ``segments.u64``: first token of each segment (line, CSV row, record);
+* ``meta.json``: counts and the name/size of the indexed file.
+
+A word query slices its postings; a phrase query intersects the postings of
+its words shifted by their offset in the phrase. Matching uses the
+normalization of ``resources.text`` (case, diacritics, alef/ya/ta marbuta
+forms), the context is printed with the original surface forms.
+"""
+import bisect
+import json
+import mmap
+import os
+import re
+import shutil
+from array import array
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .corpus_stats import detect_file_format, iter_segments, plan_shards, text_columns
+from .text import normalize
+
+INDEX_VERSION = 1
+INDEX_ROOT = getattr(settings, 'CORPUS_INDEX_ROOT', os.path.join(settings.BASE_DIR, 'var', 'corpus_index'))
+
+MODES = ('word', 'phrase', 'prefix')
+DEFAULT_CONTEXT = 8
+MAX_CONTEXT = 30
+MAX_PHRASE_LENGTH = 10
+# Un préfixe trop court couvrirait une grande partie du vocabulaire
+MIN_PREFIX_LENGTH = 2
+
+# Mots avec leurs diacritiques et tatweel (affichés tels quels dans le contexte)
+SURFACE_TOKEN_RE = re.compile(r'[\w\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]+', re.UNICODE)
+
+WRITE_BUFFER = 1 << 20
+
+
+def index_directory(corpus):
+    return os.path.join(INDEX_ROOT, str(corpus.pk))
+
+
+def query_terms(query):
+    """Normalized words of a query, as they are indexed."""
+    return [normalize(word) for word in SURFACE_TOKEN_RE.findall(query)]
+
+
+# ==================== BUILD ====================
+
+def _write_strings(directory, name, strings):
+    offsets = np.zeros(len(strings) + 1, dtype=np.uint64)
+    with open(os.path.join(directory, f'{name}.bin'), 'wb') as out:
+        position = 0
+        for i, string in enumerate(strings, 1):
+            data = string.encode('utf-8')
+            out.write(data)
+            position += len(data)
+            offsets[i] = position
+    offsets.tofile(os.path.join(directory, f'{name}.idx'))
+
+
+def _write_tokens(path, file_format, tokens_file):
+    """
+    Stream the surface-form ids of the corpus into ``tokens_file``.
+
+    Returns the surface forms, the first-seen term id of each form, the
+    terms in first-seen order and the segment starts.
+    """
+    shards, header = plan_shards(path, file_format=file_format)
+    columns = text_columns(header) if header is not None else None
+
+    surface_ids = {}
+    surface_forms = []
+    surface_terms = array('I')
+    term_ids = {}
+    segments = array('Q')
+    buffer = array('I')
+    written = 0
+
+    if shards:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start, end in shards:
+                for text in iter_segments(data, file_format, start, end, columns):
+                    segments.append(written + len(buffer))
+                    for surface in SURFACE_TOKEN_RE.findall(text):
+                        surface_id = surface_ids.get(surface)
+                        if surface_id is None:
+                            surface_id = surface_ids[surface] = len(surface_forms)
+                            surface_forms.append(surface)
+                            surface_terms.append(term_ids.setdefault(normalize(surface), len(term_ids)))
+                        buffer.append(surface_id)
+                    if len(buffer) >= WRITE_BUFFER:
+                        buffer.tofile(tokens_file)
+                        written += len(buffer)
+                        buffer = array('I')
+    buffer.tofile(tokens_file)
+    return surface_forms, surface_terms, list(term_ids), segments
+
+
+def build_index(path, directory, file_format='', source_name=''):
+    """
+    Index the corpus file ``path`` into ``directory``.
+
+    The files are written to a temporary directory swapped in at the end, so
+    readers never see a half-built index. Returns the metadata.
+    """
+    file_format = detect_file_format(path, file_format)
+    tmp = directory + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    with open(os.path.join(tmp, 'tokens.u32'), 'wb') as tokens_file:
+        surface_forms, surface_terms, terms, segments = _write_tokens(path, file_format, tokens_file)
+
+    # Renumérotation des termes dans l'ordre alphabétique (recherche par préfixe)
+    order = sorted(range(len(terms)), key=terms.__getitem__)
+    rank = np.empty(len(terms), dtype=np.uint32)
+    rank[order] = np.arange(len(terms), dtype=np.uint32)
+    surface_rank = rank[np.frombuffer(surface_terms, dtype=np.uint32)] if surface_terms else rank[:0]
+    surface_rank.tofile(os.path.join(tmp, 'surface_terms.u32'))
+    _write_strings(tmp, 'surface', surface_forms)
+    _write_strings(tmp, 'terms', [terms[i] for i in order])
+
+    # Positions regroupées par terme : un tri stable garde l'ordre du texte
+    tokens = np.fromfile(os.path.join(tmp, 'tokens.u32'), dtype=np.uint32)
+    token_terms = surface_rank[tokens]
+    np.argsort(token_terms, kind='stable').astype(np.uint32).tofile(os.path.join(tmp, 'postings.u32'))
+    offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+    np.cumsum(np.bincount(token_terms, minlength=len(terms)), out=offsets[1:])
+    offsets.tofile(os.path.join(tmp, 'postings.idx'))
+    np.frombuffer(segments, dtype=np.uint64).tofile(os.path.join(tmp, 'segments.u64'))
+
+    meta = {
+        'version': INDEX_VERSION,
+        'token_count': int(len(tokens)),
+        'term_count': len(terms),
+        'surface_count': len(surface_forms),
+        'segment_count': len(segments),
+        'file_format': file_format,
+        'file_size': os.path.getsize(path),
+        'source_name': source_name,
+        'built_at': timezone.now().isoformat(),
+    }
+    del tokens, token_terms
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as out:
+        json.dump(meta, out)
+
+    old = directory + '.old'
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.isdir(directory):
+        os.rename(directory, old)
+    os.rename(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+
+def read_meta(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def index_is_current(corpus):
+    meta = read_meta(index_directory(corpus))
+    return (
+        bool(corpus.file) and meta is not None
+        and meta.get('version') == INDEX_VERSION
+        and meta.get('source_name') == corpus.file.name
+        and meta.get('file_size') == corpus.file.size
+    )
+
+
+def build_corpus_index(corpus, force=False):
+    """
+    Build the concordance index of ``corpus``.
+
+    Returns the metadata, or ``None`` when the corpus has no local file or
+    its index is already up to date (unless ``force``).
+    """
+    if not corpus.file or (index_is_current(corpus) and not force):
+        return None
+    try:
+        path = corpus.file.path
+    except NotImplementedError:
+        return None
+
+    directory = index_directory(corpus)
+    os.makedirs(INDEX_ROOT, exist_ok=True)
+    return build_index(path, directory, corpus.file_format, source_name=corpus.file.name)
+
+
+# ==================== QUERY ====================
+
+class StringTable:
+    """Read-only sequence of the strings of a ``.bin``/``.idx`` pair."""
+
+    def __init__(self, directory, name):
+        self.offsets = _memmap(os.path.join(directory, f'{name}.idx'), np.uint64)
+        self.data = _memmap(os.path.join(directory, f'{name}.bin'), np.uint8)
+
+    def __len__(self):
+        return max(len(self.offsets) - 1, 0)
+
+    def __getitem__(self, i):
+        return self.data[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes().decode('utf-8')
+
+
+def _memmap(path, dtype):
+    # np.memmap refuse les fichiers vides
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+class CorpusIndex:
+    """Memory-mapped concordance index of one corpus."""
+
+    def __init__(self, directory):
+        self.meta = read_meta(directory)
+        self.tokens = _memmap(os.path.join(directory, 'tokens.u32'), np.uint32)
+        self.postings = _memmap(os.path.join(directory, 'postings.u32'), np.uint32)
+        self.postings_offsets = _memmap(os.path.join(directory, 'postings.idx'), np.uint64)
+        self.segments = _memmap(os.path.join(directory, 'segments.u64'), np.uint64)
+        self.terms = StringTable(directory, 'terms')
+        self.surface = StringTable(directory, 'surface')
+
+    @property
+    def token_count(self):
+        return len(self.tokens)
+
+    def term_id(self, term):
+        i = bisect.bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return None
+
+    def term_range(self, prefix):
+        """``[low, high)`` ids of the terms starting with ``prefix``."""
+        low = bisect.bisect_left(self.terms, prefix)
+        high = bisect.bisect_left(self.terms, prefix + '\U0010ffff', low)
+        return low, high
+
+    def positions(self, low, high=None):
+        """Positions of the terms ``[low, high)`` (a memmap slice for one term)."""
+        high = low + 1 if high is None else high
+        return self.postings[int(self.postings_offsets[low]):int(self.postings_offsets[high])]
+
+    def find(self, query, mode='word'):
+        """
+        Start positions (sorted) of the matches of ``query`` and their length
+        in tokens.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return np.zeros(0, dtype=np.uint32), 0
+        if mode == 'prefix':
+            low, high = self.term_range(terms[0])
+            positions = self.positions(low, high)
+            # Plusieurs termes : il faut fusionner leurs listes de positions
+            return (np.sort(positions) if high - low > 1 else positions), 1
+        if mode == 'word':
+            terms = terms[:1]
+
+        positions = None
+        for offset, term in enumerate(terms[:MAX_PHRASE_LENGTH]):
+            term_id = self.term_id(term)
+            if term_id is None:
+                return np.zeros(0, dtype=np.uint32), 0
+            term_positions = self.positions(term_id)
+            if positions is None:
+                positions = term_positions
+            else:
+                shifted = term_positions[term_positions >= offset].astype(np.int64) - offset
+                positions = np.intersect1d(positions, shifted, assume_unique=True)
+        return positions, min(len(terms), MAX_PHRASE_LENGTH)
+
+    def segment_bounds(self, position):
+        segment = int(np.searchsorted(self.segments, position, side='right')) - 1
+        start = int(self.segments[segment]) if segment >= 0 else 0
+        end = int(self.segments[segment + 1]) if segment + 1 < len(self.segments) else self.token_count
+        return segment, start, end
+
+    def words(self, start, end):
+        return ' '.join(self.surface[int(surface_id)] for surface_id in self.tokens[start:end])
+
+    def kwic(self, position, length, context=DEFAULT_CONTEXT):
+        """KWIC line of a match, the context stopping at the segment boundaries."""
+        position = int(position)
+        segment, start, end = self.segment_bounds(position)
+        return {
+            'position': position,
+            'segment': segment + 1,
+            'left': self.words(max(start, position - context), position),
+            'match': self.words(position, position + length),
+            'right': self.words(position + length, min(end, position + length + context)),
+        }
+
+
+@lru_cache(maxsize=16)
+def _open_index(directory, built_at):
+    return CorpusIndex(directory)
+
+
+def get_index(corpus):
+    """Opened index of ``corpus`` (cached per process), ``None`` if not built."""
+    directory = index_directory(corpus)
+    meta = read_meta(directory)
+    if meta is None or meta.get('version') != INDEX_VERSION:
+        return None
+    return _open_index(directory, meta.get('built_at'))
@@ -0,0 +1,132 @@
+"""
+Random-access preview of hosted corpus files.
+
+The first time a file is previewed, the start offset of each of its lines is
+written to a ``uint64`` array (the last entry being the file size) next to
+the concordance indexes. The array is opened with ``numpy.memmap``: lines
+N..M or K random lines are then read by seeking in the ``mmap`` of the
+file, whatever its size. The index file name embeds a signature of the
+corpus file (name and size), so a new upload gets a new index.
+"""
+import glob
+import hashlib
+import mmap
+import os
+from functools import lru_cache
+
+import numpy as np
+from django.core.cache import cache
+
+from .concordance import INDEX_ROOT
+
+PREVIEW_DIR = os.path.join(INDEX_ROOT, 'lines')
+FIRST_PAGE_LINES = 20
+MAX_LINES = 200
+# Les lignes très longues (JSON sur une ligne...) sont tronquées à l'affichage
+MAX_LINE_CHARS = 2000
+SCAN_BLOCK = 64 * 1024 * 1024
+PREVIEW_CACHE_TIMEOUT = 60 * 60 * 24
+PREVIEW_CACHE_KEY = 'resources:corpus_preview:{}:{}'
+
+
+def file_signature(corpus):
+    return hashlib.sha1(f"{corpus.file.name}:{corpus.file.size}".encode('utf-8')).hexdigest()[:12]
+
+
+def line_index_path(corpus):
+    return os.path.join(PREVIEW_DIR, f"{corpus.pk}-{file_signature(corpus)}.u64")
+
+
+def build_line_index(path, index_path):
+    """Write the ``uint64`` start offsets of the lines of ``path`` (plus its size)."""
+    size = os.path.getsize(path)
+    tmp = index_path + '.tmp'
+    with open(tmp, 'wb') as out:
+        if size:
+            np.zeros(1, dtype=np.uint64).tofile(out)
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                # Recherche vectorisée des retours à la ligne, bloc par bloc
+                for start in range(0, size, SCAN_BLOCK):
+                    block = np.frombuffer(data, dtype=np.uint8, count=min(SCAN_BLOCK, size - start), offset=start)
+                    starts = np.flatnonzero(block == 0x0A).astype(np.uint64) + np.uint64(start + 1)
+                    del block
+                    starts[starts < size].tofile(out)
+        np.array([size], dtype=np.uint64).tofile(out)
+    os.replace(tmp, index_path)
+
+
+def ensure_line_index(corpus):
+    """Path of the line index of ``corpus``, built if missing (old ones removed)."""
+    index_path = line_index_path(corpus)
+    if not os.path.exists(index_path):
+        os.makedirs(PREVIEW_DIR, exist_ok=True)
+        for old in glob.glob(os.path.join(PREVIEW_DIR, f"{corpus.pk}-*.u64")):
+            os.remove(old)
+        build_line_index(corpus.file.path, index_path)
+    return index_path
+
+
+@lru_cache(maxsize=32)
+def _open_offsets(index_path):
+    return np.memmap(index_path, dtype=np.uint64, mode='r')
+
+
+class CorpusPreview:
+    """Lines of a corpus file, read through its line index."""
+
+    def __init__(self, corpus):
+        self.path = corpus.file.path
+        self.offsets = _open_offsets(ensure_line_index(corpus))
+
+    @property
+    def line_count(self):
+        return len(self.offsets) - 1
+
+    def _read(self, data, number):
+        start, end = int(self.offsets[number]), int(self.offsets[number + 1])
+        text = data[start:min(end, start + MAX_LINE_CHARS * 4)].decode('utf-8', errors='replace')
+        return {'number': number + 1, 'text': text.rstrip('\r\n')[:MAX_LINE_CHARS]}
+
+    def read_lines(self, numbers):
+        if not len(numbers):
+            return []
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return [self._read(data, int(number)) for number in numbers]
+
+    def lines(self, start, count):
+        """Lines ``start`` (1-based) to ``start + count - 1``."""
+        start = max(start, 1) - 1
+        return self.read_lines(range(start, min(start + min(count, MAX_LINES), self.line_count)))
+
+    def random_lines(self, count, seed=None):
+        """``count`` distinct lines drawn at random, in file order."""
+        count = min(count, MAX_LINES, self.line_count)
+        numbers = np.random.default_rng(seed).choice(self.line_count, size=count, replace=False)
+        return self.read_lines(np.sort(numbers))
+
+
+def get_preview(corpus):
+    """``CorpusPreview`` of ``corpus``, ``None`` if it has no local file."""
+    if not corpus.file:
+        return None
+    try:
+        corpus.file.path
+    except NotImplementedError:
+        return None
+    return CorpusPreview(corpus)
+
+
+def first_page(corpus, lines=FIRST_PAGE_LINES):
+    """First lines of the corpus file, cached per file version (``[]`` if none)."""
+    if not corpus.file:
+        return []
+    key = PREVIEW_CACHE_KEY.format(corpus.pk, file_signature(corpus))
+
+    def read():
+        try:
+            preview = get_preview(corpus)
+        except OSError:
+            return []
+        return preview.lines(1, lines) if preview else []
+
+    return cache.get_or_set(key, read, PREVIEW_CACHE_TIMEOUT)
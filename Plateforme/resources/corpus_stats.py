@@ -0,0 +1,309 @@
+"""
+Streaming statistics of corpus files.
+
+A corpus file (TXT, CSV, JSON Lines or JSON) is split into shards aligned on
+line boundaries and each shard is read through ``mmap``, so no file is ever
+loaded whole (except plain JSON, which has no streaming parser in the
+standard library). Shards of large files are analysed in parallel by a
+process pool and the partial counts are merged.
+
+Each segment (line, CSV row or JSON record) is normalized and tokenized with
+the Arabic-aware rules of ``resources.text``. The result is a compact,
+JSON-serializable profile: token/type/segment counts, script mix, top
+n-grams and length distributions.
+
+This module does not import Django so that worker processes stay light.
+"""
+import csv
+import json
+import mmap
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from .text import ARABIC_RE, LATIN_RE, STOPWORDS, TOKEN_RE, normalize
+
+SHARD_SIZE = 32 * 1024 * 1024
+TOP_NGRAMS = 20
+# Au-delà, les compteurs de bigrammes/trigrammes sont élagués (approximation)
+NGRAM_CAPACITY = 200_000
+MAX_TOKEN_LENGTH = 20
+
+# Colonnes / clés contenant le texte dans les fichiers structurés
+TEXT_KEYS = ('text', 'content', 'sentence', 'body', 'tweet', 'review')
+
+# Seuil de part des tokens au-delà duquel un script est dominant
+DOMINANT_SCRIPT_RATIO = 0.8
+
+
+def script_of(token):
+    if ARABIC_RE.match(token):
+        return 'arabic'
+    if token.isdigit():
+        return 'digit'
+    if LATIN_RE.match(token):
+        return 'latin'
+    return 'other'
+
+
+def length_bucket(length):
+    """Power-of-two bucket label of a segment length: 0, 1, 2-3, 4-7..."""
+    if length < 2:
+        return str(length)
+    low = 1 << (length.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+class CorpusStats:
+    """Mergeable counters accumulated over the segments of a corpus."""
+
+    def __init__(self, ngram_capacity=NGRAM_CAPACITY):
+        self.ngram_capacity = ngram_capacity
+        self.segments = 0
+        self.tokens = 0
+        self.characters = 0
+        self.max_segment_length = 0
+        self.vocabulary = Counter()
+        self.bigrams = Counter()
+        self.trigrams = Counter()
+        self.token_lengths = Counter()
+        self.segment_lengths = Counter()
+        self.approximate = False
+
+    def add_segment(self, text):
+        text = normalize(text)
+        tokens = TOKEN_RE.findall(text)
+        self.segments += 1
+        self.characters += len(text)
+        self.tokens += len(tokens)
+        self.max_segment_length = max(self.max_segment_length, len(tokens))
+        self.segment_lengths[length_bucket(len(tokens))] += 1
+        self.vocabulary.update(tokens)
+        for token in tokens:
+            self.token_lengths[min(len(token), MAX_TOKEN_LENGTH)] += 1
+        self.bigrams.update(zip(tokens, tokens[1:]))
+        self.trigrams.update(zip(tokens, tokens[1:], tokens[2:]))
+        if len(self.bigrams) > self.ngram_capacity or len(self.trigrams) > self.ngram_capacity:
+            self._prune()
+
+    def _prune(self):
+        # On ne garde que la moitié la plus fréquente : les n-grammes rares
+        # d'un gros corpus ne peuvent plus entrer dans le top
+        keep = self.ngram_capacity // 2
+        for name in ('bigrams', 'trigrams'):
+            counter = getattr(self, name)
+            if len(counter) > keep:
+                setattr(self, name, Counter(dict(counter.most_common(keep))))
+        self.approximate = True
+
+    def merge(self, other):
+        self.segments += other.segments
+        self.tokens += other.tokens
+        self.characters += other.characters
+        self.max_segment_length = max(self.max_segment_length, other.max_segment_length)
+        self.vocabulary.update(other.vocabulary)
+        self.bigrams.update(other.bigrams)
+        self.trigrams.update(other.trigrams)
+        self.token_lengths.update(other.token_lengths)
+        self.segment_lengths.update(other.segment_lengths)
+        self.approximate = self.approximate or other.approximate
+        if len(self.bigrams) > self.ngram_capacity or len(self.trigrams) > self.ngram_capacity:
+            self._prune()
+        return self
+
+    def to_profile(self, top=TOP_NGRAMS):
+        script_counts = Counter()
+        for token, count in self.vocabulary.items():
+            script_counts[script_of(token)] += count
+        scripts = {name: round(count / self.tokens, 4) for name, count in script_counts.items()} if self.tokens else {}
+        return {
+            'token_count': self.tokens,
+            'type_count': len(self.vocabulary),
+            'segment_count': self.segments,
+            'character_count': self.characters,
+            'type_token_ratio': round(len(self.vocabulary) / self.tokens, 4) if self.tokens else 0,
+            'dominant_script': dominant_script(scripts),
+            'scripts': scripts,
+            'top_unigrams': _top(self.vocabulary, top, lambda token: _is_content_word(token)),
+            'top_bigrams': _top(self.bigrams, top, lambda ngram: any(map(_is_content_word, ngram))),
+            'top_trigrams': _top(self.trigrams, top, lambda ngram: any(map(_is_content_word, ngram))),
+            'ngrams_approximate': self.approximate,
+            'token_lengths': {str(length): count for length, count in sorted(self.token_lengths.items())},
+            'segment_lengths': dict(sorted(self.segment_lengths.items(), key=lambda item: _bucket_start(item[0]))),
+            'mean_segment_length': round(self.tokens / self.segments, 2) if self.segments else 0,
+            'max_segment_length': self.max_segment_length,
+        }
+
+
+def dominant_script(scripts):
+    if not scripts:
+        return ''
+    for name in ('arabic', 'latin'):
+        if scripts.get(name, 0) >= DOMINANT_SCRIPT_RATIO:
+            return name
+    return 'mixed'
+
+
+def _is_content_word(token):
+    return len(token) > 1 and not token.isdigit() and token not in STOPWORDS
+
+
+def _top(counter, n, keep):
+    top = []
+    for item, count in counter.most_common():
+        if keep(item):
+            top.append([' '.join(item) if isinstance(item, tuple) else item, count])
+            if len(top) >= n:
+                break
+    return top
+
+
+def _bucket_start(label):
+    return int(label.split('-')[0])
+
+
+# ==================== SEGMENTS ====================
+
+def record_text(record, text_keys=TEXT_KEYS):
+    """Text of a JSON record: a string, a known text key or all string values."""
+    if isinstance(record, str):
+        return record
+    if isinstance(record, dict):
+        for key in text_keys:
+            if isinstance(record.get(key), str):
+                return record[key]
+        return ' '.join(value for value in record.values() if isinstance(value, str))
+    if isinstance(record, list):
+        return ' '.join(value for value in record if isinstance(value, str))
+    return ''
+
+
+def text_columns(header):
+    """Indices of the CSV columns to analyse (known text columns, else all)."""
+    lowered = [name.strip().lower() for name in header]
+    known = [i for i, name in enumerate(lowered) if name in TEXT_KEYS]
+    return known or list(range(len(header)))
+
+
+def iter_lines(buffer, start, end):
+    position = start
+    while position < end:
+        newline = buffer.find(b'\n', position, end)
+        stop = end if newline < 0 else newline + 1
+        yield buffer[position:stop].decode('utf-8', errors='replace')
+        position = stop
+
+
+def iter_segments(buffer, file_format, start, end, columns=None):
+    if file_format == 'csv':
+        for row in csv.reader(iter_lines(buffer, start, end)):
+            cells = [row[i] for i in columns if i < len(row)] if columns is not None else row
+            yield ' '.join(cell for cell in cells if cell and not _is_number(cell))
+    elif file_format == 'jsonl':
+        for line in iter_lines(buffer, start, end):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield record_text(json.loads(line))
+            except ValueError:
+                yield line
+    elif file_format == 'json':
+        data = json.loads(buffer[start:end].decode('utf-8', errors='replace'))
+        records = data.values() if isinstance(data, dict) else data if isinstance(data, list) else [data]
+        for record in records:
+            yield record_text(record)
+    else:
+        for line in iter_lines(buffer, start, end):
+            if line.strip():
+                yield line
+
+
+def _is_number(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+# ==================== FILES ====================
+
+def detect_file_format(path, declared=''):
+    """Normalized format of a corpus file, from ``Corpus.file_format`` or its extension."""
+    for candidate in (declared, os.path.splitext(path)[1]):
+        candidate = (candidate or '').strip().lower().lstrip('.')
+        if candidate in ('txt', 'csv', 'json', 'jsonl'):
+            return candidate
+        if candidate == 'ndjson':
+            return 'jsonl'
+    return 'txt'
+
+
+def plan_shards(path, shard_size=SHARD_SIZE, file_format='txt'):
+    """
+    Split a file into ``(start, end)`` byte ranges ending on a newline.
+
+    Returns the shards and, for CSV, the header row (excluded from the
+    first shard).
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return [], None
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        start, header = 0, None
+        if file_format == 'csv':
+            newline = buffer.find(b'\n')
+            first = buffer[:size if newline < 0 else newline + 1].decode('utf-8-sig', errors='replace')
+            header = next(csv.reader([first]), [])
+            start = size if newline < 0 else newline + 1
+        if file_format == 'json':
+            return [(0, size)], None
+
+        shards = []
+        while start < size:
+            end = min(start + shard_size, size)
+            if end < size:
+                newline = buffer.find(b'\n', end)
+                end = size if newline < 0 else newline + 1
+            shards.append((start, end))
+            start = end
+    return shards, header
+
+
+def analyze_shard(path, file_format, start, end, columns=None):
+    stats = CorpusStats()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        for text in iter_segments(buffer, file_format, start, end, columns):
+            stats.add_segment(text)
+    return stats
+
+
+def analyze_file(path, file_format='', workers=None, shard_size=SHARD_SIZE):
+    """
+    Compute the profile of a corpus file.
+
+    Files larger than one shard are analysed by a pool of ``workers``
+    processes (``os.cpu_count()`` by default).
+    """
+    file_format = detect_file_format(path, file_format)
+    shards, header = plan_shards(path, shard_size, file_format)
+    columns = text_columns(header) if header is not None else None
+
+    stats = CorpusStats()
+    if len(shards) <= 1 or workers == 1:
+        for start, end in shards:
+            stats.merge(analyze_shard(path, file_format, start, end, columns))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(analyze_shard, path, file_format, start, end, columns)
+                for start, end in shards
+            ]
+            for future in futures:
+                stats.merge(future.result())
+
+    profile = stats.to_profile()
+    profile['file_format'] = file_format
+    profile['file_size'] = os.path.getsize(path)
+    return profile
@@ -0,0 +1,270 @@
+"""
+Streaming export of the resource catalog.
+
+The rows are produced by generators reading the database with
+``.iterator(chunk_size)`` (server-side cursors on PostgreSQL) and the
+related objects needed by the columns are joined with ``select_related``,
+so an export costs one query per chunk whatever the size of the table and
+only one chunk is held in memory. The output is gathered into blocks of
+``BLOCK_SIZE`` characters and optionally gzip-compressed on the fly, ready
+to be handed to a ``StreamingHttpResponse`` or written to a file.
+
+The filters are those of the admin list pages (``pages.views``), which use
+the same ``filter_*`` functions.
+"""
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import Corpus, Course, Document, NLPTool
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+
+
+# ==================== FILTERS ====================
+# Mêmes paramètres GET que les pages d'administration
+
+def filter_publications(params):
+    publications = Document.objects.all().order_by('-creation_date')
+    publication_type = params.get('publication_type', '')
+    search = params.get('search', '')
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+
+    if publication_type:
+        publications = publications.filter(document_type=publication_type)
+    if date_from:
+        publications = publications.filter(creation_date__date__gte=date_from)
+    if date_to:
+        publications = publications.filter(creation_date__date__lte=date_to)
+    if search:
+        publications = publications.filter(
+            Q(title__icontains=search) |
+            Q(description__icontains=search) |
+            Q(keywords__icontains=search) |
+            Q(authors__full_name__icontains=search)
+        ).distinct()
+    return publications
+
+
+def filter_corpora(params):
+    corpora = Corpus.objects.all().order_by('-creation_date')
+    corpus_type = params.get('corpus_type', '')
+    search = params.get('search', '')
+
+    if corpus_type:
+        # Le « type » d'un corpus est son format (TXT, CSV, JSON...)
+        corpora = corpora.filter(file_format__iexact=corpus_type)
+    if search:
+        corpora = corpora.filter(
+            Q(title__icontains=search) |
+            Q(description__icontains=search) |
+            Q(author__full_name__icontains=search)
+        )
+    return corpora
+
+
+def filter_tools(params):
+    tools = NLPTool.objects.all().order_by('-creation_date')
+    tool_type = params.get('tool_type', '')
+    search = params.get('search', '')
+
+    if tool_type:
+        tools = tools.filter(tool_type=tool_type)
+    if search:
+        tools = tools.filter(
+            Q(title__icontains=search) |
+            Q(description__icontains=search) |
+            Q(author__full_name__icontains=search)
+        )
+    return tools
+
+
+def filter_courses(params):
+    courses = Course.objects.all().order_by('-creation_date')
+    level = params.get('level', '')
+    search = params.get('search', '')
+
+    # Les cours n'ont pas de champ « is_public » : ce filtre est ignoré
+    if level:
+        courses = courses.filter(academic_level=level)
+    if search:
+        courses = courses.filter(
+            Q(title__icontains=search) |
+            Q(description__icontains=search) |
+            Q(author__full_name__icontains=search)
+        )
+    return courses
+
+
+# ==================== COLUMNS ====================
+
+def _user(user):
+    return (user.full_name or user.email) if user else ''
+
+
+def _institution(institution):
+    return institution.name if institution else ''
+
+
+def _subtype(document):
+    for name in ('article', 'thesis', 'memoir'):
+        subtype = getattr(document, name, None)
+        if subtype is not None:
+            return subtype
+    return None
+
+
+COMMON_COLUMNS = [
+    ('id', lambda obj: str(obj.pk)),
+    ('title', lambda obj: obj.title),
+    ('description', lambda obj: obj.description),
+    ('keywords', lambda obj: obj.keywords or ''),
+    ('language', lambda obj: obj.language),
+    ('access_link', lambda obj: obj.access_link or ''),
+    ('author', lambda obj: _user(obj.author)),
+    ('author_email', lambda obj: obj.author.email),
+    ('creation_date', lambda obj: obj.creation_date),
+    ('update_date', lambda obj: obj.update_date),
+    ('views_count', lambda obj: obj.views_count),
+]
+
+PUBLICATION_COLUMNS = COMMON_COLUMNS + [
+    ('document_type', lambda obj: obj.document_type),
+    ('file_format', lambda obj: obj.file_format),
+    ('authors', lambda obj: ', '.join(_user(user) for user in obj.authors.all())),
+    ('journal', lambda obj: getattr(_subtype(obj), 'journal', '')),
+    ('doi', lambda obj: getattr(_subtype(obj), 'doi', '')),
+    ('publication_date', lambda obj: getattr(_subtype(obj), 'publication_date', None)),
+    ('supervisor', lambda obj: getattr(_subtype(obj), 'supervisor', '')),
+    ('academic_level', lambda obj: getattr(_subtype(obj), 'academic_level', '')),
+    ('institution', lambda obj: _institution(getattr(_subtype(obj), 'institution', None))),
+    ('defense_year', lambda obj: getattr(_subtype(obj), 'defense_year', None)),
+]
+
+CORPUS_COLUMNS = COMMON_COLUMNS + [
+    ('size', lambda obj: obj.size),
+    ('field', lambda obj: obj.field),
+    ('file_format', lambda obj: obj.file_format),
+]
+
+TOOL_COLUMNS = COMMON_COLUMNS + [
+    ('tool_type', lambda obj: obj.tool_type),
+    ('version', lambda obj: obj.version),
+    ('supported_languages', lambda obj: obj.supported_languages),
+    ('documentation_link', lambda obj: obj.documentation_link or ''),
+]
+
+COURSE_COLUMNS = COMMON_COLUMNS + [
+    ('field', lambda obj: obj.field),
+    ('academic_level', lambda obj: obj.academic_level),
+    ('academic_year', lambda obj: obj.academic_year),
+    ('teacher', lambda obj: _user(obj.teacher)),
+    ('institution', lambda obj: _institution(obj.institution)),
+]
+
+
+def _publication_queryset(queryset):
+    return queryset.select_related(
+        'author', 'article', 'thesis__institution', 'memoir__institution'
+    ).prefetch_related('authors')
+
+
+# Type d'export -> (filtres, jointures, colonnes)
+EXPORTS = {
+    'publications': (filter_publications, _publication_queryset, PUBLICATION_COLUMNS),
+    'corpora': (filter_corpora, lambda qs: qs.select_related('author'), CORPUS_COLUMNS),
+    'tools': (filter_tools, lambda qs: qs.select_related('author'), TOOL_COLUMNS),
+    'courses': (filter_courses, lambda qs: qs.select_related('author', 'teacher', 'institution'), COURSE_COLUMNS),
+}
+
+
+# ==================== STREAMING ====================
+
+class Echo:
+    """File-like object whose ``write`` returns the value (for ``csv.writer``)."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(objects, columns):
+    writer = csv.writer(Echo())
+    # BOM pour que les tableurs lisent correctement l'arabe
+    yield '\ufeff' + writer.writerow([name for name, _getter in columns])
+    for obj in objects:
+        yield writer.writerow([_csv_value(getter(obj)) for _name, getter in columns])
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_jsonl(objects, columns):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for obj in objects:
+        yield encoder.encode({name: getter(obj) for name, getter in columns}) + '\n'
+
+
+def iter_blocks(lines, block_size=BLOCK_SIZE):
+    """Group small strings into blocks of about ``block_size`` characters."""
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= block_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_gzip(blocks):
+    """Compress a stream of text blocks into gzip bytes, block by block."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for block in blocks:
+        data = compressor.compress(block.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_queryset(kind, params):
+    """Filtered queryset of an export type, with the joins its columns need."""
+    filter_fn, prepare, _columns = EXPORTS[kind]
+    return prepare(filter_fn(params))
+
+
+def stream_export(kind, fmt, params=None, compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the export of ``kind`` filtered by ``params`` (admin page GET
+    parameters), as text blocks or, with ``compress``, gzip bytes.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export type: {kind}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    columns = EXPORTS[kind][2]
+    objects = export_queryset(kind, params or {}).iterator(chunk_size=chunk_size)
+    lines = iter_csv(objects, columns) if fmt == 'csv' else iter_jsonl(objects, columns)
+    blocks = iter_blocks(lines)
+    return iter_gzip(blocks) if compress else blocks
+
+
+def export_filename(kind, fmt, compress=False, date=None):
+    name = f"{kind}-{date:%Y%m%d}.{fmt}" if date else f"{kind}.{fmt}"
+    return name + '.gz' if compress else name
@@ -0,0 +1,210 @@
+"""
+Full-text extraction of the files attached to documents.
+
+PDF pages are read with ``pypdf``, DOCX paragraphs straight from the
+``word/document.xml`` part of the archive and TXT files are split on blank
+lines. The text is then cut into passages of at most ``CHUNK_CHARS``
+characters that never span two pages (PDF) or two sections (DOCX headings,
+TXT paragraphs), labelled with their page or section number so that search
+results can point into the file.
+
+Files are processed by a process pool; each extraction runs under a
+``SIGALRM`` timer in its worker so a pathological file fails on its own
+without blocking the pool. Like ``corpus_stats``, this module does not
+import Django.
+"""
+import os
+import re
+import signal
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
+DOCUMENT_FILE_EXTENSIONS = ['pdf', 'docx', 'txt']
+
+DEFAULT_TIMEOUT = 120
+CHUNK_CHARS = 2000
+# Au-delà, le texte extrait est tronqué (livres, annexes...)
+MAX_CHUNKS = 500
+MAX_LABEL_LENGTH = 80
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+SENTENCE_END_RE = re.compile(r'(?<=[.!?؟。])\s+')
+WHITESPACE_RE = re.compile(r'[ \t\r\f\v]+')
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+def detect_document_format(path, declared=''):
+    """Normalized format of a document file, from its extension or ``Document.file_format``."""
+    for candidate in (os.path.splitext(path)[1], declared):
+        candidate = (candidate or '').strip().lower().lstrip('.')
+        if candidate in DOCUMENT_FILE_EXTENSIONS:
+            return candidate
+    return ''
+
+
+# ==================== READERS ====================
+# Chaque lecteur renvoie des sections [(étiquette, texte)]
+
+def read_pdf(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ExtractionError("pypdf is required to extract PDF files")
+    try:
+        reader = PdfReader(path)
+        return [(f"p. {number}", page.extract_text() or '') for number, page in enumerate(reader.pages, 1)]
+    except ExtractionTimeout:
+        raise
+    except Exception as e:
+        raise ExtractionError(f"Unreadable PDF: {e}")
+
+
+def read_docx(path):
+    try:
+        with zipfile.ZipFile(path) as archive:
+            root = ElementTree.fromstring(archive.read('word/document.xml'))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ExtractionError(f"Unreadable DOCX: {e}")
+
+    sections, paragraphs, label = [], [], "§ 1"
+    for paragraph in root.iter(f'{WORD_NAMESPACE}p'):
+        text = ''.join(node.text or '' for node in paragraph.iter(f'{WORD_NAMESPACE}t'))
+        style = paragraph.find(f'{WORD_NAMESPACE}pPr/{WORD_NAMESPACE}pStyle')
+        is_heading = style is not None and style.get(f'{WORD_NAMESPACE}val', '').lower().startswith(('heading', 'titre'))
+        # Un titre ouvre une nouvelle section
+        if is_heading and paragraphs:
+            sections.append((label, '\n'.join(paragraphs)))
+            paragraphs = []
+        if is_heading:
+            label = text.strip()[:MAX_LABEL_LENGTH] or f"§ {len(sections) + 1}"
+        if text.strip():
+            paragraphs.append(text)
+    if paragraphs:
+        sections.append((label, '\n'.join(paragraphs)))
+    return sections
+
+
+def read_txt(path):
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8', errors='replace')
+    paragraphs = [paragraph for paragraph in re.split(r'\n\s*\n', text) if paragraph.strip()]
+    return [(f"§ {number}", paragraph) for number, paragraph in enumerate(paragraphs, 1)]
+
+
+READERS = {
+    'pdf': read_pdf,
+    'docx': read_docx,
+    'txt': read_txt,
+}
+
+
+# ==================== CHUNKS ====================
+
+def clean_text(text):
+    lines = (WHITESPACE_RE.sub(' ', line).strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def split_text(text, size=CHUNK_CHARS):
+    """Split ``text`` into pieces of at most ``size`` characters, on sentence ends if possible."""
+    pieces, current = [], ''
+    for sentence in SENTENCE_END_RE.split(text):
+        while len(sentence) > size:
+            cut = sentence.rfind(' ', 0, size)
+            cut = cut if cut > size // 2 else size
+            sentence, head = sentence[cut:].lstrip(), sentence[:cut]
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(head)
+        if current and len(current) + 1 + len(sentence) > size:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_sections(sections, size=CHUNK_CHARS, max_chunks=MAX_CHUNKS):
+    """
+    Passages ``{"position", "label", "text"}`` of the sections.
+
+    A passage never spans two sections, so its label always points to one
+    page or section of the file.
+    """
+    chunks = []
+    for label, text in sections:
+        text = clean_text(text)
+        if not text:
+            continue
+        for piece in split_text(text, size):
+            chunks.append({'position': len(chunks), 'label': label, 'text': piece})
+            if len(chunks) >= max_chunks:
+                return chunks
+    return chunks
+
+
+# ==================== POOL ====================
+
+def _on_timeout(signum, frame):
+    raise ExtractionTimeout("Extraction timed out")
+
+
+def extract_file(path, file_format='', timeout=DEFAULT_TIMEOUT):
+    """
+    Extract the passages of one file.
+
+    Returns ``{"chunks", "char_count", "error"}``; failures are reported in
+    ``error`` rather than raised so that a pool run keeps going.
+    """
+    file_format = detect_document_format(path, file_format)
+    if not file_format:
+        return {'chunks': [], 'char_count': 0, 'error': "Unsupported file format"}
+
+    # SIGALRM n'existe pas sous Windows : pas de limite de temps dans ce cas
+    use_alarm = timeout and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        sections = READERS[file_format](path)
+        chunks = chunk_sections(sections)
+    except (ExtractionError, OSError) as e:
+        return {'chunks': [], 'char_count': 0, 'error': str(e) or e.__class__.__name__}
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return {'chunks': chunks, 'char_count': sum(len(chunk['text']) for chunk in chunks), 'error': ''}
+
+
+def extract_files(jobs, workers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Extract ``jobs`` (``[(key, path, file_format)]``) in a process pool.
+
+    Yields ``(key, result)`` as the files complete, in submission order.
+    """
+    jobs = list(jobs)
+    if len(jobs) <= 1 or workers == 1:
+        for key, path, file_format in jobs:
+            yield key, extract_file(path, file_format, timeout)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(key, pool.submit(extract_file, path, file_format, timeout)) for key, path, file_format in jobs]
+        for key, future in futures:
+            try:
+                yield key, future.result()
+            except Exception as e:
+                # Processus de travail tué (mémoire...), on passe au suivant
+                yield key, {'chunks': [], 'char_count': 0, 'error': f"Extraction failed: {e}"}
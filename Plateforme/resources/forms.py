@@ -2,7 +2,8 @@ from django import forms
 from django.utils.translation import gettext_lazy as _
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Fieldset, Submit, Row, Column, HTML
-from .models import Course, NLPTool, Corpus, Document, Article, Thesis, Memoir, ResourceBase ,FieldChoices
+from django.core.validators import FileExtensionValidator
+from .models import Course, NLPTool, Corpus, Document, Article, Thesis, Memoir, ResourceBase ,FieldChoices, CORPUS_FILE_EXTENSIONS, DOCUMENT_FILE_EXTENSIONS
 from accounts.models import Institution
 
 class ResourceForm(forms.Form):
@@ -132,6 +133,12 @@ class ResourceForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={'class': 'form-control'})
     )
+    corpus_file = forms.FileField(
+        label=_("Corpus File (TXT/CSV/JSON/JSONL)"),
+        required=False,
+        validators=[FileExtensionValidator(CORPUS_FILE_EXTENSIONS)],
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control'})
+    )
 
     # Document
     document_type = forms.ChoiceField(
@@ -152,6 +159,12 @@ class ResourceForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={'class': 'form-control'})
     )
+    document_file = forms.FileField(
+        label=_("Document File (PDF/DOCX/TXT)"),
+        required=False,
+        validators=[FileExtensionValidator(DOCUMENT_FILE_EXTENSIONS)],
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control'})
+    )
 
     # Article
     doi = forms.CharField(
@@ -312,7 +325,8 @@ class ResourceForm(forms.Form):
             Row(
                 Column('corpus_field', css_class='col-md-6'),
                 Column('corpus_format', css_class='col-md-6')
-            )
+            ),
+            'corpus_file'
         )
 
     def _create_document_fields(self, doc_type):
@@ -322,7 +336,8 @@ class ResourceForm(forms.Form):
                 Row(
                     Column('document_type', css_class='col-md-6'),
                     Column('document_format', css_class='col-md-6')
-                )
+                ),
+                'document_file'
             )
         ]
         
@@ -481,10 +496,14 @@ class ResourceForm(forms.Form):
                 instance.size = self.cleaned_data['corpus_size']
                 instance.field = self.cleaned_data['corpus_field'] 
                 instance.file_format = self.cleaned_data['corpus_format']
+                if self.cleaned_data.get('corpus_file'):
+                    instance.file = self.cleaned_data['corpus_file']
                 instance.save()
             elif resource_type == 'document':
                 instance.document_type = self.cleaned_data['document_type']
                 instance.file_format = self.cleaned_data['document_format']
+                if self.cleaned_data.get('document_file'):
+                    instance.file = self.cleaned_data['document_file']
                 instance.save()
                 
                 if hasattr(instance, 'article'):
@@ -509,59 +528,81 @@ class ResourceForm(forms.Form):
             return instance
         else:
             # Création d'une nouvelle instance
-            if resource_type == 'course':
-                return Course.objects.create(
-                    **common_data,
-                    field=self.cleaned_data['course_field'],
-                    academic_level=self.cleaned_data['academic_level'],
-                    teacher=self.user,
-                    institution=self.cleaned_data['course_institution'],
-                    academic_year=self.cleaned_data['academic_year']
-                )
-            elif resource_type == 'nlp_tool':
-                return NLPTool.objects.create(
-                    **common_data,
-                    tool_type=self.cleaned_data['tool_type'],
-                    version=self.cleaned_data['tool_version'],
-                    documentation_link=self.cleaned_data['documentation'],
-                    supported_languages=self.cleaned_data['supported_languages']
-                )
-            elif resource_type == 'corpus':
-                return Corpus.objects.create(
-                    **common_data,
-                    size=self.cleaned_data['corpus_size'],
-                    field=self.cleaned_data['corpus_field'],
-                    file_format=self.cleaned_data['corpus_format']
-                )
-            elif resource_type == 'document':
-                doc = Document.objects.create(
-                    **common_data,
-                    document_type=self.cleaned_data['document_type'],
-                    file_format=self.cleaned_data['document_format']
-                )
-            if doc.document_type == 'article':
-                 Article.objects.create(
-                     document= doc,
-                     doi = self.cleaned_data['doi'],
-                     journal = self.cleaned_data['journal'],
-                     publication_date = self.cleaned_data['publication_date']
-                     )
-                 
-                 
-            elif doc.document_type == 'thesis':
-                 Thesis.objects.create(
-                     document=doc,
-                     supervisor=self.cleaned_data['supervisor'],
-                     institution=self.cleaned_data['thesis_institution'],
-                     defense_year=self.cleaned_data['defense_year']
-            )
-            elif doc.document_type == 'memoir':
-                  Memoir.objects.create(
+            objects = self.build_instances()
+            for obj in objects:
+                obj.save()
+            return objects[0]
+
+    def build_instances(self):
+        """
+        Build the unsaved objects described by the cleaned data.
+
+        Returns ``[resource]`` or, for documents, ``[document, subtype]``.
+        Primary keys are generated on instantiation, so the subtype can
+        reference its document before anything is written (bulk imports
+        insert them with ``bulk_create``).
+        """
+        resource_type = self.cleaned_data['resource_type']
+        common_data = {
+            'title': self.cleaned_data['title'],
+            'description': self.cleaned_data['description'],
+            'author': self.user,
+            'keywords': self.cleaned_data['keywords'],
+            'access_link': self.cleaned_data['access_link'] or None,
+            'language': self.cleaned_data['language'],
+        }
+
+        if resource_type == 'course':
+            return [Course(
+                **common_data,
+                field=self.cleaned_data['course_field'],
+                academic_level=self.cleaned_data['academic_level'],
+                teacher=self.user,
+                institution=self.cleaned_data['course_institution'],
+                academic_year=self.cleaned_data['academic_year']
+            )]
+        elif resource_type == 'nlp_tool':
+            return [NLPTool(
+                **common_data,
+                tool_type=self.cleaned_data['tool_type'],
+                version=self.cleaned_data['tool_version'],
+                documentation_link=self.cleaned_data['documentation'],
+                supported_languages=self.cleaned_data['supported_languages']
+            )]
+        elif resource_type == 'corpus':
+            return [Corpus(
+                **common_data,
+                size=self.cleaned_data['corpus_size'],
+                field=self.cleaned_data['corpus_field'],
+                file_format=self.cleaned_data['corpus_format'],
+                file=self.cleaned_data.get('corpus_file') or None
+            )]
+
+        doc = Document(
+            **common_data,
+            document_type=self.cleaned_data['document_type'],
+            file_format=self.cleaned_data['document_format'],
+            file=self.cleaned_data.get('document_file') or None
+        )
+        if doc.document_type == 'article':
+            return [doc, Article(
+                document=doc,
+                doi=self.cleaned_data['doi'],
+                journal=self.cleaned_data['journal'],
+                publication_date=self.cleaned_data['publication_date']
+            )]
+        elif doc.document_type == 'thesis':
+            return [doc, Thesis(
+                document=doc,
+                supervisor=self.cleaned_data['supervisor'],
+                institution=self.cleaned_data['thesis_institution'],
+                defense_year=self.cleaned_data['defense_year']
+            )]
+        elif doc.document_type == 'memoir':
+            return [doc, Memoir(
                 document=doc,
                 academic_level=self.cleaned_data['memoir_level'],
                 institution=self.cleaned_data['memoir_institution'],
                 defense_year=self.cleaned_data['memoir_defense_year']
-            )
-                
-                
-            return doc
\ No newline at end of file
+            )]
+        return [doc]
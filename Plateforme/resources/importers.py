@@ -0,0 +1,474 @@
+"""
+Streaming bulk import of resources.
+
+Rows are read one at a time from CSV, JSON Lines or BibTeX files, validated
+with the same rules as the creation form (``ResourceForm``) and turned into
+unsaved model instances. Valid rows are written with ``bulk_create``,
+``batch_size`` rows per transaction, so memory stays flat whatever the file
+size and a bad row never aborts the import: it is reported with its line
+number and the form errors. A batch rejected by the database (constraint
+violated by one row) is retried row by row, each row in its own savepoint,
+and only the offending rows are reported.
+
+``bulk_create`` does not send ``post_save``, so the per-object work done by
+the signal receivers of ``resources.models`` is replaced by batched
+equivalents: tags are linked once per batch, the search index is updated in
+a single bulk pass at the end and the detail cache generations are bumped
+once per type.
+"""
+import csv
+import json
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django import forms
+from django.db import DatabaseError, transaction
+from django.utils.translation import gettext_lazy as _
+from django_elasticsearch_dsl.registries import registry
+
+from institutions.models import Institution
+from .cache import bump_generation_for_model
+from .forms import ResourceForm
+from .models import (
+    Article, Corpus, Course, Document, Memoir, NLPTool, ResourceBase, TaggedResource, Thesis,
+)
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'jsonl', 'bibtex')
+FORMAT_EXTENSIONS = {
+    'csv': 'csv',
+    'jsonl': 'jsonl',
+    'ndjson': 'jsonl',
+    'json': 'jsonl',
+    'bib': 'bibtex',
+    'bibtex': 'bibtex',
+}
+
+DEFAULT_BATCH_SIZE = 500
+INDEX_CHUNK_SIZE = 1000
+
+# Ordre d'insertion : les documents avant leurs sous-types
+INSERT_ORDER = (Course, NLPTool, Corpus, Document, Article, Thesis, Memoir)
+RESOURCE_MODELS = (Course, NLPTool, Corpus, Document)
+
+INSTITUTION_FIELDS = ('course_institution', 'thesis_institution', 'memoir_institution')
+
+# Raccourcis acceptés dans la colonne resource_type
+RESOURCE_TYPE_ALIASES = {
+    'tool': ('nlp_tool', None),
+    'nlptool': ('nlp_tool', None),
+    'article': ('document', 'article'),
+    'thesis': ('document', 'thesis'),
+    'memoir': ('document', 'memoir'),
+}
+
+# Colonnes génériques -> champ du formulaire selon le type
+GENERIC_FIELDS = {
+    'institution': {
+        'course': 'course_institution',
+        'thesis': 'thesis_institution',
+        'memoir': 'memoir_institution',
+    },
+    'format': {
+        'corpus': 'corpus_format',
+        'article': 'document_format',
+        'thesis': 'document_format',
+        'memoir': 'document_format',
+    },
+}
+
+LANGUAGE_NAMES = {
+    'arabic': 'ar',
+    'english': 'en',
+}
+
+
+def detect_format(filename):
+    """Guess the import format from a file name, ``None`` if unknown."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return FORMAT_EXTENSIONS.get(extension)
+
+
+# ==================== READERS ====================
+# Chaque lecteur produit des tuples (numéro de ligne, ligne, erreur)
+
+def iter_csv_rows(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        # line_num n'est à jour qu'après la lecture de la ligne (en-tête compris)
+        yield reader.line_num, row, None
+
+
+def iter_jsonl_rows(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, _("Invalid JSON: %(error)s") % {'error': e}
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, _("Each line must be a JSON object")
+            continue
+        yield line_number, row, None
+
+
+BIBTEX_HEADER_RE = re.compile(r'@\s*(\w+)\s*{\s*([^,\s]*)\s*,?', re.S)
+BIBTEX_SKIPPED = {'comment', 'string', 'preamble'}
+
+# Type d'entrée BibTeX -> type de document
+BIBTEX_TYPES = {
+    'article': 'article',
+    'phdthesis': 'thesis',
+    'thesis': 'thesis',
+    'mastersthesis': 'memoir',
+}
+
+
+def iter_bibtex_rows(stream):
+    """
+    Yield BibTeX entries mapped to form fields.
+
+    Entries are accumulated line by line until their braces balance, so
+    only one entry is held in memory at a time. ``@string`` macros and
+    LaTeX accents are not expanded.
+    """
+    buffer = []
+    depth = 0
+    start_line = None
+    for line_number, line in enumerate(stream, 1):
+        if start_line is None:
+            at = line.find('@')
+            if at < 0:
+                continue
+            line = line[at:]
+            start_line = line_number
+        buffer.append(line)
+        depth += line.count('{') - line.count('}')
+        if depth > 0:
+            continue
+
+        entry = ''.join(buffer)
+        buffer, depth, entry_line, start_line = [], 0, start_line, None
+        header = BIBTEX_HEADER_RE.match(entry)
+        if not header:
+            yield entry_line, None, _("Invalid BibTeX entry")
+            continue
+        entry_type = header.group(1).lower()
+        if entry_type in BIBTEX_SKIPPED:
+            continue
+        if entry_type not in BIBTEX_TYPES:
+            yield entry_line, None, _("Unsupported BibTeX entry type: %(type)s") % {'type': entry_type}
+            continue
+        body = entry[header.end():].rstrip()[:-1]
+        yield entry_line, _bibtex_to_row(BIBTEX_TYPES[entry_type], _parse_bibtex_fields(body)), None
+
+    if buffer:
+        yield start_line, None, _("Unterminated BibTeX entry")
+
+
+def _parse_bibtex_fields(body):
+    fields = {}
+    position, length = 0, len(body)
+    while position < length:
+        equals = body.find('=', position)
+        if equals < 0:
+            break
+        name = body[position:equals].strip(' \t\r\n,').lower()
+        position = equals + 1
+        while position < length and body[position].isspace():
+            position += 1
+        if position >= length:
+            break
+        if body[position] == '{':
+            depth, end = 0, position
+            while end < length:
+                if body[end] == '{':
+                    depth += 1
+                elif body[end] == '}':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                end += 1
+            value, position = body[position + 1:end], end + 1
+        elif body[position] == '"':
+            end = body.find('"', position + 1)
+            end = length if end < 0 else end
+            value, position = body[position + 1:end], end + 1
+        else:
+            end = body.find(',', position)
+            end = length if end < 0 else end
+            value, position = body[position:end], end
+        if name:
+            fields[name] = ' '.join(value.replace('{', '').replace('}', '').split())
+    return fields
+
+
+def _bibtex_to_row(document_type, entry):
+    year = entry.get('year', '')
+    row = {
+        'resource_type': 'document',
+        'document_type': document_type,
+        'title': entry.get('title'),
+        # BibTeX n'a pas toujours de résumé : le titre sert de description
+        'description': entry.get('abstract') or entry.get('note') or entry.get('title'),
+        'keywords': entry.get('keywords'),
+        'access_link': entry.get('url'),
+        'language': entry.get('language'),
+        'authors': entry.get('author', '')[:100],
+        'document_format': entry.get('format', 'PDF'),
+    }
+    if document_type == 'article':
+        row.update({
+            'journal': entry.get('journal'),
+            'doi': entry.get('doi'),
+            'publication_date': f"{year}-01-01" if year.isdigit() else year,
+        })
+    elif document_type == 'thesis':
+        row.update({
+            'supervisor': entry.get('supervisor') or entry.get('advisor'),
+            'thesis_institution': entry.get('school') or entry.get('institution'),
+            'defense_year': year,
+        })
+    else:
+        row.update({
+            'memoir_level': 'master',
+            'memoir_institution': entry.get('school') or entry.get('institution'),
+            'memoir_defense_year': year,
+        })
+    return row
+
+
+READERS = {
+    'csv': iter_csv_rows,
+    'jsonl': iter_jsonl_rows,
+    'bibtex': iter_bibtex_rows,
+}
+
+
+# ==================== VALIDATION ====================
+
+class InstitutionLookupField(forms.Field):
+    """Resolve an institution by id, name or acronym from a preloaded table."""
+
+    def __init__(self, institutions, **kwargs):
+        self.institutions = institutions
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        institution = self.institutions.get(str(value).strip().lower())
+        if institution is None:
+            raise forms.ValidationError(
+                _("Unknown institution: %(value)s"),
+                code='invalid_choice',
+                params={'value': value}
+            )
+        return institution
+
+
+class ImportResourceForm(ResourceForm):
+    """
+    ``ResourceForm`` for imported rows.
+
+    Institutions are looked up in memory instead of one query per row, and
+    may be given by name or acronym as well as by id.
+    """
+
+    def __init__(self, *args, institutions=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in INSTITUTION_FIELDS:
+            self.fields[name] = InstitutionLookupField(institutions or {}, required=False)
+
+
+def load_institutions():
+    institutions = {}
+    for institution in Institution.objects.only('id', 'name', 'acronym').iterator(chunk_size=2000):
+        for key in (str(institution.pk), institution.name, institution.acronym):
+            if key:
+                institutions.setdefault(key.strip().lower(), institution)
+    return institutions
+
+
+def prepare_row(row):
+    """Map a raw row (any format) onto ``ResourceForm`` field names."""
+    data = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        data[key.strip().lower()] = value
+
+    resource_type = str(data.get('resource_type', '')).lower()
+    if resource_type in RESOURCE_TYPE_ALIASES:
+        data['resource_type'], document_type = RESOURCE_TYPE_ALIASES[resource_type]
+        if document_type:
+            data.setdefault('document_type', document_type)
+    kind = data.get('document_type') if data.get('resource_type') == 'document' else data.get('resource_type')
+    for generic, targets in GENERIC_FIELDS.items():
+        if generic in data and kind in targets:
+            data.setdefault(targets[kind], data.pop(generic))
+
+    if isinstance(data.get('keywords'), (list, tuple)):
+        data['keywords'] = ', '.join(str(keyword) for keyword in data['keywords'])
+    if isinstance(data.get('supported_languages'), str):
+        data['supported_languages'] = [lang.strip() for lang in data['supported_languages'].split(',') if lang.strip()]
+    language = str(data.get('language', '')).lower()
+    data['language'] = LANGUAGE_NAMES.get(language, language) or ResourceBase.LanguageChoices.ARABIC
+    return data
+
+
+def form_errors(form):
+    return {name: [str(error) for error in errors] for name, errors in form.errors.items()}
+
+
+# ==================== IMPORT ====================
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: dict = field(default_factory=dict)
+    errors: list = field(default_factory=list)
+    indexed: bool = False
+    dry_run: bool = False
+    # Erreur portant sur tout le fichier (encodage) : la lecture s'est arrêtée là
+    file_error: str = ''
+
+    @property
+    def created_count(self):
+        return sum(self.created.get(model._meta.model_name, 0) for model in RESOURCE_MODELS)
+
+    def add_error(self, line, errors):
+        if isinstance(errors, str):
+            errors = {'__all__': [errors]}
+        self.errors.append({'line': line, 'errors': errors})
+
+    def write_csv(self, stream):
+        """Write the per-row error report (one line per field error)."""
+        writer = csv.writer(stream)
+        writer.writerow(['line', 'field', 'error'])
+        for entry in self.errors:
+            for name, messages in entry['errors'].items():
+                for message in messages:
+                    writer.writerow([entry['line'], name, message])
+
+
+def import_resources(stream, fmt, author, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Import every row of ``stream`` (a text file object) as resources owned
+    by ``author``.
+
+    Returns an ``ImportReport``; invalid rows are listed in ``errors`` and
+    skipped, valid ones are committed batch by batch. A file that is not
+    UTF-8 stops the reading at the first undecodable chunk and sets
+    ``file_error``; the rows read before are still imported.
+    """
+    if fmt not in READERS:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+    report = ImportReport(dry_run=dry_run)
+    institutions = load_institutions()
+    # (ligne, instances de la ligne) en attente d'écriture
+    pending = []
+    created_ids = defaultdict(list)
+
+    try:
+        for line, row, error in READERS[fmt](stream):
+            report.rows += 1
+            if error:
+                report.add_error(line, str(error))
+                continue
+            form = ImportResourceForm(data=prepare_row(row), user=author, institutions=institutions)
+            if not form.is_valid():
+                report.add_error(line, form_errors(form))
+                continue
+            if dry_run:
+                continue
+            pending.append((line, form.build_instances()))
+            if len(pending) >= batch_size:
+                _flush(pending, created_ids, report, batch_size)
+    except UnicodeDecodeError as e:
+        report.file_error = f"The file is not UTF-8 encoded ({e.reason} after row {report.rows})"
+
+    if pending:
+        _flush(pending, created_ids, report, batch_size)
+
+    if created_ids:
+        for model in created_ids:
+            bump_generation_for_model(model)
+        report.indexed = index_resources(created_ids)
+
+    logger.info(
+        f"Resource import finished: {report.rows} rows, {report.created_count} created, "
+        f"{len(report.errors)} errors{', ' + report.file_error if report.file_error else ''}"
+    )
+    return report
+
+
+def _insert(objs, batch_size):
+    by_model = defaultdict(list)
+    for obj in objs:
+        by_model[type(obj)].append(obj)
+    for model in INSERT_ORDER:
+        if by_model.get(model):
+            model.objects.bulk_create(by_model[model], batch_size=batch_size)
+    TaggedResource.add_many([obj for model in RESOURCE_MODELS for obj in by_model.get(model, ())])
+
+
+def _flush(pending, created_ids, report, batch_size):
+    """Write the pending rows in one transaction, row by row if the batch is rejected by the database."""
+    try:
+        with transaction.atomic():
+            _insert([obj for _, objs in pending for obj in objs], batch_size)
+        written = list(pending)
+    except DatabaseError as e:
+        logger.warning(f"Import batch rejected ({e}), inserting its rows one by one")
+        written = []
+        with transaction.atomic():
+            for line, objs in pending:
+                try:
+                    with transaction.atomic():
+                        _insert(objs, batch_size)
+                except DatabaseError as e:
+                    # Contrainte violée, valeur trop longue... : seule cette ligne est écartée
+                    report.add_error(line, str(e))
+                else:
+                    written.append((line, objs))
+
+    for _, objs in written:
+        for obj in objs:
+            model = type(obj)
+            name = model._meta.model_name
+            report.created[name] = report.created.get(name, 0) + 1
+            if model in RESOURCE_MODELS:
+                created_ids[model].append(obj.pk)
+    pending.clear()
+
+
+def index_resources(created_ids):
+    """
+    Index the imported resources in one bulk pass per search document.
+
+    Returns ``False`` if indexing failed; the rows are already committed and
+    can be reindexed later with ``search_index --rebuild``.
+    """
+    try:
+        for model, pks in created_ids.items():
+            documents = registry.get_documents((model,))
+            for start in range(0, len(pks), INDEX_CHUNK_SIZE):
+                queryset = model.objects.filter(pk__in=pks[start:start + INDEX_CHUNK_SIZE])
+                for document in documents:
+                    document().update(queryset)
+    except Exception as e:
+        logger.error(f"Error indexing imported resources: {str(e)}")
+        return False
+    return True
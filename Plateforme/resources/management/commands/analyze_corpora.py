@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from resources.corpus_preview import ensure_line_index
+from resources.importers import index_resources
+from resources.models import Corpus, CorpusProfile
+
+# Corpus analysés puis réindexés ensemble (token_count, type_count, dominant_script)
+INDEX_BATCH_SIZE = 50
+
+
+class Command(BaseCommand):
+    help = "Compute the token/vocabulary/n-gram profile of the uploaded corpus files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('corpus_ids', nargs='*', help="Only analyse these corpora")
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Recompute profiles whose file has not changed",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help="Processes used for large files (number of CPUs by default)",
+        )
+
+    def handle(self, *args, **options):
+        corpora = Corpus.objects.exclude(file='').exclude(file__isnull=True)
+        if options['corpus_ids']:
+            corpora = corpora.filter(pk__in=options['corpus_ids'])
+
+        analysed = skipped = failed = 0
+        batch = []
+        for corpus in corpora.order_by('creation_date').iterator(chunk_size=100):
+            try:
+                profile = CorpusProfile.compute(corpus, workers=options['workers'], force=options['force'])
+                # Index des lignes pour l'aperçu, construit ici plutôt qu'à la première visite
+                ensure_line_index(corpus)
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f"{corpus.pk}: {e}")
+                continue
+            if profile is None:
+                skipped += 1
+                continue
+            analysed += 1
+            self.stdout.write(
+                f"{corpus.title}: {profile.token_count} tokens, {profile.type_count} types "
+                f"({profile.dominant_script or '-'})"
+            )
+            batch.append(corpus.pk)
+            if len(batch) >= INDEX_BATCH_SIZE:
+                self._index(batch)
+                batch = []
+        self._index(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{analysed} analysed, {skipped} up to date, {failed} failed"
+        ))
+
+    def _index(self, pks):
+        if pks and not index_resources({Corpus: pks}):
+            self.stdout.write(self.style.WARNING("Search indexing failed, run search_index --rebuild"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from resources.concordance import build_corpus_index
+from resources.models import Corpus
+
+
+class Command(BaseCommand):
+    help = "Build the positional (KWIC concordance) index of the uploaded corpus files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('corpus_ids', nargs='*', help="Only index these corpora")
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Rebuild indexes whose file has not changed",
+        )
+
+    def handle(self, *args, **options):
+        corpora = Corpus.objects.exclude(file='').exclude(file__isnull=True)
+        if options['corpus_ids']:
+            corpora = corpora.filter(pk__in=options['corpus_ids'])
+
+        built = skipped = failed = 0
+        for corpus in corpora.order_by('creation_date').iterator(chunk_size=100):
+            try:
+                meta = build_corpus_index(corpus, force=options['force'])
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f"{corpus.pk}: {e}")
+                continue
+            if meta is None:
+                skipped += 1
+                continue
+            built += 1
+            self.stdout.write(
+                f"{corpus.title}: {meta['token_count']} tokens, {meta['term_count']} terms indexed"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{built} indexed, {skipped} up to date, {failed} failed"
+        ))
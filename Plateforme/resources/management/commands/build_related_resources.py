@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from resources.recommendations import DEFAULT_CHUNK_SIZE, DEFAULT_TOP_K, build_related_resources
+
+
+class Command(BaseCommand):
+    help = "Compute the content-based related resources shown on detail pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help="Recompute every resource instead of only new or changed ones",
+        )
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K)
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        stats = build_related_resources(
+            full=options['full'],
+            top_k=options['top_k'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['recomputed']} recomputed, {stats['propagated']} updated, "
+            f"{stats['deleted']} removed ({stats['resources']} resources)"
+        ))
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from resources.exporters import DEFAULT_CHUNK_SIZE, EXPORTS, FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream the resource catalog to CSV or JSON Lines (same filters as the admin list pages)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help="Output file (standard output by default)")
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            '--filter',
+            action='append',
+            default=[],
+            metavar='NAME=VALUE',
+            help="Admin list filter, e.g. --filter search=arabic --filter publication_type=thesis",
+        )
+
+    def handle(self, *args, **options):
+        params = dict(item.split('=', 1) for item in options['filter'] if '=' in item)
+        chunks = stream_export(
+            options['kind'],
+            options['format'],
+            params,
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+
+        if options['output']:
+            mode = 'wb' if options['gzip'] else 'w'
+            encoding = None if options['gzip'] else 'utf-8'
+            with open(options['output'], mode, encoding=encoding, newline=None if options['gzip'] else '') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Export written to {options['output']}"))
+        else:
+            out = sys.stdout.buffer if options['gzip'] else self.stdout
+            for chunk in chunks:
+                if options['gzip']:
+                    out.write(chunk)
+                else:
+                    out.write(chunk, ending='')
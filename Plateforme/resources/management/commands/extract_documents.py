@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+
+from resources.extraction import DEFAULT_TIMEOUT, extract_files
+from resources.importers import index_resources
+from resources.models import Document, DocumentText
+
+# Documents enregistrés puis réindexés ensemble
+INDEX_BATCH_SIZE = 50
+
+
+class Command(BaseCommand):
+    help = "Extract the text of the PDF/DOCX/TXT files attached to documents and index it for search"
+
+    def add_arguments(self, parser):
+        parser.add_argument('document_ids', nargs='*', help="Only extract these documents")
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Extract again files that have not changed, or whose extraction keeps failing",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help="Extraction processes (number of CPUs by default)",
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=DEFAULT_TIMEOUT,
+            help="Maximum extraction time per file, in seconds",
+        )
+
+    def handle(self, *args, **options):
+        documents = Document.objects.exclude(file='').exclude(file__isnull=True).select_related('text')
+        if options['document_ids']:
+            documents = documents.filter(pk__in=options['document_ids'])
+
+        pending, skipped = {}, 0
+        for document in documents.order_by('creation_date').iterator(chunk_size=100):
+            try:
+                # Extraction réussie, ou fichier qui échoue à chaque fois (--force pour réessayer)
+                current = document.text.is_current() or document.text.gave_up()
+            except DocumentText.DoesNotExist:
+                current = False
+            try:
+                path = document.file.path
+            except NotImplementedError:
+                path = None
+            if (current and not options['force']) or path is None:
+                skipped += 1
+                continue
+            pending[document.pk] = (document, path)
+
+        extracted = failed = 0
+        batch = []
+        jobs = ((pk, path, document.file_format) for pk, (document, path) in pending.items())
+        for pk, result in extract_files(jobs, workers=options['workers'], timeout=options['timeout']):
+            document = pending[pk][0]
+            DocumentText.store(document, result)
+            if result['error']:
+                failed += 1
+                self.stderr.write(f"{document.title}: {result['error']}")
+            else:
+                extracted += 1
+                self.stdout.write(f"{document.title}: {len(result['chunks'])} passages")
+            batch.append(pk)
+            if len(batch) >= INDEX_BATCH_SIZE:
+                self._index(batch)
+                batch = []
+        self._index(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{extracted} extracted, {skipped} up to date, {failed} failed"
+        ))
+
+    def _index(self, pks):
+        if pks and not index_resources({Document: pks}):
+            self.stdout.write(self.style.WARNING("Search indexing failed, run search_index --rebuild"))
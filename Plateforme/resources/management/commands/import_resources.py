@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.importers import DEFAULT_BATCH_SIZE, FORMATS, detect_format, import_resources
+
+
+class Command(BaseCommand):
+    help = "Bulk import resources from a CSV, JSON Lines or BibTeX file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--author',
+            required=True,
+            help="Email of the user the imported resources belong to",
+        )
+        parser.add_argument('--format', choices=FORMATS, help="Guessed from the file extension by default")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Validate the rows without writing anything")
+        parser.add_argument('--report', help="Write the per-row error report to this CSV file")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        if not fmt:
+            raise CommandError("Cannot guess the file format, use --format")
+        try:
+            author = get_user_model().objects.get(email=options['author'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['author']}")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_resources(
+                    stream,
+                    fmt,
+                    author,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8', newline='') as stream:
+                report.write_csv(stream)
+        else:
+            for entry in report.errors[:20]:
+                self.stderr.write(f"line {entry['line']}: {entry['errors']}")
+
+        verb = "validated" if report.dry_run else "imported"
+        valid = report.rows - len(report.errors)
+        self.stdout.write(self.style.SUCCESS(
+            f"{valid if report.dry_run else report.created_count} {verb}, "
+            f"{len(report.errors)} errors ({report.rows} rows)"
+        ))
+        if report.created_count and not report.indexed:
+            self.stdout.write(self.style.WARNING("Search indexing failed, run search_index --rebuild"))
+        if report.file_error:
+            raise CommandError(report.file_error)
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedResource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_type', models.CharField(max_length=20, verbose_name='Resource Type')),
+                ('resource_id', models.UUIDField(verbose_name='Resource ID')),
+                ('neighbors', models.JSONField(default=list, verbose_name='Neighbors')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Computed At')),
+            ],
+            options={
+                'verbose_name': 'Related resources',
+                'verbose_name_plural': 'Related resources',
+                'unique_together': {('resource_type', 'resource_id')},
+            },
+        ),
+    ]
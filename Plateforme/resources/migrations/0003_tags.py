@@ -0,0 +1,89 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from resources.text import normalize_tag, split_keywords
+
+
+def backfill_tags(apps, schema_editor):
+    """Create tags and links from the existing comma separated keywords."""
+    Tag = apps.get_model('resources', 'Tag')
+    TaggedResource = apps.get_model('resources', 'TaggedResource')
+
+    sources = [
+        ('Document', None),
+        ('Course', 'course'),
+        ('NLPTool', 'tool'),
+        ('Corpus', 'corpus'),
+    ]
+    names = {}
+    links = set()
+    for model_name, resource_type in sources:
+        model = apps.get_model('resources', model_name)
+        fields = ['pk', 'keywords'] + (['document_type'] if resource_type is None else [])
+        for row in model.objects.exclude(keywords__isnull=True).exclude(keywords='').values(*fields).iterator():
+            row_type = resource_type or row['document_type']
+            for keyword in split_keywords(row['keywords']):
+                normalized = normalize_tag(keyword)
+                if normalized:
+                    names.setdefault(normalized, keyword[:100])
+                    links.add((normalized, row_type, row['pk']))
+
+    counts = {}
+    for normalized, _resource_type, _resource_id in links:
+        counts[normalized] = counts.get(normalized, 0) + 1
+
+    Tag.objects.bulk_create(
+        [Tag(name=name, normalized=normalized, usage_count=counts[normalized]) for normalized, name in names.items()],
+        batch_size=1000
+    )
+    tag_ids = dict(Tag.objects.values_list('normalized', 'pk'))
+    TaggedResource.objects.bulk_create(
+        [
+            TaggedResource(tag_id=tag_ids[normalized], resource_type=resource_type, resource_id=resource_id)
+            for normalized, resource_type, resource_id in links
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0002_relatedresource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('normalized', models.CharField(max_length=100, unique=True, verbose_name='Normalized Name')),
+                ('usage_count', models.PositiveIntegerField(default=0, verbose_name='Usage Count')),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['-usage_count', 'name'],
+                'indexes': [models.Index(fields=['-usage_count', 'name'], name='resources_t_usage_c_c1144a_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaggedResource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_type', models.CharField(max_length=20, verbose_name='Resource Type')),
+                ('resource_id', models.UUIDField(verbose_name='Resource ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tagged_resources', to='resources.tag', verbose_name='Tag')),
+            ],
+            options={
+                'verbose_name': 'Tagged resource',
+                'verbose_name_plural': 'Tagged resources',
+                'indexes': [models.Index(fields=['resource_type', 'resource_id'], name='resources_t_resourc_d8bb78_idx')],
+                'unique_together': {('tag', 'resource_type', 'resource_id')},
+            },
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
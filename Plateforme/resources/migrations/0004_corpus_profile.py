@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:10
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0003_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='corpus',
+            name='file',
+            field=models.FileField(blank=True, help_text='TXT, CSV, JSON or JSONL file analysed by the platform', null=True, upload_to='corpora/', validators=[django.core.validators.FileExtensionValidator(['txt', 'csv', 'json', 'jsonl'])], verbose_name='Corpus File'),
+        ),
+        migrations.CreateModel(
+            name='CorpusProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_count', models.BigIntegerField(db_index=True, default=0, verbose_name='Tokens')),
+                ('type_count', models.BigIntegerField(default=0, verbose_name='Types')),
+                ('segment_count', models.BigIntegerField(default=0, verbose_name='Segments')),
+                ('dominant_script', models.CharField(blank=True, choices=[('arabic', 'Arabic'), ('latin', 'Latin'), ('mixed', 'Mixed')], db_index=True, max_length=10, verbose_name='Dominant Script')),
+                ('data', models.JSONField(default=dict, verbose_name='Profile')),
+                ('source_name', models.CharField(blank=True, max_length=255, verbose_name='Analysed File')),
+                ('source_size', models.BigIntegerField(default=0, verbose_name='Analysed File Size')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Computed At')),
+                ('corpus', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to='resources.corpus', verbose_name='Corpus')),
+            ],
+            options={
+                'verbose_name': 'Corpus profile',
+                'verbose_name_plural': 'Corpus profiles',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 18:17
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0004_corpus_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='file',
+            field=models.FileField(blank=True, help_text='PDF, DOCX or TXT file whose text is indexed for search', null=True, upload_to='documents/', validators=[django.core.validators.FileExtensionValidator(['pdf', 'docx', 'txt'])], verbose_name='Document File'),
+        ),
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('done', 'Done'), ('failed', 'Failed')], db_index=True, default='done', max_length=10, verbose_name='Status')),
+                ('chunks', models.JSONField(default=list, verbose_name='Passages')),
+                ('char_count', models.PositiveIntegerField(default=0, verbose_name='Characters')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('source_name', models.CharField(blank=True, max_length=255, verbose_name='Extracted File')),
+                ('source_size', models.BigIntegerField(default=0, verbose_name='Extracted File Size')),
+                ('extracted_at', models.DateTimeField(auto_now=True, verbose_name='Extracted At')),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='text', to='resources.document', verbose_name='Document')),
+            ],
+            options={
+                'verbose_name': 'Document text',
+                'verbose_name_plural': 'Document texts',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0005_document_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documenttext',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Attempts'),
+        ),
+    ]
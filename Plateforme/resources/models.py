@@ -1,18 +1,37 @@
 import uuid
+from collections import Counter, defaultdict
 from django.db import models
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError, PermissionDenied
+from django.core.validators import FileExtensionValidator
 from institutions.models import Institution
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django_elasticsearch_dsl.registries import registry
+from .cache import bump_generation_for_model
+from .corpus_stats import analyze_file
+from .extraction import DOCUMENT_FILE_EXTENSIONS
+from .text import normalize_tag, split_keywords
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Nom du modèle -> type de ressource utilisé dans les URLs de détail
+RESOURCE_TYPES = {
+    'nlptool': 'tool',
+    'course': 'course',
+    'corpus': 'corpus',
+}
+
+CORPUS_FILE_EXTENSIONS = ['txt', 'csv', 'json', 'jsonl']
+
+# Extractions échouées du même fichier avant que extract_documents ne l'ignore
+MAX_EXTRACTION_ATTEMPTS = 3
+
 class ResourceBase(models.Model):
     """
     Base model for all resources.
@@ -83,16 +102,11 @@ class ResourceBase(models.Model):
         return []
     
     def get_keywords_list(self):
-    
-     if not self.keywords:
-        return []
-        
-     if isinstance(self.keywords, str):
-        keywords = self.keywords.replace('،', ',')
-        return [kw.strip() for kw in keywords.split(',') if kw.strip()]
-     elif isinstance(self.keywords, (list, tuple)):
-        return list(self.keywords)
-     return []
+        return split_keywords(self.keywords)
+
+    def get_resource_type(self):
+        """Type used in detail URLs ('tool', 'course', 'corpus', ...)."""
+        return RESOURCE_TYPES.get(self._meta.model_name, self._meta.model_name)
 
     def get_author_full_name(self):
         if self.author:
@@ -260,6 +274,14 @@ class Document(ResourceBase):
         verbose_name="Auteurs",
         blank=True,
     )
+    file = models.FileField(
+        upload_to='documents/',
+        blank=True,
+        null=True,
+        verbose_name=_("Document File"),
+        validators=[FileExtensionValidator(DOCUMENT_FILE_EXTENSIONS)],
+        help_text=_("PDF, DOCX or TXT file whose text is indexed for search")
+    )
 
     class Meta:
         verbose_name = _("Document")
@@ -275,6 +297,9 @@ class Document(ResourceBase):
             return self.memoir.get_citation()
         return f"{self.title} ({self.author}, {self.creation_date.year})"
 
+    def get_resource_type(self):
+        return self.document_type
+
     def get_detail_url(self):
         """Get detail URL based on document type."""
         if hasattr(self, 'article'):
@@ -504,10 +529,449 @@ class Corpus(ResourceBase):
         verbose_name=_("Format"),
         help_text=_("Format of the corpus (e.g., TXT, CSV, JSON)")
     )
+    file = models.FileField(
+        upload_to='corpora/',
+        blank=True,
+        null=True,
+        verbose_name=_("Corpus File"),
+        validators=[FileExtensionValidator(CORPUS_FILE_EXTENSIONS)],
+        help_text=_("TXT, CSV, JSON or JSONL file analysed by the platform")
+    )
 
     class Meta:
         db_table = 'resources_corpus' 
 
+class CorpusProfile(models.Model):
+    """
+    Statistics measured on the file of a corpus.
+
+    Filled offline by the ``analyze_corpora`` command. The counts used as
+    search facets have their own columns, the rest of the profile (script
+    mix, top n-grams, length distributions) is kept in ``data``.
+    """
+    class Script(models.TextChoices):
+        ARABIC = 'arabic', _('Arabic')
+        LATIN = 'latin', _('Latin')
+        MIXED = 'mixed', _('Mixed')
+
+    # Tranches de taille proposées comme facettes de recherche
+    TOKEN_RANGES = [
+        ('small', _('Under 100k tokens'), 0, 100_000),
+        ('medium', _('100k to 1M tokens'), 100_000, 1_000_000),
+        ('large', _('1M to 10M tokens'), 1_000_000, 10_000_000),
+        ('xlarge', _('Over 10M tokens'), 10_000_000, None),
+    ]
+
+    corpus = models.OneToOneField(
+        Corpus,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name=_("Corpus")
+    )
+    token_count = models.BigIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name=_("Tokens")
+    )
+    type_count = models.BigIntegerField(
+        default=0,
+        verbose_name=_("Types")
+    )
+    segment_count = models.BigIntegerField(
+        default=0,
+        verbose_name=_("Segments")
+    )
+    dominant_script = models.CharField(
+        max_length=10,
+        choices=Script.choices,
+        blank=True,
+        db_index=True,
+        verbose_name=_("Dominant Script")
+    )
+    data = models.JSONField(
+        default=dict,
+        verbose_name=_("Profile")
+    )
+    source_name = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Analysed File")
+    )
+    source_size = models.BigIntegerField(
+        default=0,
+        verbose_name=_("Analysed File Size")
+    )
+    computed_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Computed At")
+    )
+
+    class Meta:
+        verbose_name = _("Corpus profile")
+        verbose_name_plural = _("Corpus profiles")
+
+    def __str__(self):
+        return f"{self.corpus} ({self.token_count} tokens)"
+
+    @classmethod
+    def token_range_filter(cls, name):
+        """Q object selecting the corpora of a token range, ``None`` if unknown."""
+        for key, _label, low, high in cls.TOKEN_RANGES:
+            if key == name:
+                q = models.Q(profile__token_count__gte=low)
+                if high is not None:
+                    q &= models.Q(profile__token_count__lt=high)
+                return q
+        return None
+
+    @property
+    def script_mix(self):
+        """``[(script, percent)]`` sorted by share, for display."""
+        scripts = self.data.get('scripts', {})
+        return sorted(((name, round(share * 100, 1)) for name, share in scripts.items()), key=lambda item: -item[1])
+
+    @property
+    def token_length_distribution(self):
+        return self._distribution(self.data.get('token_lengths', {}))
+
+    @property
+    def segment_length_distribution(self):
+        return self._distribution(self.data.get('segment_lengths', {}))
+
+    @staticmethod
+    def _distribution(counts):
+        """``[(label, count, percent)]`` of a histogram stored in ``data``."""
+        total = sum(counts.values())
+        return [(label, count, round(count * 100 / total, 1) if total else 0) for label, count in counts.items()]
+
+    def is_current(self):
+        corpus_file = self.corpus.file
+        return bool(corpus_file) and self.source_name == corpus_file.name and self.source_size == corpus_file.size
+
+    @classmethod
+    def compute(cls, corpus, workers=None, force=False):
+        """
+        Analyse the file of ``corpus`` and store its profile.
+
+        Returns the profile, or ``None`` when the corpus has no local file or
+        its profile is already up to date (unless ``force``).
+        """
+        if not corpus.file:
+            return None
+        profile = cls.objects.filter(corpus=corpus).first()
+        if profile and profile.is_current() and not force:
+            return None
+        try:
+            path = corpus.file.path
+        except NotImplementedError:
+            logger.warning(f"Corpus {corpus.pk} file is not on local storage, skipping analysis")
+            return None
+
+        data = analyze_file(path, corpus.file_format, workers=workers)
+        profile, _created = cls.objects.update_or_create(
+            corpus=corpus,
+            defaults={
+                'token_count': data['token_count'],
+                'type_count': data['type_count'],
+                'segment_count': data['segment_count'],
+                'dominant_script': data['dominant_script'],
+                'data': data,
+                'source_name': corpus.file.name,
+                'source_size': data['file_size'],
+            }
+        )
+        return profile
+
+
+class DocumentText(models.Model):
+    """
+    Text extracted from the file of a document, cut into passages.
+
+    Filled offline by the ``extract_documents`` command and indexed as the
+    nested ``passages`` field of the search index. ``chunks`` holds
+    ``{"position", "label", "text"}`` dicts, the label being the page or
+    section of the file.
+    """
+    class Status(models.TextChoices):
+        DONE = 'done', _('Done')
+        FAILED = 'failed', _('Failed')
+
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='text',
+        verbose_name=_("Document")
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.DONE,
+        db_index=True,
+        verbose_name=_("Status")
+    )
+    chunks = models.JSONField(
+        default=list,
+        verbose_name=_("Passages")
+    )
+    char_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Characters")
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name=_("Error")
+    )
+    source_name = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Extracted File")
+    )
+    source_size = models.BigIntegerField(
+        default=0,
+        verbose_name=_("Extracted File Size")
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name=_("Attempts")
+    )
+    extracted_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Extracted At")
+    )
+
+    class Meta:
+        verbose_name = _("Document text")
+        verbose_name_plural = _("Document texts")
+
+    def __str__(self):
+        return f"{self.document} ({len(self.chunks)} passages)"
+
+    def is_same_file(self):
+        document_file = self.document.file
+        return bool(document_file) and self.source_name == document_file.name and self.source_size == document_file.size
+
+    def is_current(self):
+        """Whether the text was successfully extracted from the current file."""
+        return self.status == self.Status.DONE and self.is_same_file()
+
+    def gave_up(self):
+        """Whether the extraction of the current file failed ``MAX_EXTRACTION_ATTEMPTS`` times."""
+        return self.status == self.Status.FAILED and self.attempts >= MAX_EXTRACTION_ATTEMPTS and self.is_same_file()
+
+    @classmethod
+    def store(cls, document, result):
+        """Save the result of ``extraction.extract_file`` for ``document``."""
+        previous = cls.objects.filter(document=document).first()
+        attempts = 1
+        if result['error'] and previous is not None and previous.status == cls.Status.FAILED and previous.is_same_file():
+            attempts = previous.attempts + 1
+        text, _created = cls.objects.update_or_create(
+            document=document,
+            defaults={
+                'status': cls.Status.FAILED if result['error'] else cls.Status.DONE,
+                'chunks': result['chunks'],
+                'char_count': result['char_count'],
+                'error': result['error'],
+                'source_name': document.file.name,
+                'source_size': document.file.size,
+                'attempts': attempts,
+            }
+        )
+        return text
+
+
+class RelatedResource(models.Model):
+    """
+    Precomputed content-based neighbours of a resource.
+
+    One row per resource, filled offline by the ``build_related_resources``
+    command. ``neighbors`` holds the top-k most similar resources as
+    ``{"type", "id", "title", "score"}`` dicts, best first.
+    """
+    resource_type = models.CharField(
+        max_length=20,
+        verbose_name=_("Resource Type")
+    )
+    resource_id = models.UUIDField(
+        verbose_name=_("Resource ID")
+    )
+    neighbors = models.JSONField(
+        default=list,
+        verbose_name=_("Neighbors")
+    )
+    computed_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Computed At")
+    )
+
+    class Meta:
+        verbose_name = _("Related resources")
+        verbose_name_plural = _("Related resources")
+        unique_together = ['resource_type', 'resource_id']
+
+    def __str__(self):
+        return f"{self.resource_type}:{self.resource_id}"
+
+    @classmethod
+    def get_neighbors(cls, resource_type, resource_id):
+        """Return the stored neighbours of a resource (one indexed query)."""
+        neighbors = cls.objects.filter(
+            resource_type=resource_type,
+            resource_id=resource_id
+        ).values_list('neighbors', flat=True).first()
+        return neighbors or []
+
+class Tag(models.Model):
+    """
+    Normalized keyword shared by all resource types.
+
+    ``normalized`` is the lookup key (lowercase, Arabic-normalized) and
+    ``usage_count`` is maintained incrementally when resources are saved or
+    deleted, so "top tags" is a single indexed query.
+    """
+    name = models.CharField(
+        max_length=100,
+        verbose_name=_("Name")
+    )
+    normalized = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name=_("Normalized Name")
+    )
+    usage_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Usage Count")
+    )
+
+    class Meta:
+        verbose_name = _("Tag")
+        verbose_name_plural = _("Tags")
+        ordering = ['-usage_count', 'name']
+        indexes = [
+            models.Index(fields=['-usage_count', 'name']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class TaggedResource(models.Model):
+    """Link between a tag and a resource of any type."""
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='tagged_resources',
+        verbose_name=_("Tag")
+    )
+    resource_type = models.CharField(
+        max_length=20,
+        verbose_name=_("Resource Type")
+    )
+    resource_id = models.UUIDField(
+        verbose_name=_("Resource ID")
+    )
+
+    class Meta:
+        verbose_name = _("Tagged resource")
+        verbose_name_plural = _("Tagged resources")
+        unique_together = ['tag', 'resource_type', 'resource_id']
+        indexes = [
+            models.Index(fields=['resource_type', 'resource_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.tag} -> {self.resource_type}:{self.resource_id}"
+
+    @classmethod
+    def resource_ids(cls, tag, resource_types, partial=False):
+        """
+        Subquery of the ids of the resources carrying ``tag``, or with
+        ``partial`` any tag containing it (free-text search: "deep" finds
+        "deep learning").
+        """
+        lookup = 'tag__normalized__contains' if partial else 'tag__normalized'
+        return cls.objects.filter(
+            **{lookup: normalize_tag(tag)},
+            resource_type__in=resource_types
+        ).values('resource_id')
+
+    @classmethod
+    def sync(cls, resource):
+        """Align the tag links of ``resource`` with its ``keywords`` string."""
+        resource_type = resource.get_resource_type()
+        wanted = {}
+        for keyword in resource.get_keywords_list():
+            normalized = normalize_tag(keyword)
+            if normalized:
+                wanted.setdefault(normalized, keyword[:100])
+
+        links = cls.objects.filter(resource_type=resource_type, resource_id=resource.pk)
+        current = dict(links.values_list('tag__normalized', 'tag_id'))
+        removed = [tag_id for normalized, tag_id in current.items() if normalized not in wanted]
+        added = [normalized for normalized in wanted if normalized not in current]
+
+        if removed:
+            links.filter(tag_id__in=removed).delete()
+            Tag.objects.filter(pk__in=removed).update(usage_count=F('usage_count') - 1)
+        if added:
+            Tag.objects.bulk_create(
+                [Tag(name=wanted[normalized], normalized=normalized) for normalized in added],
+                ignore_conflicts=True
+            )
+            tag_ids = list(Tag.objects.filter(normalized__in=added).values_list('pk', flat=True))
+            cls.objects.bulk_create(
+                [cls(tag_id=tag_id, resource_type=resource_type, resource_id=resource.pk) for tag_id in tag_ids],
+                ignore_conflicts=True
+            )
+            Tag.objects.filter(pk__in=tag_ids).update(usage_count=F('usage_count') + 1)
+
+    @classmethod
+    def add_many(cls, resources):
+        """
+        Tag freshly inserted resources in a constant number of queries.
+
+        Used after ``bulk_create``, which bypasses ``sync_resource_tags``.
+        """
+        names = {}
+        links = []
+        for resource in resources:
+            resource_type = resource.get_resource_type()
+            seen = set()
+            for keyword in resource.get_keywords_list():
+                normalized = normalize_tag(keyword)
+                if normalized and normalized not in seen:
+                    seen.add(normalized)
+                    names.setdefault(normalized, keyword[:100])
+                    links.append((normalized, resource_type, resource.pk))
+        if not links:
+            return
+
+        Tag.objects.bulk_create(
+            [Tag(name=name, normalized=normalized) for normalized, name in names.items()],
+            ignore_conflicts=True
+        )
+        tag_ids = dict(Tag.objects.filter(normalized__in=list(names)).values_list('normalized', 'pk'))
+        cls.objects.bulk_create(
+            [cls(tag_id=tag_ids[normalized], resource_type=resource_type, resource_id=resource_id)
+             for normalized, resource_type, resource_id in links],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        # Un UPDATE par incrément distinct plutôt qu'un par tag
+        increments = defaultdict(list)
+        for normalized, count in Counter(normalized for normalized, _type, _id in links).items():
+            increments[count].append(tag_ids[normalized])
+        for count, ids in increments.items():
+            Tag.objects.filter(pk__in=ids).update(usage_count=F('usage_count') + count)
+
+    @classmethod
+    def clear(cls, resource):
+        links = cls.objects.filter(resource_type=resource.get_resource_type(), resource_id=resource.pk)
+        tag_ids = list(links.values_list('tag_id', flat=True))
+        if tag_ids:
+            links.delete()
+            Tag.objects.filter(pk__in=tag_ids).update(usage_count=F('usage_count') - 1)
+
 @receiver(post_save, sender=Course)
 @receiver(post_save, sender=NLPTool)
 @receiver(post_save, sender=Corpus)
@@ -518,4 +982,46 @@ def index_resource(sender, instance, **kwargs):
         logger.info(f"Resource {instance.title} indexed successfully")
     except Exception as e:
         logger.error(f"Error indexing resource {instance.title}: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=NLPTool)
+@receiver(post_save, sender=Corpus)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Thesis)
+@receiver(post_save, sender=Memoir)
+@receiver(post_save, sender=Institution)
+@receiver(post_save, sender=CorpusProfile)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=NLPTool)
+@receiver(post_delete, sender=Corpus)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Thesis)
+@receiver(post_delete, sender=Memoir)
+@receiver(post_delete, sender=Institution)
+@receiver(post_delete, sender=CorpusProfile)
+def invalidate_detail_cache(sender, instance, **kwargs):
+    # Le simple compteur de vues n'apparaît pas dans les fragments en cache
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'views_count'}:
+        return
+    bump_generation_for_model(sender)
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=NLPTool)
+@receiver(post_save, sender=Corpus)
+@receiver(post_save, sender=Document)
+def sync_resource_tags(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields and 'keywords' not in update_fields:
+        return
+    TaggedResource.sync(instance)
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=NLPTool)
+@receiver(post_delete, sender=Corpus)
+@receiver(post_delete, sender=Document)
+def clear_resource_tags(sender, instance, **kwargs):
+    TaggedResource.clear(instance)
@@ -0,0 +1,226 @@
+"""
+Content-based related-resource recommendations.
+
+Every resource (documents, courses, tools, corpora) is turned into a TF-IDF
+vector built from its title, description and keywords, using the
+Arabic/English aware tokenizer of ``resources.text``. Cosine neighbours are
+computed with sparse matrix products, ``chunk_size`` rows at a time so that
+only a ``chunk_size x n`` block of similarities is ever held in memory, and
+the top-k lists are stored in ``RelatedResource``.
+
+In incremental mode only new or changed resources are recomputed; since the
+cosine similarity is symmetric, the same block is used to insert them into
+(or move them within) the neighbour lists of the other resources. A periodic
+full rebuild refreshes the IDF weights and fills lists that lost entries.
+"""
+import logging
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+
+from .cache import MODEL_RESOURCE_TYPES, bump_generation
+from .models import Course, Corpus, Document, NLPTool, RelatedResource
+from .text import split_keywords, tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 6
+DEFAULT_CHUNK_SIZE = 512
+MIN_SCORE = 0.05
+
+# Le titre et les mots-clés pèsent plus que la description
+TITLE_WEIGHT = 3
+KEYWORDS_WEIGHT = 2
+
+
+@dataclass
+class ResourceItem:
+    resource_type: str
+    resource_id: str
+    title: str
+    tokens: list
+    changed_at: object
+
+
+def iter_resources():
+    """Yield every resource of the platform as a ``ResourceItem``."""
+    fields = ['id', 'title', 'description', 'keywords', 'creation_date', 'update_date']
+    sources = [
+        (None, Document.objects.only('document_type', *fields)),
+        ('course', Course.objects.only(*fields)),
+        ('tool', NLPTool.objects.only(*fields)),
+        ('corpus', Corpus.objects.only(*fields)),
+    ]
+    for resource_type, queryset in sources:
+        for obj in queryset.order_by().iterator(chunk_size=2000):
+            tokens = tokenize(obj.title) * TITLE_WEIGHT + tokenize(obj.description)
+            for keyword in split_keywords(obj.keywords):
+                tokens.extend(tokenize(keyword) * KEYWORDS_WEIGHT)
+            yield ResourceItem(
+                resource_type=resource_type or obj.document_type,
+                resource_id=str(obj.pk),
+                title=obj.title,
+                tokens=tokens,
+                changed_at=obj.update_date or obj.creation_date,
+            )
+
+
+def build_tfidf_matrix(items, max_df=0.5):
+    """
+    Build an L2-normalized TF-IDF CSR matrix (one row per item).
+
+    Terms present in more than ``max_df`` of the items carry no signal and
+    are dropped once the collection is large enough for the ratio to matter.
+    """
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    data = []
+    for item in items:
+        counts = Counter(vocabulary.setdefault(token, len(vocabulary)) for token in item.tokens)
+        indices.extend(counts.keys())
+        data.extend(1.0 + math.log(count) for count in counts.values())
+        indptr.append(len(indices))
+
+    n_items = len(items)
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(n_items, max(len(vocabulary), 1)),
+    )
+    if n_items == 0:
+        return matrix
+
+    df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1.0 + n_items) / (1.0 + df)) + 1.0
+    if n_items >= 20:
+        idf[df > max_df * n_items] = 0.0
+    matrix = matrix @ sparse.diags(idf.astype(np.float32))
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    matrix = sparse.diags((1.0 / norms).astype(np.float32)) @ matrix
+    return matrix.tocsr()
+
+
+def iter_similarity_blocks(matrix, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield ``(row_indices, dense similarity block)`` for the given rows."""
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(rows), chunk_size):
+        chunk = np.asarray(rows[start:start + chunk_size])
+        block = (matrix[chunk] @ transposed).toarray()
+        # Une ressource n'est pas sa propre voisine
+        block[np.arange(len(chunk)), chunk] = 0.0
+        yield chunk, block
+
+
+def top_k_indices(scores, k):
+    """Indices of the k best scores, best first, above ``MIN_SCORE``."""
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+    return [i for i in candidates if scores[i] >= MIN_SCORE]
+
+
+def _neighbor(item, score):
+    return {
+        'type': item.resource_type,
+        'id': item.resource_id,
+        'title': item.title,
+        'score': round(float(score), 4),
+    }
+
+
+def build_related_resources(full=False, top_k=DEFAULT_TOP_K, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Compute and store the neighbour lists.
+
+    Returns a dict of counters describing the run.
+    """
+    items = list(iter_resources())
+    keys = [(item.resource_type, item.resource_id) for item in items]
+    index = {key: i for i, key in enumerate(keys)}
+
+    existing = {
+        (resource_type, str(resource_id)): (neighbors, computed_at)
+        for resource_type, resource_id, neighbors, computed_at in RelatedResource.objects.values_list(
+            'resource_type', 'resource_id', 'neighbors', 'computed_at'
+        ).iterator(chunk_size=2000)
+    }
+
+    if full:
+        dirty = list(range(len(items)))
+    else:
+        dirty = [
+            i for i, item in enumerate(items)
+            if keys[i] not in existing or (item.changed_at and item.changed_at > existing[keys[i]][1])
+        ]
+
+    stale = [key for key in existing if key not in index]
+    stats = {'resources': len(items), 'recomputed': len(dirty), 'propagated': 0, 'deleted': len(stale)}
+
+    matrix = build_tfidf_matrix(items) if dirty else None
+    dirty_set = set(dirty)
+    dirty_ids = {keys[i][1] for i in dirty}
+    recomputed = {}
+    candidates = defaultdict(list)
+
+    for chunk, block in (iter_similarity_blocks(matrix, dirty, chunk_size) if dirty else ()):
+        for row, i in enumerate(chunk.tolist()):
+            scores = block[row]
+            recomputed[keys[i]] = [_neighbor(items[j], scores[j]) for j in top_k_indices(scores, top_k)]
+            if full:
+                continue
+            # Symétrie du cosinus : la colonne i donne la similarité des autres
+            # ressources avec la ressource modifiée
+            for j in np.nonzero(scores >= MIN_SCORE)[0].tolist():
+                if j not in dirty_set:
+                    candidates[j].append(_neighbor(items[i], scores[j]))
+
+    updated = {}
+    if not full:
+        for key, (neighbors, _computed_at) in existing.items():
+            j = index.get(key)
+            if j is None or j in dirty_set:
+                continue
+            kept = [n for n in neighbors if n['id'] not in dirty_ids and (n['type'], n['id']) in index]
+            if len(kept) == len(neighbors) and j not in candidates:
+                continue
+            merged = sorted(kept + candidates.get(j, []), key=lambda n: n['score'], reverse=True)[:top_k]
+            updated[key] = merged
+        stats['propagated'] = len(updated)
+
+    rows = [
+        RelatedResource(resource_type=key[0], resource_id=key[1], neighbors=neighbors)
+        for key, neighbors in list(recomputed.items()) + list(updated.items())
+    ]
+    with transaction.atomic():
+        for resource_type, resource_ids in _group_by_type(stale).items():
+            RelatedResource.objects.filter(resource_type=resource_type, resource_id__in=resource_ids).delete()
+        RelatedResource.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['resource_type', 'resource_id'],
+            update_fields=['neighbors', 'computed_at'],
+        )
+
+    if rows or stale:
+        # Les fragments des pages de détail affichent ces voisins
+        bump_generation(*{t for types in MODEL_RESOURCE_TYPES.values() for t in types})
+
+    logger.info(f"Related resources built: {stats}")
+    return stats
+
+
+def _group_by_type(keys):
+    grouped = defaultdict(list)
+    for resource_type, resource_id in keys:
+        grouped[resource_type].append(resource_id)
+    return grouped
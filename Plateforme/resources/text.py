@@ -0,0 +1,83 @@
+import re
+
+# Diacritiques (tashkeel), tatweel et marques coraniques
+ARABIC_DIACRITICS = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+
+ARABIC_CHAR_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+    'ؤ': 'و',
+    'ئ': 'ي',
+})
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+ARABIC_RE = re.compile(r'[\u0600-\u06FF]')
+LATIN_RE = re.compile(r'[A-Za-z]')
+
+# Article défini et proclitiques courants retirés des mots arabes
+ARABIC_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+
+ENGLISH_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this
+to was were will with we our their they these those which who what how can
+not but also into than then there such using used use based new
+""".split())
+
+ARABIC_STOPWORDS = frozenset("""
+في من على الى عن مع هذا هذه ذلك تلك التي الذي الذين و او ثم ان كان كانت
+هو هي هم نحن انت انا ما لا لم لن قد كل بين عند حتى اذا بعد قبل تم او اي
+""".split())
+
+STOPWORDS = ENGLISH_STOPWORDS | ARABIC_STOPWORDS
+
+
+def normalize_arabic(text):
+    """Strip diacritics/tatweel and unify alef, ya, ta marbuta and hamza forms."""
+    return ARABIC_DIACRITICS.sub('', text).translate(ARABIC_CHAR_MAP)
+
+
+def normalize(text):
+    """Lowercase Latin letters and normalize Arabic script."""
+    return normalize_arabic(text.lower())
+
+
+def strip_arabic_prefix(token):
+    for prefix in ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            return token[len(prefix):]
+    return token
+
+
+def tokenize(text, stopwords=STOPWORDS, min_length=2):
+    """
+    Split a text into normalized tokens.
+
+    Works on mixed Arabic/English content: Latin words are lowercased,
+    Arabic words are normalized and lose their definite article.
+    """
+    if not text:
+        return []
+    tokens = []
+    for token in TOKEN_RE.findall(normalize(text)):
+        if ARABIC_RE.match(token):
+            token = strip_arabic_prefix(token)
+        if len(token) < min_length or token.isdigit() or token in stopwords:
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def split_keywords(keywords):
+    """Split a comma separated keyword string (Latin or Arabic comma)."""
+    if not keywords:
+        return []
+    if isinstance(keywords, (list, tuple)):
+        return list(keywords)
+    keywords = keywords.replace('،', ',')
+    return [kw.strip() for kw in keywords.split(',') if kw.strip()]
+
+
+def normalize_tag(keyword):
+    """Lookup form of a keyword: normalized script and collapsed whitespace."""
+    return ' '.join(normalize(keyword).split())[:100]
@@ -42,6 +42,17 @@ urlpatterns = [
     path('tools/add/', ToolCreateView.as_view(), name="tool-create"),
     
     path('delete/<str:type>/<uuid:pk>/', ResourceDeleteView.as_view(), name="resource-delete"),
+
+    # Citations (sélection ou liste filtrée)
+    path('citations/', views.export_citations, name="citations"),
+
+    # Tags
+    path('tags/', views.api_top_tags, name="tag-list"),
+    path('tags/<str:tag>/', views.api_tag_resources, name="tag-resources"),
+
+    # Concordances (KWIC) dans le fichier d'un corpus
+    path('corpus/<uuid:pk>/concordance/', views.api_corpus_concordance, name="corpus-concordance"),
+    path('corpus/<uuid:pk>/lines/', views.api_corpus_lines, name="corpus-lines"),
     
     # Type-specific detail views
     path('document/<uuid:pk>/', views.ResourceDetailView.as_view(), kwargs={'type': 'document'}, name="document_detail"),
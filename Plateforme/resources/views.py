@@ -1,5 +1,6 @@
-from django.http import Http404
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils.timezone import now
+from django.utils.functional import SimpleLazyObject
 from django.shortcuts import redirect, render, get_object_or_404
 from django.views.generic import ListView, DetailView
 from django.views.generic.edit import CreateView, FormView ,UpdateView ,DeleteView
@@ -7,22 +8,60 @@ from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse, reverse_lazy
-from django.db.models import Q, F
+from django.db.models import Count, Q, F
 from django.contrib import messages
+from django.core.paginator import Paginator
 from .forms import ResourceForm
+from .cache import DETAIL_CACHE_TIMEOUT, detail_cache_version
+from .concordance import DEFAULT_CONTEXT, MAX_CONTEXT, MIN_PREFIX_LENGTH, MODES, get_index
+from .corpus_preview import first_page, get_preview
+from .citations import CONTENT_TYPES as CITATION_CONTENT_TYPES, EXTENSIONS as CITATION_EXTENSIONS, FORMATS as CITATION_FORMATS, stream_citations
 from django.conf import settings
-from accounts.views import LoginAndVerifiedRequiredMixin
+from accounts.views import LoginAndVerifiedRequiredMixin, login_and_verified_required
 
 # Import the correct model names from your models.py
-from .models import Document, NLPTool, Article, Thesis, Memoir, Course, Corpus, ResourceBase        
+from .models import (
+    Document, NLPTool, Article, Thesis, Memoir, Course, Corpus, ResourceBase,
+    CorpusProfile, RelatedResource, Tag, TaggedResource,
+)
+from .text import normalize_tag
 from django.contrib.auth import get_user_model
-from notifications.models import Notification
+from notifications.services import NotificationService
 
 from django.db.models import Q
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+DOCUMENT_TYPES = ['article', 'thesis', 'memoir']
+
+
+def filter_documents(params):
+    """Documents of the resource list for its GET parameters (also used by the citation export)."""
+    search_query = params.get('q', '')
+    resource_type = params.get('type', '')
+    language_filter = params.get('language', '')
+    tag_filter = params.get('tag', '').strip()
+
+    docs = Document.objects.all()
+    if resource_type and resource_type not in DOCUMENT_TYPES:
+        # Liste d'outils, de cours ou de corpus : aucun document
+        return docs.none()
+    if language_filter:
+        docs = docs.filter(language=language_filter)
+    if resource_type in DOCUMENT_TYPES:
+        docs = docs.filter(document_type=resource_type)
+    if search_query:
+        docs = docs.filter(
+            Q(title__icontains=search_query) |
+            Q(description__icontains=search_query)
+        )
+    if tag_filter:
+        docs = docs.filter(pk__in=TaggedResource.resource_ids(tag_filter, ['article', 'thesis', 'memoir']))
+    return docs
+
+
 class ResourceListView(LoginAndVerifiedRequiredMixin, ListView):
     template_name = 'resources/list.html'
     context_object_name = 'resources'
@@ -33,21 +72,12 @@ class ResourceListView(LoginAndVerifiedRequiredMixin, ListView):
         resource_type = self.request.GET.get('type', '')
         field_filter = self.request.GET.get('field', '')
         language_filter = self.request.GET.get('language', '') 
+        tag_filter = self.request.GET.get('tag', '').strip()
         
         querysets = []
         
         if resource_type in ['', 'article', 'thesis', 'memoir']:
-            docs = Document.objects.all()
-            if language_filter:
-                 docs = docs.filter(language=language_filter)
-            if resource_type in ['article', 'thesis', 'memoir']:
-                docs = docs.filter(document_type=resource_type)
-            if search_query:
-                docs = docs.filter(
-                    Q(title__icontains=search_query) | 
-                    Q(description__icontains=search_query)
-                )
-            querysets.append(docs)
+            querysets.append(filter_documents(self.request.GET))
         
         if resource_type in ['', 'tool']:
             tools = NLPTool.objects.all()
@@ -58,6 +88,8 @@ class ResourceListView(LoginAndVerifiedRequiredMixin, ListView):
                     Q(title__icontains=search_query) | 
                     Q(description__icontains=search_query)
                 )
+            if tag_filter:
+                tools = tools.filter(pk__in=TaggedResource.resource_ids(tag_filter, ['tool']))
             querysets.append(tools)
         
         if resource_type in ['', 'course']:
@@ -71,6 +103,8 @@ class ResourceListView(LoginAndVerifiedRequiredMixin, ListView):
                     Q(title__icontains=search_query) | 
                     Q(description__icontains=search_query)
                 )
+            if tag_filter:
+                courses = courses.filter(pk__in=TaggedResource.resource_ids(tag_filter, ['course']))
             querysets.append(courses)
         
         if resource_type in ['', 'corpus']:
@@ -84,6 +118,8 @@ class ResourceListView(LoginAndVerifiedRequiredMixin, ListView):
                     Q(title__icontains=search_query) | 
                     Q(description__icontains=search_query)
                 )
+            if tag_filter:
+                corpora = corpora.filter(pk__in=TaggedResource.resource_ids(tag_filter, ['corpus']))
             querysets.append(corpora)
 
         combined = []
@@ -113,6 +149,9 @@ class ResourceListView(LoginAndVerifiedRequiredMixin, ListView):
         context['field_choices'] = FieldChoices.choices
         context['current_field'] = self.request.GET.get('field', '')
         context['current_language'] = self.request.GET.get('language', '')
+        context['current_tag'] = self.request.GET.get('tag', '')
+        # Citations : seulement quand la liste peut contenir des documents
+        context['can_cite'] = self.request.GET.get('type', '') in ['', *DOCUMENT_TYPES]
         context['page'] = 'resources'
         return context
 
@@ -125,6 +164,10 @@ class ToolListView(LoginAndVerifiedRequiredMixin, ListView):
     def get_queryset(self):
         queryset = NLPTool.objects.all()
         search_query = self.request.GET.get('q', '').strip()
+        tag = self.request.GET.get('tag', '').strip()
+
+        if tag:
+            queryset = queryset.filter(pk__in=TaggedResource.resource_ids(tag, ['tool']))
         
         if search_query:
             # Recherche dans plusieurs champs
@@ -132,7 +175,7 @@ class ToolListView(LoginAndVerifiedRequiredMixin, ListView):
                 Q(title__icontains=search_query) |
                 Q(description__icontains=search_query) |
                 Q(tool_type__icontains=search_query) |
-                Q(keywords__icontains=search_query) |
+                Q(pk__in=TaggedResource.resource_ids(search_query, ['tool'], partial=True)) |
                 Q(author__first_name__icontains=search_query) |
                 Q(author__last_name__icontains=search_query) |
                 Q(supported_languages__icontains=search_query)
@@ -165,13 +208,17 @@ class CourseListView(ListView):
     def get_queryset(self):
         queryset = Course.objects.all()
         search_query = self.request.GET.get('q', '').strip()
+        tag = self.request.GET.get('tag', '').strip()
+
+        if tag:
+            queryset = queryset.filter(pk__in=TaggedResource.resource_ids(tag, ['course']))
         
         if search_query:
             # Recherche dans plusieurs champs
             queryset = queryset.filter(
                 Q(title__icontains=search_query) |
                 Q(description__icontains=search_query) |
-                Q(keywords__icontains=search_query) |
+                Q(pk__in=TaggedResource.resource_ids(search_query, ['course'], partial=True)) |
                 Q(author__first_name__icontains=search_query) |
                 Q(author__last_name__icontains=search_query) |
                 Q(field__icontains=search_query) |
@@ -238,15 +285,28 @@ class CorpusListView(LoginAndVerifiedRequiredMixin, ListView):
     paginate_by = 12
     
     def get_queryset(self):
-        queryset = Corpus.objects.all()
+        queryset = Corpus.objects.select_related('author', 'profile')
         search_query = self.request.GET.get('q', '').strip()
+        tag = self.request.GET.get('tag', '').strip()
+        script = self.request.GET.get('script', '').strip()
+        tokens = self.request.GET.get('tokens', '').strip()
+
+        if tag:
+            queryset = queryset.filter(pk__in=TaggedResource.resource_ids(tag, ['corpus']))
+
+        # Facettes issues des profils calculés par analyze_corpora
+        if script:
+            queryset = queryset.filter(profile__dominant_script=script)
+        token_filter = CorpusProfile.token_range_filter(tokens) if tokens else None
+        if token_filter is not None:
+            queryset = queryset.filter(token_filter)
         
         if search_query:
             # Recherche dans plusieurs champs
             queryset = queryset.filter(
                 Q(title__icontains=search_query) |
                 Q(description__icontains=search_query) |
-                Q(keywords__icontains=search_query) |
+                Q(pk__in=TaggedResource.resource_ids(search_query, ['corpus'], partial=True)) |
                 Q(author__first_name__icontains=search_query) |
                 Q(author__last_name__icontains=search_query) |
                 Q(field__icontains=search_query) |
@@ -268,9 +328,38 @@ class CorpusListView(LoginAndVerifiedRequiredMixin, ListView):
             context['is_search'] = False
 
         context['page'] = 'corpus'
+        context['current_script'] = self.request.GET.get('script', '')
+        context['current_tokens'] = self.request.GET.get('tokens', '')
+        context['script_facets'] = self.get_script_facets()
+        context['token_facets'] = self.get_token_facets()
             
         return context
 
+    def get_script_facets(self):
+        counts = dict(
+            CorpusProfile.objects.exclude(dominant_script='')
+            .values_list('dominant_script')
+            .annotate(count=Count('pk'))
+        )
+        return [
+            (value, label, counts[value])
+            for value, label in CorpusProfile.Script.choices if counts.get(value)
+        ]
+
+    def get_token_facets(self):
+        """Number of profiled corpora in each token range, in one query."""
+        aggregates = {}
+        for key, _label, low, high in CorpusProfile.TOKEN_RANGES:
+            condition = Q(token_count__gte=low)
+            if high is not None:
+                condition &= Q(token_count__lt=high)
+            aggregates[key] = Count('pk', filter=condition)
+        counts = CorpusProfile.objects.aggregate(**aggregates)
+        return [
+            (key, label, counts[key])
+            for key, label, _low, _high in CorpusProfile.TOKEN_RANGES if counts[key]
+        ]
+
 class ResourceDetailView(LoginAndVerifiedRequiredMixin, DetailView):
     template_name = 'resources/resource_detail.html'
     context_object_name = 'object'
@@ -311,20 +400,14 @@ class ResourceDetailView(LoginAndVerifiedRequiredMixin, DetailView):
         if not model:
             raise Http404("Type de ressource invalide")
 
-        # Gérer les sous-types de Document
+        # Gérer les sous-types de Document : l'URL peut porter l'id du
+        # sous-type ou celui du Document parent, résolus en une seule requête
         if resource_type in ['article', 'thesis', 'memoir']:
-            try:
-                obj = get_object_or_404(model, pk=pk)
-            except Http404:
-                document = get_object_or_404(Document, pk=pk)
-                if resource_type == 'article' and hasattr(document, 'article'):
-                    obj = document.article
-                elif resource_type == 'thesis' and hasattr(document, 'thesis'):
-                    obj = document.thesis
-                elif resource_type == 'memoir' and hasattr(document, 'memoir'):
-                    obj = document.memoir
-                else:
-                    raise Http404(f"No {resource_type.capitalize()} matches the given query.")
+            obj = model.objects.select_related('document').filter(
+                Q(pk=pk) | Q(document_id=pk)
+            ).first()
+            if obj is None:
+                raise Http404(f"No {resource_type.capitalize()} matches the given query.")
         else:
             obj = get_object_or_404(model, pk=pk)
 
@@ -384,7 +467,20 @@ class ResourceDetailView(LoginAndVerifiedRequiredMixin, DetailView):
             else:
                 context['related_corpora'] = Corpus.objects.all()[:3]
 
-    
+        # Voisins précalculés par build_related_resources (une requête indexée,
+        # exécutée uniquement si le fragment doit être rendu)
+        document_pk = context['object'].pk
+        context['related_resources'] = SimpleLazyObject(
+            lambda: RelatedResource.get_neighbors(resource_type, document_pk)
+        )
+        if resource_type == 'corpus':
+            corpus = self.object
+            context['corpus_preview'] = SimpleLazyObject(lambda: first_page(corpus))
+
+        # Fragments partagés entre utilisateurs : les querysets ci-dessus ne
+        # sont évalués que lorsque le fragment n'est pas en cache
+        context['detail_cache_timeout'] = DETAIL_CACHE_TIMEOUT
+        context['detail_cache_version'] = detail_cache_version(context['object'], resource_type)
 
         return context
 
@@ -559,14 +655,19 @@ class ResourceUpdateView(LoginRequiredMixin, UserPassesTestMixin, FormView):
               for attr, value in common_data.items():
                 setattr(document, attr, value)
               document.file_format = form.cleaned_data['document_format']
+              # Nouveau fichier : texte extrait et indexé par extract_documents
+              if form.cleaned_data.get('document_file'):
+                  document.file = form.cleaned_data['document_file']
               document.update_date = current_time
               document.save()
 
         elif resource_type == 'document':
             # Si c'est un Document de base
                 for attr, value in common_data.items():
-                    setattr(document, attr, value)
+                    setattr(resource, attr, value)
                 resource.file_format = form.cleaned_data['document_format']
+                if form.cleaned_data.get('document_file'):
+                    resource.file = form.cleaned_data['document_file']
                 resource.update_date = current_time 
                 resource.save()
                 document = resource
@@ -594,6 +695,9 @@ class ResourceUpdateView(LoginRequiredMixin, UserPassesTestMixin, FormView):
             resource.size = form.cleaned_data['corpus_size']
             resource.field = form.cleaned_data['corpus_field']
             resource.file_format = form.cleaned_data['corpus_format']
+            # Nouveau fichier : profil et aperçu recalculés par analyze_corpora
+            if form.cleaned_data.get('corpus_file'):
+                resource.file = form.cleaned_data['corpus_file']
             resource.save()
         
         # Traitement des sous-types de Document
@@ -721,13 +825,11 @@ class ResourceCreateView(LoginAndVerifiedRequiredMixin, FormView):
         try:
             resource = form.save()
             messages.success(self.request, f"Resource '{resource.title}' created successfully!")
-            User = get_user_model()
-            for user in User.objects.filter(is_active=True):
-                Notification.objects.create(
-                    recipient=user,
-                    title="New resource",
-                    message=f"The resource« {resource.title} » has been added to the platform."
-                )
+            NotificationService.notify_all_users(
+                'SYSTEM',
+                "New resource",
+                f"The resource« {resource.title} » has been added to the platform."
+            )
             return super().form_valid(form)
         except Exception as e:
             logger.error(f"Error creating resource: {str(e)}")
@@ -811,4 +913,154 @@ class ToolCreateView(LoginAndVerifiedRequiredMixin, FormView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page'] = 'resources'  
-        return context
\ No newline at end of file
+        return context
+
+
+TAG_RESOURCE_MODELS = {
+    'tool': NLPTool,
+    'course': Course,
+    'corpus': Corpus,
+    'article': Document,
+    'thesis': Document,
+    'memoir': Document,
+}
+
+@login_and_verified_required
+def api_top_tags(request):
+    """API: tags les plus utilisés (lecture de l'index sur usage_count)"""
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 100)
+    except ValueError:
+        limit = 20
+    tags = Tag.objects.filter(usage_count__gt=0).values('name', 'normalized', 'usage_count')[:limit]
+    return JsonResponse({'tags': list(tags)})
+
+@login_and_verified_required
+def api_tag_resources(request, tag):
+    """API: ressources portant un tag, paginées, éventuellement filtrées par type"""
+    links = TaggedResource.objects.filter(tag__normalized=normalize_tag(tag))
+    resource_type = request.GET.get('type', '')
+    if resource_type:
+        links = links.filter(resource_type=resource_type)
+
+    paginator = Paginator(links.order_by('-id').values_list('resource_type', 'resource_id'), 20)
+    page = paginator.get_page(request.GET.get('page'))
+
+    # Une requête par modèle concerné, quel que soit le nombre de résultats
+    ids_by_model = {}
+    for link_type, resource_id in page.object_list:
+        ids_by_model.setdefault(TAG_RESOURCE_MODELS.get(link_type), set()).add(resource_id)
+    titles = {}
+    for model, ids in ids_by_model.items():
+        if model is not None:
+            titles.update(model.objects.filter(pk__in=ids).values_list('pk', 'title'))
+
+    resources = [
+        {
+            'type': link_type,
+            'id': str(resource_id),
+            'title': titles[resource_id],
+            'url': reverse('resources:resource-detail', kwargs={'type': link_type, 'pk': resource_id}),
+        }
+        for link_type, resource_id in page.object_list
+        if resource_id in titles
+    ]
+    return JsonResponse({
+        'tag': tag,
+        'count': paginator.count,
+        'page': page.number,
+        'num_pages': paginator.num_pages,
+        'resources': resources,
+    })
+
+
+@login_and_verified_required
+def api_corpus_concordance(request, pk):
+    """API: lignes KWIC d'un mot, d'une expression ou d'un préfixe dans un corpus, paginées"""
+    corpus = get_object_or_404(Corpus, pk=pk)
+    index = get_index(corpus)
+    if index is None:
+        return JsonResponse({'error': "This corpus has no concordance index yet"}, status=404)
+
+    query = request.GET.get('q', '').strip()
+    mode = request.GET.get('mode', 'word')
+    if mode not in MODES:
+        return JsonResponse({'error': f"Unknown mode, expected one of {', '.join(MODES)}"}, status=400)
+    if not query or (mode == 'prefix' and len(query) < MIN_PREFIX_LENGTH):
+        return JsonResponse({'error': "Query too short"}, status=400)
+    try:
+        context = min(max(int(request.GET.get('context', DEFAULT_CONTEXT)), 0), MAX_CONTEXT)
+    except ValueError:
+        context = DEFAULT_CONTEXT
+
+    positions, length = index.find(query, mode)
+    paginator = Paginator(positions, 50)
+    page = paginator.get_page(request.GET.get('page'))
+    return JsonResponse({
+        'query': query,
+        'mode': mode,
+        'count': paginator.count,
+        'page': page.number,
+        'num_pages': paginator.num_pages,
+        'token_count': index.token_count,
+        'lines': [index.kwic(position, length, context) for position in page.object_list],
+    })
+
+
+@login_and_verified_required
+def api_corpus_lines(request, pk):
+    """API: lignes N..M (?start=&count=) ou K lignes au hasard (?random=K) du fichier d'un corpus"""
+    corpus = get_object_or_404(Corpus, pk=pk)
+    try:
+        preview = get_preview(corpus)
+    except OSError:
+        preview = None
+    if preview is None:
+        return JsonResponse({'error': "This corpus has no file to preview"}, status=404)
+
+    try:
+        if 'random' in request.GET:
+            seed = request.GET.get('seed')
+            lines = preview.random_lines(int(request.GET['random']), seed=int(seed) if seed else None)
+        else:
+            lines = preview.lines(int(request.GET.get('start', 1)), int(request.GET.get('count', 20)))
+    except ValueError:
+        return JsonResponse({'error': "start, count, random and seed must be integers"}, status=400)
+
+    return JsonResponse({
+        'line_count': preview.line_count,
+        'lines': lines,
+    })
+
+
+@login_and_verified_required
+def export_citations(request):
+    """
+    Citations BibTeX / RIS / CSL-JSON d'une sélection (?ids=, ou POST pour les
+    grandes sélections) ou de la liste des ressources avec ses filtres.
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    fmt = params.get('format', 'bibtex')
+    if fmt not in CITATION_FORMATS:
+        return JsonResponse({'error': f"Unknown format, expected one of {', '.join(CITATION_FORMATS)}"}, status=400)
+
+    ids = params.getlist('ids')
+    if ids:
+        # Valider les identifiants avant de commencer la réponse en streaming
+        try:
+            ids = [uuid.UUID(pk) for pk in ids]
+        except ValueError:
+            return JsonResponse({'error': "Invalid document id"}, status=400)
+        # Identifiants de Document ou des lignes Article / Thesis / Memoir (pages de détail)
+        documents = Document.objects.filter(
+            Q(pk__in=ids) | Q(article__pk__in=ids) | Q(thesis__pk__in=ids) | Q(memoir__pk__in=ids)
+        )
+    else:
+        documents = filter_documents(params)
+
+    response = StreamingHttpResponse(
+        stream_citations(documents.order_by('-creation_date'), fmt),
+        content_type=CITATION_CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="citations.{CITATION_EXTENSIONS[fmt]}"'
+    return response
@@ -1,7 +1,7 @@
 from django_elasticsearch_dsl import Document, fields
 from elasticsearch_dsl import analysis, analyzer
 from django_elasticsearch_dsl.registries import registry
-from resources.models import Course, Document as DocModel, NLPTool, Corpus, Institution
+from resources.models import Course, Document as DocModel, DocumentText, NLPTool, Corpus, CorpusProfile, Institution
 from projects.models import Project
 from events.models import Event
 from accounts.models import CustomUser
@@ -195,17 +195,7 @@ class CourseDocument(Document):
         }
 
     def prepare_keywords(self, instance):
-     if not instance.keywords:
-        return []
-    
-     if isinstance(instance.keywords, str):
-        keywords = instance.keywords.replace('،', ',')  # conversion des virgules arabes
-        return [kw.strip() for kw in keywords.split(',') if kw.strip()]
-    
-     elif isinstance(instance.keywords, (list, tuple)):
-        return list(instance.keywords)
-
-     return []
+        return instance.get_keywords_list()
     
     def prepare_field(self, instance):
         value = instance.field
@@ -372,17 +362,7 @@ class ToolDocument(Document):
         }
 
     def prepare_keywords(self, instance):
-     if not instance.keywords:
-        return []
-    
-     if isinstance(instance.keywords, str):
-        keywords = instance.keywords.replace('،', ',')  # conversion des virgules arabes
-        return [kw.strip() for kw in keywords.split(',') if kw.strip()]
-    
-     elif isinstance(instance.keywords, (list, tuple)):
-        return list(instance.keywords)
-
-     return []
+        return instance.get_keywords_list()
 
     def prepare_tool_type(self, instance):
         value = instance.tool_type
@@ -521,6 +501,11 @@ class CorpusDocument(Document):
         }
     )
 
+    # Facettes issues du profil calculé par analyze_corpora
+    token_count = fields.LongField()
+    type_count = fields.LongField()
+    dominant_script = fields.KeywordField()
+
     def prepare_author(self, instance):
         if instance.author:
             return {
@@ -535,17 +520,7 @@ class CorpusDocument(Document):
         }
 
     def prepare_keywords(self, instance):
-     if not instance.keywords:
-        return []
-    
-     if isinstance(instance.keywords, str):
-        keywords = instance.keywords.replace('،', ',')  # conversion des virgules arabes
-        return [kw.strip() for kw in keywords.split(',') if kw.strip()]
-    
-     elif isinstance(instance.keywords, (list, tuple)):
-        return list(instance.keywords)
-
-     return []
+        return instance.get_keywords_list()
     
     def prepare_field(self, instance):
         value = instance.field
@@ -567,6 +542,24 @@ class CorpusDocument(Document):
             return str(value) if value else ""
         return ""
 
+    def _get_profile(self, instance):
+        try:
+            return instance.profile
+        except CorpusProfile.DoesNotExist:
+            return None
+
+    def prepare_token_count(self, instance):
+        profile = self._get_profile(instance)
+        return profile.token_count if profile else 0
+
+    def prepare_type_count(self, instance):
+        profile = self._get_profile(instance)
+        return profile.type_count if profile else 0
+
+    def prepare_dominant_script(self, instance):
+        profile = self._get_profile(instance)
+        return profile.dominant_script if profile else ""
+
     class Index:
         name = 'corpora'
         settings = {
@@ -690,6 +683,16 @@ class ResourceDocument(Document):
         )
     })
 
+    # Passages du texte intégral (extract_documents), un sous-document chacun
+    passages = fields.NestedField(properties={
+        'position': fields.IntegerField(),
+        'label': fields.KeywordField(),
+        'text': fields.TextField(fields={
+            'english': fields.TextField(analyzer=english_analyzer),
+            'arabic': fields.TextField(analyzer=arabic_analyzer)
+        })
+    })
+
     def prepare_author(self, instance):
         if instance.author:
             return {
@@ -704,17 +707,19 @@ class ResourceDocument(Document):
         }
 
     def prepare_keywords(self, instance):
-     if not instance.keywords:
-        return []
-    
-     if isinstance(instance.keywords, str):
-        keywords = instance.keywords.replace('،', ',')  # conversion des virgules arabes
-        return [kw.strip() for kw in keywords.split(',') if kw.strip()]
-    
-     elif isinstance(instance.keywords, (list, tuple)):
-        return list(instance.keywords)
-
-     return []
+        return instance.get_keywords_list()
+
+    def prepare_passages(self, instance):
+        try:
+            text = instance.text
+        except DocumentText.DoesNotExist:
+            return []
+        return text.chunks if text.status == DocumentText.Status.DONE else []
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            'author', 'text', 'article', 'thesis__institution', 'memoir__institution'
+        )
     
     def prepare_document_type(self, instance):
         value = instance.document_type
@@ -17,6 +17,13 @@ logger = logging.getLogger(__name__)
 class GlobalSearchView(View):
     template_name = 'search/search_results.html'
     RESULTS_PER_PAGE = 12
+    # Passages du texte intégral renvoyés (surlignés) par document
+    PASSAGES_PER_RESULT = 3
+    PASSAGE_FIELDS = {
+        'multilingual': ['passages.text'],
+        'english': ['passages.text.english', 'passages.text'],
+        'arabic': ['passages.text.arabic', 'passages.text'],
+    }
     DOCUMENT_FIELDS = {
         'course': {
             'multilingual': [
@@ -497,6 +504,9 @@ class GlobalSearchView(View):
         if doc_type == 'event' and subtype:
             must_queries.append(Term(event_type=subtype))
 
+        if doc_type == 'corpus' and subtype:
+            must_queries.append(Term(dominant_script=subtype))
+
         if detected_lang == 'ar':
             should_queries.append(
                 MultiMatch(
@@ -524,17 +534,22 @@ class GlobalSearchView(View):
                 )
             ])
 
-        must_queries.append(
-            MultiMatch(
-                query=query,
-                fields=fields_to_use.get('multilingual', default_fields['multilingual']),
-                type='best_fields',
-                tie_breaker=0.3,
-                minimum_should_match='75%',
-                fuzziness='AUTO',
-                boost=1.0
-            )
+        metadata_query = MultiMatch(
+            query=query,
+            fields=fields_to_use.get('multilingual', default_fields['multilingual']),
+            type='best_fields',
+            tie_breaker=0.3,
+            minimum_should_match='75%',
+            fuzziness='AUTO',
+            boost=1.0
         )
+        if doc_type == 'resource':
+            # Un document peut ne correspondre que par son texte intégral
+            passages_query = self._build_passages_query(query, detected_lang)
+            must_queries.append(Bool(should=[metadata_query, passages_query], minimum_should_match=1))
+            should_queries.append(self._build_passages_query(query, detected_lang, inner_hits=False))
+        else:
+            must_queries.append(metadata_query)
 
         if subtype:
             if doc_type == 'resource':
@@ -549,7 +564,37 @@ class GlobalSearchView(View):
             should=should_queries,
             minimum_should_match=1 if should_queries else None
         )
-        return doc_class.search().query(search_query)[:per_type]
+        search = doc_class.search().query(search_query)[:per_type]
+        if doc_type == 'resource':
+            # Le texte intégral n'est pas renvoyé, seulement les extraits surlignés
+            search = search.source(excludes=['passages'])
+        return search
+
+    def _build_passages_query(self, query, detected_lang='en', inner_hits=True):
+        """Nested query on the full-text passages, with highlighted inner hits."""
+        language = {'ar': 'arabic', 'en': 'english'}.get(detected_lang, 'multilingual')
+        nested = {
+            'path': 'passages',
+            'score_mode': 'max',
+            'query': MultiMatch(
+                query=query,
+                fields=self.PASSAGE_FIELDS[language],
+                type='best_fields',
+                minimum_should_match='75%'
+            ),
+        }
+        if inner_hits:
+            nested['inner_hits'] = {
+                'size': self.PASSAGES_PER_RESULT,
+                '_source': ['passages.label', 'passages.position'],
+                'highlight': {
+                    'encoder': 'html',
+                    'number_of_fragments': 1,
+                    'fragment_size': 200,
+                    'fields': {field: {} for field in self.PASSAGE_FIELDS[language]},
+                },
+            }
+        return Q('nested', **nested)
 
     def _process_response(self, doc_type, response):
         results = []
@@ -713,6 +758,23 @@ class GlobalSearchView(View):
                 for key, value in subtype_fields.items():
                     result[f'subtype_{key}'] = str(value)
 
+        result['passages'] = self._get_passages(hit)
+
+    def _get_passages(self, hit):
+        inner_hits = getattr(hit.meta, 'inner_hits', None)
+        if not inner_hits or 'passages' not in inner_hits:
+            return []
+        passages = []
+        for passage in inner_hits['passages']:
+            highlight = getattr(passage.meta, 'highlight', None)
+            fragments = [fragment for field in (highlight.to_dict() if highlight else {}).values() for fragment in field]
+            if fragments:
+                passages.append({
+                    'label': getattr(passage, 'label', ''),
+                    'highlight': fragments[0],
+                })
+        return passages
+
     def _process_event_fields(self, hit, source, result):
         if 'event_type' in source:
             result['event_type'] = str(source['event_type'])
@@ -736,6 +798,12 @@ class GlobalSearchView(View):
         for field in ['field', 'field_display', 'language', 'language_display']:
             if field in source:
                 result[field] = str(source[field])
+
+        if source.get('dominant_script'):
+            result['dominant_script'] = str(source['dominant_script'])
+            result['subtype'] = str(source['dominant_script'])
+        if source.get('token_count'):
+            result['token_count'] = source['token_count']
         
         if 'field_display' in source:
             result['field'] = str(source['field_display'])
@@ -7,6 +7,13 @@ let notificationSocket = null;
 let reconnectAttempts = 0;
 const MAX_RECONNECT_ATTEMPTS = 5;
 const RECONNECT_DELAY = 3000;
+// Cursor of the newest notification received, sent back on (re)connect;
+// stored per user so that another account on the same browser starts afresh
+const NOTIFICATION_CURSOR_KEY = "notificationCursor";
+// Notifications marked as read are sent to the server in batches
+const MARK_READ_DELAY = 300;
+let pendingReadIds = new Set();
+let markReadTimer = null;
 
 // Initialize the notification system
 document.addEventListener("DOMContentLoaded", function () {
@@ -57,7 +64,10 @@ function connectNotificationSocket() {
 
   // Determine the WebSocket protocol
   const wsProtocol = window.location.protocol === "https:" ? "wss:" : "ws:";
-  const wsUrl = `${wsProtocol}//${window.location.host}/ws/notifications/`;
+  // With a cursor the server only sends what is newer (delta sync)
+  const cursor = getNotificationCursor();
+  const query = cursor ? `?since=${encodeURIComponent(cursor)}` : "";
+  const wsUrl = `${wsProtocol}//${window.location.host}/ws/notifications/${query}`;
   console.log("WebSocket URL:", wsUrl);
 
   try {
@@ -74,18 +84,36 @@ function connectNotificationSocket() {
     notificationSocket.onmessage = function (e) {
       try {
         const data = JSON.parse(e.data);
+        // Server heartbeat: answer so the socket is not reaped as idle
+        if (data.type === "ping") {
+          notificationSocket.send(JSON.stringify({ action: "pong" }));
+          return;
+        }
+
         console.log("WebSocket message received:", data);
 
         // Handle different message types
         if (data.type === "notification_list") {
           console.log("Received notification list:", data.notifications);
+          data.notifications.forEach((n) => advanceNotificationCursor(n.created_at));
           if (document.getElementById("notificationList")) {
             displayNotifications(data.notifications);
           }
+        } else if (data.type === "notification_sync") {
+          console.log("Received notification sync:", data);
+          handleNotificationSync(data);
         } else if (data.type === "new_notification") {
           console.log("Received new notification:", data.notification);
+          advanceNotificationCursor(data.notification.created_at);
           showNotificationToast(data.notification);
           loadNotifications();
+        } else if (data.type === "notification_withdrawn") {
+          // Like removed: the grouped notification was deleted
+          console.log("Notification withdrawn:", data.notification_id);
+          loadNotifications();
+        } else if (data.type === "notifications_marked_read") {
+          console.log("Notifications marked as read:", data.ids);
+          handleNotificationsRead(data.ids, data.unread_count);
         } else if (data.type === "notification_marked_read") {
           console.log("Notification marked as read:", data.notification_id);
           handleNotificationRead(data.notification_id);
@@ -142,6 +170,65 @@ function connectNotificationSocket() {
   }
 }
 
+// localStorage key of the cursor of the logged-in user (data-user-id on <body>)
+function notificationCursorKey() {
+  return `${NOTIFICATION_CURSOR_KEY}:${document.body.dataset.userId || ""}`;
+}
+
+// Read the cursor of the newest notification received
+function getNotificationCursor() {
+  try {
+    return localStorage.getItem(notificationCursorKey());
+  } catch (error) {
+    return null;
+  }
+}
+
+// Move the cursor forward (never backward) to the given ISO date
+function advanceNotificationCursor(createdAt) {
+  if (!createdAt) return;
+  const current = getNotificationCursor();
+  if (current) {
+    const delta = Date.parse(createdAt) - Date.parse(current);
+    // Same millisecond: the ISO strings keep the microseconds
+    if (delta < 0 || (delta === 0 && createdAt <= current)) return;
+  }
+  try {
+    localStorage.setItem(notificationCursorKey(), createdAt);
+  } catch (error) {
+    console.log("Could not store the notification cursor");
+  }
+}
+
+// Handle the notifications received since the cursor
+function handleNotificationSync(data) {
+  advanceNotificationCursor(data.cursor);
+  setNotificationBadge(data.unread_count);
+
+  if (data.notifications.length === 0) return;
+
+  if (document.querySelector(".notification-dropdown")) {
+    updateNotificationDropdown();
+  }
+
+  if (document.getElementById("notificationList")) {
+    if (data.truncated) {
+      // Too many new notifications: reload the whole list
+      loadNotifications("/notifications/api/list/");
+    } else {
+      // Oldest first so that the newest ends up on top
+      data.notifications
+        .slice()
+        .reverse()
+        .forEach((notification) => {
+          if (!document.querySelector(`.notification-item[data-id="${notification.id}"]`)) {
+            prependNotificationToList(notification);
+          }
+        });
+    }
+  }
+}
+
 // Show error toast notification
 function showErrorToast(message) {
   const toastContainer =
@@ -210,6 +297,18 @@ function updateNotificationBadge() {
     });
 }
 
+// Set the notification badge count without asking the server
+function setNotificationBadge(count) {
+  const badge = document.querySelector(".notification-badge");
+  if (!badge) return;
+  if (count > 0) {
+    badge.textContent = count;
+    badge.style.display = "inline-block";
+  } else {
+    badge.style.display = "none";
+  }
+}
+
 // Update the notification dropdown in the navbar
 function updateNotificationDropdown() {
   const dropdown = document.querySelector(".notification-dropdown");
@@ -468,9 +567,8 @@ function handleNewNotification(notification) {
   }
 }
 
-// Handle a notification being marked as read
-function handleNotificationRead(notificationId) {
-  // Update the notification in the list
+// Show a notification of the list as read
+function markNotificationItemRead(notificationId) {
   const notificationItem = document.querySelector(
     `.notification-item[data-id="${notificationId}"]`
   );
@@ -488,6 +586,12 @@ function handleNotificationRead(notificationId) {
       markReadBtn.setAttribute("disabled", "disabled");
     }
   }
+}
+
+// Handle a notification being marked as read
+function handleNotificationRead(notificationId) {
+  // Update the notification in the list
+  markNotificationItemRead(notificationId);
 
   // Update notification badge
   updateNotificationBadge();
@@ -498,6 +602,17 @@ function handleNotificationRead(notificationId) {
   }
 }
 
+// Handle a batch of notifications marked as read by the server
+function handleNotificationsRead(notificationIds, unreadCount) {
+  notificationIds.forEach(markNotificationItemRead);
+  setNotificationBadge(unreadCount);
+
+  // Update notification dropdown if it exists
+  if (document.querySelector(".notification-dropdown")) {
+    updateNotificationDropdown();
+  }
+}
+
 // Handle all notifications being marked as read
 function handleAllNotificationsRead() {
   // Update all notifications in the list
@@ -528,13 +643,12 @@ function handleAllNotificationsRead() {
 // Mark a notification as read
 function markNotificationAsRead(notificationId) {
   if (notificationSocket && notificationSocket.readyState === WebSocket.OPEN) {
-    // Send through WebSocket
-    notificationSocket.send(
-      JSON.stringify({
-        action: "mark_as_read",
-        notification_id: notificationId,
-      })
-    );
+    // Send through WebSocket, grouped with the clicks that follow
+    pendingReadIds.add(notificationId);
+    markNotificationItemRead(notificationId);
+    if (!markReadTimer) {
+      markReadTimer = setTimeout(flushPendingReads, MARK_READ_DELAY);
+    }
   } else {
     // Fallback to HTTP request
     fetch(`/notifications/api/mark-read/${notificationId}/`, {
@@ -561,6 +675,26 @@ function markNotificationAsRead(notificationId) {
   }
 }
 
+// Send the pending "mark as read" in one message
+function flushPendingReads() {
+  markReadTimer = null;
+  if (pendingReadIds.size === 0) return;
+  const ids = Array.from(pendingReadIds);
+  if (!notificationSocket || notificationSocket.readyState !== WebSocket.OPEN) {
+    // Connection lost in the meantime: HTTP fallback, one by one
+    pendingReadIds = new Set();
+    ids.forEach(markNotificationAsRead);
+    return;
+  }
+  pendingReadIds = new Set();
+  notificationSocket.send(
+    JSON.stringify({
+      action: "mark_read",
+      ids: ids,
+    })
+  );
+}
+
 // Mark all notifications as read
 function markAllNotificationsAsRead() {
   if (notificationSocket && notificationSocket.readyState === WebSocket.OPEN) {